@@ -0,0 +1,17 @@
+# Generated by Django 5.2.4 on 2026-10-18 13:43
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='emailotp',
+            index=models.Index(fields=['user', 'created_at'], name='accounts_otp_user_created_idx'),
+        ),
+    ]
@@ -47,6 +47,12 @@ class EmailOTP(models.Model):
     otp_code = models.CharField(max_length=6)
     created_at = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        indexes = [
+            # verify_otp: user's latest code
+            models.Index(fields=['user', 'created_at'], name='accounts_otp_user_created_idx'),
+        ]
+
     def is_valid(self):
         return timezone.now() < self.created_at + timedelta(minutes=10)
 
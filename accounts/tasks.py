@@ -0,0 +1,32 @@
+# /accounts/tasks.py
+import logging
+
+from django.conf import settings
+from django.core.mail import send_mail
+
+from jobs.queue import task
+
+from .models import EmailOTP
+
+logger = logging.getLogger(__name__)
+
+
+@task("accounts.send_otp_email")
+def send_otp_email(otp_id):
+    otp = EmailOTP.objects.select_related("user").filter(pk=otp_id).first()
+    # Expired code bhejne ka koi fayda nahi (retry late ho sakta hai)
+    if otp is None or not otp.is_valid():
+        return
+    try:
+        send_mail(
+            subject="Your Quesec OTP Login Code",
+            message=f"Your OTP is: {otp.otp_code}",
+            from_email=settings.DEFAULT_FROM_EMAIL,
+            recipient_list=[otp.user.email],
+            fail_silently=False,
+        )
+    except Exception as e:
+        logger.error("OTP email send failed: %s", e)
+        if settings.DEBUG:
+            print(f"[DEV ONLY] OTP for {otp.user.email}: {otp.otp_code}")
+        raise
@@ -1,3 +1,72 @@
-from django.test import TestCase
+from django.core.cache import cache
+from django.test import TestCase, override_settings
 
-# Create your tests here.
+from orders.history import ORDERS_PER_PAGE
+from quesecrides.keyset import encode_cursor
+from quesecrides.testing import LOCAL_STORAGES, make_order
+
+from .models import CustomUser
+
+
+@override_settings(STORAGES=LOCAL_STORAGES)
+class MyAccountOrderHistoryTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.user = CustomUser.objects.create_user(email="b2b@example.com")
+        # Same created_at for several rows: id breaks the tie
+        self.orders = [make_order(self.user) for _ in range(ORDERS_PER_PAGE * 2 + 3)]
+        make_order(CustomUser.objects.create_user(email="other@example.com"))
+        self.client.force_login(self.user)
+
+    def walk(self, url, direction, cursor_attr):
+        seen, pages = [], 0
+        while url:
+            response = self.client.get(url)
+            page = response.context["orders"]
+            seen.extend(o.id for o in page)
+            pages += 1
+            cursor = getattr(page, cursor_attr)
+            url = f"/my-account/?{direction}={cursor}" if cursor else None
+        return seen, pages
+
+    def test_pages_cover_history_once_newest_first(self):
+        seen, pages = self.walk("/my-account/", "after", "next_cursor")
+
+        self.assertEqual(pages, 3)
+        self.assertEqual(seen, sorted((o.id for o in self.orders), reverse=True))
+
+    def test_before_cursor_walks_back_to_first_page(self):
+        response = self.client.get("/my-account/")
+        second = self.client.get(f"/my-account/?after={response.context['orders'].next_cursor}")
+        back = self.client.get(f"/my-account/?before={second.context['orders'].prev_cursor}")
+
+        self.assertEqual([o.id for o in back.context["orders"]], [o.id for o in response.context["orders"]])
+        self.assertFalse(back.context["orders"].has_previous)
+
+    def test_bad_cursor_falls_back_to_first_page(self):
+        forged = encode_cursor(["yesterday", "x"])
+        for cursor in ("not-a-cursor", forged):
+            response = self.client.get(f"/my-account/?after={cursor}")
+            self.assertEqual(len(response.context["orders"]), ORDERS_PER_PAGE)
+            self.assertFalse(response.context["orders"].has_previous)
+
+    def test_page_cost_does_not_grow_with_history(self):
+        # session, user, one page of orders, its items, header cart count
+        self.client.get("/my-account/")  # warm caches (order count, site chrome)
+        with self.assertNumQueries(5):
+            self.client.get("/my-account/")
+        for _ in range(50):
+            make_order(self.user)
+        self.client.get("/my-account/")
+        with self.assertNumQueries(5):
+            self.client.get("/my-account/")
+
+    def test_order_count_is_cached_and_refreshed_on_new_order(self):
+        response = self.client.get("/my-account/")
+        self.assertEqual(response.context["total_orders"], len(self.orders))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            make_order(self.user)
+        response = self.client.get("/my-account/")
+        self.assertEqual(response.context["total_orders"], len(self.orders) + 1)
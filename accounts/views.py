@@ -3,12 +3,14 @@ from .models import CustomUser, EmailOTP
 from .forms import EmailLoginForm, OTPVerifyForm
 from django.contrib import messages
 from django.contrib.auth import login, logout
-from django.core.mail import send_mail
 from django.contrib.auth.decorators import login_required
-from django.conf import settings
 import logging
 import random
-from orders.models import Order
+from jobs.queue import enqueue
+from orders.history import order_history_page, user_order_count
+from sitecontent.route_context import register_route_context
+
+register_route_context("login_page", "verify_otp", "my_account", processors=["site_info"])
 
 logger = logging.getLogger(__name__)
 
@@ -23,26 +25,12 @@ def login_request(request):
                 messages.error(request, "Email not registered.")
                 return redirect('login_page')
 
-            otp = str(random.randint(100000, 999999))
-            EmailOTP.objects.create(user=user, otp_code=otp)
+            otp_code = str(random.randint(100000, 999999))
+            otp = EmailOTP.objects.create(user=user, otp_code=otp_code)
 
-            # --- Never crash on email failure ---
-            try:
-                send_mail(
-                    subject="Your Quesec OTP Login Code",
-                    message=f"Your OTP is: {otp}",
-                    from_email=settings.DEFAULT_FROM_EMAIL,
-                    recipient_list=[user.email],
-                    fail_silently=False,
-                )
-                messages.info(request, "OTP sent to your email.")
-            except Exception as e:
-                logger.error("OTP email send failed: %s", e)
-                print(f"[DEV ONLY] OTP for {user.email}: {otp}")
-                messages.warning(
-                    request,
-                    "We couldn't send the email right now. Please check console for OTP in development."
-                )
+            # Email worker bhejta hai (jobs.queue); SMTP slow ho to bhi login turant
+            enqueue("accounts.send_otp_email", otp_id=otp.pk)
+            messages.info(request, "OTP sent to your email.")
 
             request.session['otp_user_id'] = user.id
             return redirect('verify_otp')
@@ -89,18 +77,16 @@ def logout_view(request):
 @login_required(login_url='login_page')
 def my_account(request):
     """
-    Sirf logged-in user ke orders fetch honge.
+    Sirf logged-in user ke orders, ek page (keyset: ?after= / ?before=) at a time.
+    Total count per-user cache se aata hai.
     """
-    orders = (
-        Order.objects.filter(user=request.user)
-        .order_by('-created_at')
-        .select_related()
-        .prefetch_related('items__product')
-    )
-    total_orders = orders.count()
+    after = request.GET.get('after')
+    before = request.GET.get('before')
+    page = order_history_page(request.user, after=after, before=before)
 
     context = {
-        "orders": orders,
-        "total_orders": total_orders,
+        "orders": page,
+        "total_orders": user_order_count(request.user.id),
+        "paging": bool(after or before),  # open the Orders tab
     }
     return render(request, 'my-account.html', context)
@@ -20,6 +20,13 @@ class CategoryForm(forms.ModelForm):
     class Media:
         js = ('admin/js/category_toggle.js',)
 
+    def clean_parent(self):
+        parent = self.cleaned_data.get('parent')
+        # Apne hi subtree ke andar move karna allowed nahi (path loop ban jayega)
+        if parent and self.instance.pk and parent.path.startswith(self.instance.path):
+            raise forms.ValidationError("A category cannot be moved under itself or one of its descendants.")
+        return parent
+
 @admin.register(Category)
 class CategoryAdmin(admin.ModelAdmin):
     form = CategoryForm
@@ -32,7 +39,16 @@ class ProductResource(resources.ModelResource):
     class Meta:
         model = Product
         import_id_fields = ['slug']
-        exclude = ('created_at', 'updated_at')
+        exclude = (
+            'created_at', 'updated_at',
+            # Rating stats are derived from reviews, never imported
+            'rating_avg', 'rating_count', 'rating_1_count', 'rating_2_count',
+            'rating_3_count', 'rating_4_count', 'rating_5_count',
+            # Derived from slugs on save
+            'url_path',
+            # Stock holds (orders/stock.py)
+            'reserved',
+        )
                 
 class ProductImageInline(admin.StackedInline):
     model = ProductImage
@@ -99,6 +115,12 @@ class ProductAdmin(ImportExportModelAdmin):
             copy.title = f"{original.title} - duplicate"  # Leave blank
             copy.slug = f"{original.slug}-duplicate"   # Leave blank
             copy.image = None   # blank main image
+            # Copy has no reviews yet
+            copy.rating_avg = 0
+            copy.rating_count = 0
+            for stars in range(1, 6):
+                setattr(copy, f"rating_{stars}_count", 0)
+            copy.reserved = 0
             copy.save()
 
             self.message_user(request, "Product duplicated successfully!", messages.SUCCESS)
@@ -4,3 +4,6 @@ from django.apps import AppConfig
 class BicyclesConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'bicycles'
+
+    def ready(self):
+        from . import signals  # noqa: F401  (connects catalog cache invalidation)
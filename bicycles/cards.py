@@ -0,0 +1,202 @@
+# /bicycles/cards.py
+"""
+ProductCard: slim, read-only projection for every product listing surface
+(shop, category, search, suggest, homepage rails).
+
+Ek hi .values() query me sirf card ke columns aate hain (description /
+short_desc jaisi badi CKEditor fields nahi); URLs stored url_path columns se.
+URL, image URL, effective price, discount % aur rating pehle se resolved hote
+hain, isliye template me koi per-card follow-up query nahi hoti.
+
+Template compatibility: card wahi attributes deta hai jo listing templates
+Product par padhte the (title, get_absolute_url, image.url, discount_price,
+average_rating, category.get_absolute_url, category.name, display_category).
+"""
+from dataclasses import replace
+from decimal import Decimal
+
+from django.core.paginator import Paginator
+
+from quesecrides.keyset import encode_cursor, paginate, paginate_ids, row_key
+
+from .models import Product
+
+CARD_FIELDS = (
+    "id", "title", "slug", "sku", "price", "discount_price", "image", "is_available",
+    "rating_avg", "rating_count", "url_path",
+    "category_id", "category__name", "category__slug", "category__url_path",
+)
+
+
+class CardImage:
+    __slots__ = ("url",)
+
+    def __init__(self, url):
+        self.url = url
+
+    def __bool__(self):
+        return bool(self.url)
+
+    def __str__(self):
+        return self.url
+
+
+class CardCategory:
+    __slots__ = ("id", "name", "slug", "url")
+
+    def __init__(self, id, name, slug, url):
+        self.id = id
+        self.name = name
+        self.slug = slug
+        self.url = url
+
+    @property
+    def pk(self):
+        return self.id
+
+    def get_absolute_url(self):
+        return self.url
+
+    def __eq__(self, other):
+        # Also compares equal to a bicycles.Category with the same pk
+        # (category.html: {% if product.category == child %})
+        other_pk = getattr(other, "pk", None)
+        return other_pk is not None and other_pk == self.id
+
+    def __hash__(self):
+        return hash(self.id)
+
+    def __str__(self):
+        return self.name
+
+
+class ProductCard:
+    __slots__ = (
+        "id", "title", "slug", "sku", "price", "discount_price", "effective_price",
+        "discount_percentage", "average_rating", "rating_count", "is_available",
+        "url", "image", "category",
+    )
+
+    def __init__(self, **values):
+        for name in self.__slots__:
+            setattr(self, name, values[name])
+
+    @classmethod
+    def from_row(cls, row, image_storage=None):
+        storage = image_storage or Product._meta.get_field("image").storage
+        price = row["price"] or Decimal("0")
+        discount_price = row["discount_price"]
+        effective = discount_price or price
+        discount_pct = round((price - discount_price) / price * 100) if (discount_price and price) else 0
+
+        return cls(
+            id=row["id"],
+            title=row["title"],
+            slug=row["slug"],
+            sku=row["sku"],
+            price=price,
+            discount_price=discount_price,
+            effective_price=effective,
+            discount_percentage=discount_pct,
+            average_rating=round(float(row["rating_avg"]), 2) if row["rating_count"] else 0,
+            rating_count=row["rating_count"],
+            is_available=row["is_available"],
+            url=row["url_path"],
+            image=CardImage(storage.url(row["image"]) if row["image"] else ""),
+            category=CardCategory(
+                row["category_id"], row["category__name"], row["category__slug"], row["category__url_path"]
+            ),
+        )
+
+    @property
+    def pk(self):
+        return self.id
+
+    @property
+    def name(self):
+        # Older card markup uses product.name
+        return self.title
+
+    def get_absolute_url(self):
+        return self.url
+
+    def display_category(self):
+        return self.category.name
+
+    def __repr__(self):
+        return f"<ProductCard {self.id}: {self.sku}>"
+
+
+def card_rows(queryset):
+    """Restrict a Product queryset to the card columns (keeps filters/order)."""
+    return queryset.values(*CARD_FIELDS)
+
+
+def to_cards(rows):
+    storage = Product._meta.get_field("image").storage
+    return [ProductCard.from_row(row, storage) for row in rows]
+
+
+def load_cards(queryset):
+    return to_cards(card_rows(queryset))
+
+
+def cards_by_ids(ids):
+    """Cards for `ids` in the given order (one query); missing ids are skipped."""
+    ids = list(ids)
+    by_id = {card.id: card for card in load_cards(Product.objects.filter(id__in=ids))}
+    return [by_id[i] for i in ids if i in by_id]
+
+
+def paginate_cards(queryset, per_page, page_number):
+    """Paginator.get_page over card rows; page.object_list holds ProductCards."""
+    page_obj = Paginator(card_rows(queryset), per_page).get_page(page_number)
+    page_obj.object_list = to_cards(page_obj.object_list)
+    return page_obj
+
+
+def _edge_cursors(page_obj, keys):
+    # Next / Previous of a numbered page as cursors too, so following the
+    # arrows from ?page=N continues in keyset mode
+    page_obj.next_cursor = encode_cursor(keys[-1]) if keys and page_obj.has_next() else None
+    page_obj.prev_cursor = encode_cursor(keys[0]) if keys and page_obj.has_previous() else None
+
+
+def page_cards(queryset, ordering, per_page, params):
+    """
+    One listing page of ProductCards, in either mode:
+
+      ?after= / ?before=  -> KeysetPage (quesecrides.keyset): a seek + LIMIT,
+                             same cost at any depth, no COUNT
+      ?page=N (or none)   -> Paginator page: numbered links / old URLs
+
+    Both carry next_cursor / prev_cursor. `ordering` must end in a unique
+    field; annotated sort keys (effective_price ...) are selected too.
+    """
+    ordering = list(ordering)
+    keys = [name.lstrip("-") for name in ordering]
+    rows = queryset.values(*CARD_FIELDS, *(k for k in keys if k not in CARD_FIELDS))
+
+    after, before = params.get("after"), params.get("before")
+    if after or before:
+        page = paginate(rows, ordering, per_page, after=after, before=before)
+        return replace(page, items=to_cards(page.items))
+
+    page_obj = Paginator(rows.order_by(*ordering), per_page).get_page(params.get("page"))
+    rows = list(page_obj.object_list)
+    _edge_cursors(page_obj, [row_key(row, ordering) for row in rows])
+    page_obj.object_list = to_cards(rows)
+    return page_obj
+
+
+def page_cards_by_ids(ids, per_page, params):
+    """page_cards() for an already ranked id list (search results)."""
+    after, before = params.get("after"), params.get("before")
+    if after or before:
+        page = paginate_ids(ids, per_page, after=after, before=before)
+        return replace(page, items=cards_by_ids(page.items))
+
+    page_obj = Paginator(ids, per_page).get_page(params.get("page"))
+    _edge_cursors(page_obj, [[pk] for pk in page_obj.object_list])
+    page_obj.object_list = cards_by_ids(page_obj.object_list)
+    return page_obj
@@ -0,0 +1,40 @@
+# /bicycles/catalog.py
+"""
+Catalog-wide aggregates cached against the "catalog" version stamp.
+
+bicycles.signals har Product/Category save/delete par stamp bump karta hai,
+isliye yahan ke cached results kabhi stale nahi rehte.
+"""
+from collections import defaultdict
+
+from django.db.models import Count, Q
+
+from quesecrides.cache_versions import get_or_build
+
+from .models import Product
+
+CATALOG_NAMESPACE = "catalog"
+
+
+def _build_category_product_counts():
+    # One grouped aggregate: products per leaf path, then roll each row
+    # up to every ancestor id in its materialized path.
+    rows = (
+        Product.objects.values("category__path")
+        .annotate(total=Count("id"), available=Count("id", filter=Q(is_available=True)))
+        .order_by()
+    )
+    counts = defaultdict(lambda: [0, 0])
+    for row in rows:
+        for cat_id in filter(None, (row["category__path"] or "").split("/")):
+            counts[int(cat_id)][0] += row["total"]
+            counts[int(cat_id)][1] += row["available"]
+    return {cat_id: tuple(pair) for cat_id, pair in counts.items()}
+
+
+def category_product_counts():
+    """
+    {category_id: (total, available)} with ALL descendants included.
+    Categories without any product are absent.
+    """
+    return get_or_build(CATALOG_NAMESPACE, "category-product-counts", _build_category_product_counts)
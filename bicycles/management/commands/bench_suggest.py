@@ -0,0 +1,56 @@
+import random
+import string
+import time
+
+from django.core.management.base import BaseCommand
+
+from bicycles.suggest import SuggestIndex
+
+WORDS = [
+    "rider", "trail", "blazer", "kids", "cycle", "mountain", "road", "hybrid", "city",
+    "fat", "bike", "gear", "single", "speed", "steel", "alloy", "disc", "brake",
+    "junior", "pro", "sport", "cruiser", "urban", "racer", "fold", "electric",
+]
+
+
+class Command(BaseCommand):
+    help = "Microbenchmark the search suggest index on a synthetic catalog (no DB)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--products", type=int, default=50000)
+        parser.add_argument("--queries", type=int, default=20000)
+        parser.add_argument("--seed", type=int, default=1)
+
+    def handle(self, *args, **options):
+        rng = random.Random(options["seed"])
+        entries = []
+        for pk in range(1, options["products"] + 1):
+            title = " ".join(rng.sample(WORDS, 3) + [str(rng.choice((12, 16, 20, 24, 26, 27, 29)))])
+            sku = "".join(rng.choices(string.ascii_uppercase, k=2)) + f"-{pk}"
+            entries.append((pk, title, sku, {"title": title, "sku": sku}))
+
+        started = time.perf_counter()
+        index = SuggestIndex(entries)
+        built = time.perf_counter() - started
+
+        # What the dropdown sends: growing prefixes of title words / SKUs, some two-word
+        queries = []
+        for _ in range(options["queries"]):
+            _, title, sku, _ = rng.choice(entries)
+            source = rng.choice((title, title, sku.lower()))
+            queries.append(source[:rng.randint(1, len(source))])
+
+        timings = []
+        for query in queries:
+            started = time.perf_counter()
+            index.suggest(query)
+            timings.append(time.perf_counter() - started)
+        timings.sort()
+
+        def pct(p):
+            return timings[min(len(timings) - 1, int(len(timings) * p))] * 1e6
+
+        self.stdout.write(
+            f"{len(index)} products, {len(index.tokens)} tokens, built in {built:.2f}s\n"
+            f"{len(timings)} lookups: p50 {pct(0.50):.1f}us  p99 {pct(0.99):.1f}us  max {timings[-1] * 1e6:.1f}us"
+        )
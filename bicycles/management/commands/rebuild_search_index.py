@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from bicycles.search import backend, refresh_search_documents
+
+
+class Command(BaseCommand):
+    help = "Rebuild every product search document and the full-text index (backfill/repair)."
+
+    def handle(self, *args, **options):
+        written = refresh_search_documents()
+        self.stdout.write(self.style.SUCCESS(f"Indexed {written} products ({backend()} backend)."))
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from bicycles.ratings import reconcile_ratings
+
+
+class Command(BaseCommand):
+    help = "Recompute Product rating_avg / rating_count / star histogram from ProductReview rows."
+
+    def handle(self, *args, **options):
+        changed = reconcile_ratings()
+        self.stdout.write(self.style.SUCCESS(f"Ratings reconciled: {changed} product(s) updated."))
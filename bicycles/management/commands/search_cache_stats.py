@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+
+from bicycles.search import reset_search_cache_stats, search_cache_stats
+
+
+class Command(BaseCommand):
+    help = "Show search result cache hits / misses (shared cache, all workers)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--reset", action="store_true", help="Zero the counters after printing.")
+
+    def handle(self, *args, **options):
+        stats = search_cache_stats()
+        lookups = stats["hits"] + stats["misses"]
+        rate = f"{stats['hits'] / lookups:.1%}" if lookups else "-"
+        self.stdout.write(f"Search cache: {stats['hits']} hits, {stats['misses']} misses, hit rate {rate}.")
+        if options["reset"]:
+            reset_search_cache_stats()
+            self.stdout.write(self.style.SUCCESS("Counters reset."))
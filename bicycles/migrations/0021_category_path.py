@@ -0,0 +1,34 @@
+# Generated by Django 5.2.4 on 2026-10-18 13:22
+
+from django.db import migrations, models
+
+
+def build_category_paths(apps, schema_editor):
+    Category = apps.get_model('bicycles', 'Category')
+    by_parent = {}
+    for cat_id, parent_id in Category.objects.values_list('id', 'parent_id'):
+        by_parent.setdefault(parent_id, []).append(cat_id)
+
+    # Top-down walk from the roots, prefix = ancestor ids
+    stack = [(cat_id, '') for cat_id in by_parent.get(None, [])]
+    while stack:
+        cat_id, prefix = stack.pop()
+        path = f"{prefix}{cat_id}/"
+        Category.objects.filter(pk=cat_id).update(path=path)
+        stack.extend((child_id, path) for child_id in by_parent.get(cat_id, []))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bicycles', '0020_category_meta_description'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='category',
+            name='path',
+            field=models.CharField(db_index=True, default='', editable=False, max_length=255),
+        ),
+        migrations.RunPython(build_category_paths, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,72 @@
+# Generated by Django 5.2.4 on 2026-10-18 13:25
+
+from collections import defaultdict
+from decimal import Decimal, ROUND_HALF_UP
+
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def backfill_rating_stats(apps, schema_editor):
+    Product = apps.get_model('bicycles', 'Product')
+    ProductReview = apps.get_model('bicycles', 'ProductReview')
+
+    histograms = defaultdict(dict)
+    rows = ProductReview.objects.values_list('product_id', 'rating').annotate(n=Count('id')).order_by()
+    for product_id, rating, n in rows:
+        histograms[product_id][rating] = n
+
+    for product_id, histogram in histograms.items():
+        count = sum(histogram.values())
+        avg = Decimal(sum(s * n for s, n in histogram.items())) / count
+        Product.objects.filter(pk=product_id).update(
+            rating_avg=avg.quantize(Decimal('0.01'), rounding=ROUND_HALF_UP),
+            rating_count=count,
+            **{f'rating_{s}_count': histogram.get(s, 0) for s in range(1, 6)},
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bicycles', '0021_category_path'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='product',
+            name='rating_1_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='rating_2_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='rating_3_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='rating_4_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='rating_5_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='rating_avg',
+            field=models.DecimalField(decimal_places=2, default=0, editable=False, max_digits=3),
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='rating_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(backfill_rating_stats, migrations.RunPython.noop),
+    ]
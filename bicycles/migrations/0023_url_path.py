@@ -0,0 +1,41 @@
+# Generated by Django 5.2.4 on 2026-10-18 13:27
+
+from django.db import migrations, models
+
+
+def backfill_url_paths(apps, schema_editor):
+    Category = apps.get_model('bicycles', 'Category')
+    Product = apps.get_model('bicycles', 'Product')
+
+    slugs = dict(Category.objects.values_list('id', 'slug'))
+    category_urls = {}
+    for cat_id, slug, parent_id in Category.objects.values_list('id', 'slug', 'parent_id'):
+        parent_slug = slugs.get(parent_id)
+        category_urls[cat_id] = f"/{parent_slug}/{slug}/" if parent_slug else f"/{slug}/"
+        Category.objects.filter(pk=cat_id).update(url_path=category_urls[cat_id])
+
+    products = list(Product.objects.only('id', 'slug', 'category_id'))
+    for product in products:
+        product.url_path = f"{category_urls.get(product.category_id, '/')}{product.slug}/"
+    Product.objects.bulk_update(products, ['url_path'], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bicycles', '0022_product_rating_stats'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='category',
+            name='url_path',
+            field=models.CharField(default='', editable=False, max_length=255),
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='url_path',
+            field=models.CharField(default='', editable=False, max_length=255),
+        ),
+        migrations.RunPython(backfill_url_paths, migrations.RunPython.noop),
+    ]
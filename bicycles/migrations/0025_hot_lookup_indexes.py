@@ -0,0 +1,17 @@
+# Generated by Django 5.2.4 on 2026-10-18 13:52
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bicycles', '0024_product_reserved'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(condition=models.Q(('is_available', True)), fields=['created_at'], name='bicycles_avail_created_idx'),
+        ),
+    ]
@@ -0,0 +1,84 @@
+import html
+import re
+
+from django.contrib.postgres.search import SearchVector
+from django.db import migrations
+from django.utils.html import strip_tags
+
+# Frozen copies of bicycles.search at the time of this migration: later
+# changes there must not change what this backfill does
+FTS_TABLE = "bicycles_product_fts"
+SEARCH_CONFIG = "simple"
+_SPACE_RE = re.compile(r"\s+")
+
+
+def plain_text(value):
+    return _SPACE_RE.sub(" ", html.unescape(strip_tags(value or ""))).strip()
+
+
+def create_fts_table(schema_editor):
+    try:
+        schema_editor.execute(
+            f"CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5("
+            "title, sku, categories, body, tokenize='unicode61 remove_diacritics 2', prefix='2 3')"
+        )
+    except Exception:
+        # SQLite built without FTS5: bicycles.search falls back to icontains
+        return False
+    return True
+
+
+def backfill(apps, schema_editor):
+    Product = apps.get_model("bicycles", "Product")
+    Category = apps.get_model("bicycles", "Category")
+    ProductSearchDocument = apps.get_model("bicycles", "ProductSearchDocument")
+    vendor = schema_editor.connection.vendor
+    fts = vendor == "sqlite" and create_fts_table(schema_editor)
+
+    rows = list(Product.objects.values("id", "title", "sku", "short_desc", "description", "category__path"))
+    names = dict(Category.objects.values_list("id", "name"))
+    documents = [
+        ProductSearchDocument(
+            product_id=row["id"],
+            title=row["title"] or "",
+            sku=row["sku"] or "",
+            categories=" ".join(
+                names[int(pk)] for pk in (row["category__path"] or "").split("/") if pk and int(pk) in names
+            ),
+            body=plain_text(f"{row['short_desc'] or ''} {row['description'] or ''}"),
+        )
+        for row in rows
+    ]
+    ProductSearchDocument.objects.bulk_create(documents, batch_size=500)
+
+    if vendor == "postgresql":
+        ProductSearchDocument.objects.update(vector=(
+            SearchVector("title", weight="A", config=SEARCH_CONFIG)
+            + SearchVector("sku", weight="A", config=SEARCH_CONFIG)
+            + SearchVector("categories", weight="B", config=SEARCH_CONFIG)
+            + SearchVector("body", weight="C", config=SEARCH_CONFIG)
+        ))
+    elif fts:
+        with schema_editor.connection.cursor() as cursor:
+            cursor.executemany(
+                f"INSERT INTO {FTS_TABLE} (rowid, title, sku, categories, body) VALUES (%s, %s, %s, %s, %s)",
+                [(d.product_id, d.title, d.sku, d.categories, d.body) for d in documents],
+            )
+
+
+def unbackfill(apps, schema_editor):
+    apps.get_model("bicycles", "ProductSearchDocument").objects.all().delete()
+    if schema_editor.connection.vendor == "sqlite":
+        schema_editor.execute(f"DROP TABLE IF EXISTS {FTS_TABLE}")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bicycles', '0026_product_search_document'),
+    ]
+
+    # PostgreSQL GIN index on `vector`: ProductSearchDocument.Meta.indexes (0029)
+    operations = [
+        migrations.RunPython(backfill, unbackfill),
+    ]
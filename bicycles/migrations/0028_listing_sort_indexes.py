@@ -0,0 +1,26 @@
+# Generated by Django 5.2.4 on 2026-10-18 13:59
+
+import django.db.models.functions.comparison
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bicycles', '0027_search_index'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(condition=models.Q(('is_available', True)), fields=['title', 'id'], name='bicycles_avail_title_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(condition=models.Q(('is_available', True)), fields=['rating_avg', 'id'], name='bicycles_avail_rating_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(django.db.models.functions.comparison.Coalesce('discount_price', 'price'), models.F('id'), condition=models.Q(('is_available', True)), name='bicycles_avail_price_idx'),
+        ),
+    ]
@@ -0,0 +1,31 @@
+from django.contrib.postgres.indexes import GinIndex
+from django.db import migrations
+
+INDEX = GinIndex(fields=['vector'], name='bicycles_search_vector_gin')
+
+
+def add_gin_index(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    # Databases migrated before this had the same index created by hand in 0027
+    schema_editor.execute(f"DROP INDEX IF EXISTS {INDEX.name}")
+    schema_editor.add_index(apps.get_model("bicycles", "ProductSearchDocument"), INDEX)
+
+
+def remove_gin_index(apps, schema_editor):
+    if schema_editor.connection.vendor == "postgresql":
+        schema_editor.remove_index(apps.get_model("bicycles", "ProductSearchDocument"), INDEX)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bicycles', '0028_listing_sort_indexes'),
+    ]
+
+    operations = [
+        migrations.SeparateDatabaseAndState(
+            state_operations=[migrations.AddIndex(model_name='productsearchdocument', index=INDEX)],
+            database_operations=[migrations.RunPython(add_gin_index, remove_gin_index)],
+        ),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 5.2.4 on 2026-10-18 14:21
+
+from django.db import migrations, models
+
+
+def track_entered_stock(apps, schema_editor):
+    # Products that already have stock entered are tracked from day one
+    apps.get_model("bicycles", "Product").objects.filter(stock__gt=0).update(track_stock=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bicycles', '0029_search_vector_gin_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='product',
+            name='track_stock',
+            field=models.BooleanField(default=False, help_text='Limit PayU checkouts to stock (holds). Turn on once stock is entered for this product.'),
+        ),
+        migrations.RunPython(track_entered_stock, migrations.RunPython.noop),
+    ]
@@ -1,8 +1,11 @@
-from django.db import models
+from django.db import models, transaction
 from django_ckeditor_5.fields import CKEditor5Field
 from django.core.validators import RegexValidator
-from django.db.models import UniqueConstraint
+from django.db.models import UniqueConstraint, Q, Value, F, OuterRef, Subquery
+from django.db.models.functions import Coalesce, Concat, Substr
 from django.conf import settings
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVectorField
 
 
 
@@ -19,6 +22,11 @@ class Category(models.Model):
     
     parent = models.ForeignKey('self', on_delete=models.CASCADE, null=True, blank=True, related_name='children')
     is_parent = models.BooleanField(default=False)
+    # Materialized path of ancestor ids, e.g. "3/17/42/" (maintained in save()).
+    # Subtree of X = path__startswith=X.path -> ek hi indexed prefix filter.
+    path = models.CharField(max_length=255, db_index=True, editable=False, default="")
+    # Canonical URL ("/parent/child/"), recomputed on slug/parent change
+    url_path = models.CharField(max_length=255, editable=False, default="")
 
     class Meta:
         verbose_name_plural = "Categories"
@@ -26,7 +34,57 @@ class Category(models.Model):
     def __str__(self):
         return self.name
 
+    def save(self, *args, **kwargs):
+        old_path = self.path
+        old_url_path = self.url_path
+        parent_path, parent_slug = "", None
+        if self.parent_id:
+            # Read from DB, an in-memory parent may carry a stale path/slug
+            parent_path, parent_slug = (
+                Category.objects.filter(pk=self.parent_id).values_list("path", "slug").first() or ("", None)
+            )
+            if old_path and parent_path.startswith(old_path):
+                raise ValueError("A category cannot be moved under itself or one of its descendants.")
+
+        self.url_path = f"/{parent_slug}/{self.slug}/" if parent_slug else f"/{self.slug}/"
+        if kwargs.get("update_fields") is not None:
+            kwargs["update_fields"] = {*kwargs["update_fields"], "url_path"}
+
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+            self._sync_path(old_path, parent_path)
+            if self.url_path != old_url_path:
+                self._sync_url_paths()
+
+    def _sync_path(self, old_path, parent_path):
+        new_path = f"{parent_path}{self.pk}/"
+        if new_path != old_path:
+            Category.objects.filter(pk=self.pk).update(path=new_path)
+            self.path = new_path
+            if old_path:
+                # Moved: rewrite the whole subtree's prefix in one UPDATE
+                Category.objects.filter(path__startswith=old_path).exclude(pk=self.pk).update(
+                    path=Concat(Value(new_path), Substr("path", len(old_path) + 1),
+                                output_field=models.CharField())
+                )
+
+    def _sync_url_paths(self):
+        """Slug/parent changed: bulk-rewrite child category URLs and their products' URLs."""
+        Category.objects.filter(parent=self).update(
+            url_path=Concat(Value(f"/{self.slug}/"), F("slug"), Value("/"), output_field=models.CharField())
+        )
+        category_url = Category.objects.filter(pk=OuterRef("category_id")).values("url_path")[:1]
+        Product.objects.filter(Q(category=self) | Q(category__parent=self)).update(
+            url_path=Concat(Subquery(category_url), F("slug"), Value("/"), output_field=models.CharField())
+        )
+
+    def get_descendants(self, include_self=True):
+        qs = Category.objects.filter(path__startswith=self.path)
+        return qs if include_self else qs.exclude(pk=self.pk)
+
     def get_absolute_url(self):
+        if self.url_path:
+            return self.url_path
         if self.parent:
             return f"/{self.parent.slug}/{self.slug}/"
         else:
@@ -34,14 +92,19 @@ class Category(models.Model):
 
     @property
     def total_products(self):
-        # Import lazily to avoid circular import
-        from .models import Product
+        # Self + ALL descendants, single query
+        return Product.objects.filter(category__path__startswith=self.path).count()
 
-        # Collect all child categories including self
-        categories = [self]
-        categories += list(self.children.all())
 
-        return Product.objects.filter(category__in=categories).count()
+def subtree_q(categories, prefix="category__"):
+    """
+    Q matching rows whose category lies in the subtree of any of `categories`
+    (self included). Use prefix="" to filter Category itself.
+    """
+    q = Q(pk__in=[])
+    for path in {c.path for c in categories}:
+        q |= Q(**{f"{prefix}path__startswith": path})
+    return q
 
 
 class Specification(models.Model):
@@ -64,6 +127,13 @@ class ProductSpecification(models.Model):
             UniqueConstraint(fields=['product', 'specification'], name='unique_product_spec')
         ]
 
+# Denormalized review stats, written only by bicycles.ratings
+RATING_FIELDS = ["rating_avg", "rating_count"] + [f"rating_{s}_count" for s in range(1, 6)]
+# Columns maintained by conditional UPDATEs elsewhere; a full Product.save()
+# on an existing row leaves them alone
+SAVE_EXCLUDED_FIELDS = {"reserved", *RATING_FIELDS}
+
+
 class Product(models.Model):
     title = models.CharField(max_length=200)
     slug = models.SlugField(unique=True)
@@ -91,6 +161,13 @@ class Product(models.Model):
     age_group = models.CharField(max_length=100, blank=True)
     image = models.ImageField(upload_to='products/', blank=True, null=True)
     stock = models.PositiveIntegerField(default=0)
+    track_stock = models.BooleanField(
+        default=False,
+        help_text="Limit PayU checkouts to stock (holds). Turn on once stock is entered for this product.",
+    )
+    # Units held by pending PayU checkouts (orders/stock.py); only changed via
+    # conditional UPDATEs, never by a full save() (see save())
+    reserved = models.PositiveIntegerField(default=0, editable=False)
     weight = models.PositiveIntegerField(default=0)
     shipping_charge = models.DecimalField(max_digits=10, decimal_places=2, default=0.00, help_text="Shipping cost for this product")
     is_available = models.BooleanField(default=True)
@@ -103,14 +180,61 @@ class Product(models.Model):
     meta_title = models.CharField(max_length=60, blank=True, null=True)
     meta_description = models.TextField(max_length=160, blank=True, null=True)
     keywords = models.TextField(blank=True, null=True)
+    # Denormalized review stats -- maintained by bicycles.ratings (ProductReview
+    # save/delete signals + `manage.py reconcile_ratings`), never edited by hand
+    rating_avg = models.DecimalField(max_digits=3, decimal_places=2, default=0, editable=False)
+    rating_count = models.PositiveIntegerField(default=0, editable=False)
+    rating_1_count = models.PositiveIntegerField(default=0, editable=False)
+    rating_2_count = models.PositiveIntegerField(default=0, editable=False)
+    rating_3_count = models.PositiveIntegerField(default=0, editable=False)
+    rating_4_count = models.PositiveIntegerField(default=0, editable=False)
+    rating_5_count = models.PositiveIntegerField(default=0, editable=False)
+    # Canonical URL (category url_path + slug), see save() / Category._sync_url_paths
+    url_path = models.CharField(max_length=255, editable=False, default="")
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    class Meta:
+        indexes = [
+            # Shop default sort: available products, newest first. Partial index:
+            # Django emits a bare `WHERE is_available`, which a partial index
+            # matches on both PostgreSQL and SQLite (a composite one only on PG)
+            models.Index(fields=['created_at'], condition=models.Q(is_available=True), name='bicycles_avail_created_idx'),
+            # Other shop sorts (bicycles.views.SHOP_SORTS): keyset pages seek
+            # into these instead of sorting every available product
+            models.Index(fields=['title', 'id'], condition=models.Q(is_available=True), name='bicycles_avail_title_idx'),
+            models.Index(fields=['rating_avg', 'id'], condition=models.Q(is_available=True), name='bicycles_avail_rating_idx'),
+            models.Index(
+                Coalesce('discount_price', 'price'), 'id',
+                condition=models.Q(is_available=True), name='bicycles_avail_price_idx',
+            ),
+        ]
 
     def __str__(self):
         return self.sku
+
+    def save(self, *args, **kwargs):
+        category_url = Category.objects.filter(pk=self.category_id).values_list("url_path", flat=True).first() or ""
+        self.url_path = f"{category_url}{self.slug}/"
+        if kwargs.get("update_fields") is not None:
+            kwargs["update_fields"] = {*kwargs["update_fields"], "url_path"}
+        elif self.pk is not None and not self._state.adding and not kwargs.get("force_insert"):
+            # Admin edit must not overwrite a concurrently changed hold counter
+            # or rating columns (stale in-memory copies; see bicycles.ratings)
+            kwargs["update_fields"] = [
+                f.name for f in self._meta.concrete_fields
+                if not f.primary_key and f.name not in SAVE_EXCLUDED_FIELDS
+            ]
+        super().save(*args, **kwargs)
+
+    @property
+    def available_stock(self):
+        return max(self.stock - self.reserved, 0)
     
     def get_absolute_url(self):
+        # Stored column; computed fallback only for unsaved instances
+        if self.url_path:
+            return self.url_path
         if self.category.parent:
             return f'/{self.category.parent.slug}/{self.category.slug}/{self.slug}/'
         else:
@@ -147,11 +271,15 @@ class Product(models.Model):
             return 0
     @property
     def average_rating(self):
-        reviews = self.reviews.all()
-        if reviews.exists():
-            avg = reviews.aggregate(models.Avg('rating'))['rating__avg']
-            return round(avg, 2)
+        # Stored column, no review queries
+        if self.rating_count:
+            return round(float(self.rating_avg), 2)
         return 0
+
+    @property
+    def rating_histogram(self):
+        """{stars: count} for 1..5 stars."""
+        return {stars: getattr(self, f"rating_{stars}_count") for stars in range(1, 6)}
         
 class ProductImage(models.Model):
     product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='gallery')
@@ -193,4 +321,28 @@ class ProductAnswer(models.Model):
     class Meta:
         constraints = [
             models.UniqueConstraint(fields=['product', 'question'], name='unique_product_question')
-        ]
\ No newline at end of file
+        ]
+
+class ProductSearchDocument(models.Model):
+    """
+    Plain-text search document per product, maintained by bicycles.search
+    (product/category save signals + `manage.py rebuild_search_index`).
+    PostgreSQL: `vector` (weighted tsvector, GIN). SQLite: mirrored into the
+    bicycles_product_fts FTS5 table; `vector` stays NULL there.
+    """
+    product = models.OneToOneField(Product, on_delete=models.CASCADE, primary_key=True, related_name='search_document')
+    title = models.TextField(blank=True)
+    sku = models.TextField(blank=True)
+    categories = models.TextField(blank=True)   # category + ancestor names
+    body = models.TextField(blank=True)         # short_desc + description, HTML stripped
+    vector = SearchVectorField(null=True, editable=False)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            # PostgreSQL only (migration 0029 skips it elsewhere)
+            GinIndex(fields=['vector'], name='bicycles_search_vector_gin'),
+        ]
+
+    def __str__(self):
+        return f"Search document for {self.product_id}"
@@ -0,0 +1,67 @@
+# /bicycles/ratings.py
+"""
+Product rating aggregates (rating_avg, rating_count, 1-5 star histogram).
+
+Listing/detail pages sirf Product ke stored columns padhte hain; reviews table
+sirf yahan se read hoti hai -- review save/delete par (signal) aur
+`manage.py reconcile_ratings` se.
+"""
+from collections import defaultdict
+from decimal import Decimal, ROUND_HALF_UP
+
+from django.db import transaction
+from django.db.models import Count
+
+from quesecrides.cache_versions import bump_version
+
+from .catalog import CATALOG_NAMESPACE
+from .models import RATING_FIELDS, Product, ProductReview
+
+STARS = range(1, 6)
+
+
+def _stats(histogram):
+    """{stars: count} -> dict of Product rating column values."""
+    count = sum(histogram.values())
+    total = sum(stars * n for stars, n in histogram.items())
+    avg = (Decimal(total) / count).quantize(Decimal("0.01"), rounding=ROUND_HALF_UP) if count else Decimal("0")
+    values = {"rating_avg": avg, "rating_count": count}
+    values.update({f"rating_{s}_count": histogram.get(s, 0) for s in STARS})
+    return values
+
+
+def refresh_product_rating(product_id):
+    """Recompute one product's columns from its reviews (row-locked, one aggregate)."""
+    with transaction.atomic():
+        # Lock the product row so concurrent review writes serialize here
+        list(Product.objects.select_for_update().filter(pk=product_id).values_list("pk", flat=True))
+        histogram = dict(
+            ProductReview.objects.filter(product_id=product_id)
+            .values_list("rating")
+            .annotate(n=Count("id"))
+            .order_by()
+        )
+        Product.objects.filter(pk=product_id).update(**_stats(histogram))
+        transaction.on_commit(lambda: bump_version(CATALOG_NAMESPACE))
+
+
+def reconcile_ratings():
+    """Recompute every product from one grouped query. Returns products changed."""
+    histograms = defaultdict(dict)
+    rows = ProductReview.objects.values_list("product_id", "rating").annotate(n=Count("id")).order_by()
+    for product_id, rating, n in rows:
+        histograms[product_id][rating] = n
+
+    changed = []
+    for product in Product.objects.only("pk", *RATING_FIELDS).iterator():
+        values = _stats(histograms.get(product.pk, {}))
+        if any(getattr(product, field) != value for field, value in values.items()):
+            for field, value in values.items():
+                setattr(product, field, value)
+            changed.append(product)
+
+    with transaction.atomic():
+        Product.objects.bulk_update(changed, RATING_FIELDS, batch_size=500)
+    if changed:
+        transaction.on_commit(lambda: bump_version(CATALOG_NAMESPACE))
+    return len(changed)
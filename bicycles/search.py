@@ -0,0 +1,316 @@
+# /bicycles/search.py
+"""
+Product full-text search.
+
+Har product ka ek ProductSearchDocument: title, SKU, category (+ parent)
+names aur short_desc/description ka HTML-stripped text. Ranking weights:
+title/SKU > categories > body.
+
+  PostgreSQL -> document.vector (setweight(to_tsvector(..)) A/A/B/C), GIN
+                index; query = prefix tsquery ("kid:* & cyc:*"), ts_rank order
+  SQLite     -> FTS5 shadow table bicycles_product_fts (rowid = product id),
+                MATCH '"kid"* "cyc"*', bm25() order
+  other      -> icontains over the document columns, newest first
+
+Documents product/category save par (signals, on_commit) refresh hote hain;
+bulk .update() wale raste (e.g. Category._sync_url_paths) names nahi badalte.
+Repair/backfill: `manage.py rebuild_search_index`.
+
+Search page ranked ids ko normalized query (sorted distinct terms) + "catalog"
+stamp par cache karta hai (cached_search: ranked ids + total): page 2, 3.. wahi ranking reuse
+karte hain, sirf visible cards load hote hain. Hit/miss counters shared cache
+me: `manage.py search_cache_stats`.
+"""
+import hashlib
+import html
+import re
+
+from django.contrib.postgres.search import SearchQuery, SearchRank, SearchVector
+from django.core.cache import cache
+from django.db import connection, transaction
+from django.db.models import F, Q
+from django.utils.html import strip_tags
+
+from quesecrides.cache_versions import bump_version, versioned_key
+
+from .catalog import CATALOG_NAMESPACE
+from .models import Category, Product, ProductSearchDocument
+
+FTS_TABLE = "bicycles_product_fts"
+SEARCH_CONFIG = "simple"            # product names / SKUs: no stemming, no stop words
+SEARCH_MAX_RESULTS = 500
+SEARCH_CACHE_TIMEOUT = 60 * 30
+SEARCH_STATS = ("hits", "misses")
+# (title, sku, categories, body) -- bm25 column weights, same order as PG A/A/B/C
+FTS_WEIGHTS = (10.0, 10.0, 4.0, 1.0)
+
+_TERM_RE = re.compile(r"\w+", re.UNICODE)
+_SPACE_RE = re.compile(r"\s+")
+
+
+def _models(apps=None):
+    # Migrations pass their historical app registry
+    if apps is None:
+        return Product, Category, ProductSearchDocument
+    return (apps.get_model("bicycles", "Product"), apps.get_model("bicycles", "Category"),
+            apps.get_model("bicycles", "ProductSearchDocument"))
+
+
+def plain_text(value):
+    """CKEditor HTML -> single-spaced text."""
+    return _SPACE_RE.sub(" ", html.unescape(strip_tags(value or ""))).strip()
+
+
+def search_terms(query):
+    """Lower-cased word tokens of a user query (punctuation dropped)."""
+    return _TERM_RE.findall((query or "").lower())
+
+
+def backend():
+    if connection.vendor == "postgresql":
+        return "postgresql"
+    if connection.vendor == "sqlite" and fts_available():
+        return "sqlite"
+    return "basic"
+
+
+_fts_tables = {}
+
+
+def fts_available():
+    """FTS5 shadow table present (created by the bicycles migration when SQLite has FTS5)."""
+    name = str(connection.settings_dict["NAME"])
+    if not _fts_tables.get(name):
+        with connection.cursor() as cursor:
+            _fts_tables[name] = FTS_TABLE in connection.introspection.table_names(cursor)
+    return _fts_tables[name]
+
+
+# ---------------- Maintenance ----------------
+
+def refresh_search_documents(product_ids=None, apps=None):
+    """
+    (Re)build documents for `product_ids` (None = every product). Products that
+    no longer exist lose their document. Returns documents written.
+    """
+    Product, Category, ProductSearchDocument = _models(apps)
+    products = Product.objects.all()
+    if product_ids is not None:
+        product_ids = list(product_ids)
+        if not product_ids:
+            return 0
+        products = products.filter(pk__in=product_ids)
+    rows = list(products.values("id", "title", "sku", "short_desc", "description", "category__path"))
+
+    # Every ancestor named in the rows' category paths, one query
+    ancestor_ids = {int(pk) for row in rows for pk in (row["category__path"] or "").split("/") if pk}
+    names = dict(Category.objects.filter(pk__in=ancestor_ids).values_list("id", "name"))
+
+    documents = [
+        ProductSearchDocument(
+            product_id=row["id"],
+            title=row["title"] or "",
+            sku=row["sku"] or "",
+            categories=" ".join(
+                names[int(pk)] for pk in (row["category__path"] or "").split("/") if pk and int(pk) in names
+            ),
+            body=plain_text(f"{row['short_desc'] or ''} {row['description'] or ''}"),
+        )
+        for row in rows
+    ]
+    written = [doc.product_id for doc in documents]
+
+    with transaction.atomic():
+        if product_ids is None:
+            ProductSearchDocument.objects.exclude(product_id__in=written).delete()
+        if documents:
+            ProductSearchDocument.objects.bulk_create(
+                documents,
+                update_conflicts=True,
+                unique_fields=["product"],
+                update_fields=["title", "sku", "categories", "body"],
+            )
+        _sync_index(ProductSearchDocument, product_ids, documents)
+    if apps is None:
+        # The stamp is also bumped by the save itself, but that can run before
+        # this refresh -> a search in between would cache the old ranking
+        bump_version(CATALOG_NAMESPACE)
+    return len(documents)
+
+
+def _sync_index(ProductSearchDocument, product_ids, documents):
+    if connection.vendor == "postgresql":
+        docs = ProductSearchDocument.objects.all()
+        if product_ids is not None:
+            docs = docs.filter(product_id__in=product_ids)
+        docs.update(vector=(
+            SearchVector("title", weight="A", config=SEARCH_CONFIG)
+            + SearchVector("sku", weight="A", config=SEARCH_CONFIG)
+            + SearchVector("categories", weight="B", config=SEARCH_CONFIG)
+            + SearchVector("body", weight="C", config=SEARCH_CONFIG)
+        ))
+    elif connection.vendor == "sqlite" and fts_available():
+        with connection.cursor() as cursor:
+            if product_ids is None:
+                cursor.execute(f"DELETE FROM {FTS_TABLE}")
+            else:
+                cursor.executemany(f"DELETE FROM {FTS_TABLE} WHERE rowid = %s", [(pk,) for pk in product_ids])
+            cursor.executemany(
+                f"INSERT INTO {FTS_TABLE} (rowid, title, sku, categories, body) VALUES (%s, %s, %s, %s, %s)",
+                [(d.product_id, d.title, d.sku, d.categories, d.body) for d in documents],
+            )
+
+
+def forget_search_documents(product_ids):
+    """Deleted products: the document cascades, the FTS5 row doesn't."""
+    if connection.vendor == "sqlite" and product_ids and fts_available():
+        with connection.cursor() as cursor:
+            cursor.executemany(f"DELETE FROM {FTS_TABLE} WHERE rowid = %s", [(pk,) for pk in product_ids])
+
+
+# ---------------- Query ----------------
+
+def _pg_query(terms):
+    return SearchQuery(" & ".join(f"{term}:*" for term in terms), search_type="raw", config=SEARCH_CONFIG)
+
+
+def _search_pg(terms, limit):
+    query = _pg_query(terms)
+    return list(
+        ProductSearchDocument.objects
+        .filter(vector=query, product__is_available=True)
+        .annotate(rank=SearchRank(F("vector"), query))
+        .order_by("-rank", "-product_id")
+        .values_list("product_id", flat=True)[:limit]
+    )
+
+
+def _count_pg(terms):
+    return ProductSearchDocument.objects.filter(vector=_pg_query(terms), product__is_available=True).count()
+
+
+def _fts5_sql(select, terms, tail=""):
+    qn = connection.ops.quote_name
+    product = Product._meta
+    match = " ".join('"{}"*'.format(term.replace('"', '""')) for term in terms)
+    sql = f"""
+        SELECT {select} FROM {FTS_TABLE}
+        JOIN {qn(product.db_table)} p ON p.{qn('id')} = {FTS_TABLE}.rowid
+        WHERE {FTS_TABLE} MATCH %s AND p.{qn('is_available')} = %s
+        {tail}
+    """
+    return sql, [match, True]
+
+
+def _search_fts5(terms, limit):
+    weights = ", ".join(str(w) for w in FTS_WEIGHTS)
+    sql, params = _fts5_sql(
+        f"{FTS_TABLE}.rowid", terms,
+        f"ORDER BY bm25({FTS_TABLE}, {weights}), {FTS_TABLE}.rowid DESC LIMIT %s",
+    )
+    with connection.cursor() as cursor:
+        cursor.execute(sql, [*params, limit])
+        return [row[0] for row in cursor.fetchall()]
+
+
+def _count_fts5(terms):
+    sql, params = _fts5_sql("COUNT(*)", terms)
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        return cursor.fetchone()[0]
+
+
+def _basic_docs(terms):
+    docs = ProductSearchDocument.objects.filter(product__is_available=True)
+    for term in terms:
+        docs = docs.filter(
+            Q(title__icontains=term) | Q(sku__icontains=term)
+            | Q(categories__icontains=term) | Q(body__icontains=term)
+        )
+    return docs
+
+
+def _search_basic(terms, limit):
+    return list(_basic_docs(terms).order_by("-product_id").values_list("product_id", flat=True)[:limit])
+
+
+def _count_basic(terms):
+    return _basic_docs(terms).count()
+
+
+# backend -> (ranked ids, match count)
+_BACKENDS = {
+    "postgresql": (_search_pg, _count_pg),
+    "sqlite": (_search_fts5, _count_fts5),
+    "basic": (_search_basic, _count_basic),
+}
+
+
+def search_product_ids(query, limit=SEARCH_MAX_RESULTS):
+    """Available product ids matching every term of `query`, best match first."""
+    terms = search_terms(query)
+    if not terms:
+        return []
+    return _BACKENDS[backend()][0](terms, limit)
+
+
+def search_match_count(query):
+    """How many available products match `query` (not capped at SEARCH_MAX_RESULTS)."""
+    terms = search_terms(query)
+    if not terms:
+        return 0
+    return _BACKENDS[backend()][1](terms)
+
+
+# ---------------- Result cache ----------------
+
+def normalize_query(query):
+    """Sorted distinct terms: "Kids  cycle", "cycle KIDS!" -> "cycle kids" (AND semantics, same results)."""
+    return " ".join(sorted(set(search_terms(query))))
+
+
+def _stats_key(name):
+    return f"search:stats:{name}"
+
+
+def _count(name):
+    key = _stats_key(name)
+    cache.add(key, 0, timeout=None)
+    try:
+        cache.incr(key)
+    except ValueError:  # evicted between add() and incr()
+        cache.set(key, 1, timeout=None)
+
+
+def cached_search(query):
+    """
+    (ranked ids, total) for the search page, cached per normalized query
+    under the catalog stamp. The ranked list (best SEARCH_MAX_RESULTS) is one
+    entry, so every page of a query shares it; `total` counts every match
+    (a COUNT runs only when the list hit the cap).
+    """
+    normalized = normalize_query(query)
+    if not normalized:
+        return [], 0
+    digest = hashlib.sha1(normalized.encode()).hexdigest()  # cache-key safe (spaces, unicode)
+    key = versioned_key(CATALOG_NAMESPACE, "search_results", digest)
+    result = cache.get(key)
+    if result is not None:
+        _count("hits")
+        return result
+    _count("misses")
+    ids = search_product_ids(normalized, SEARCH_MAX_RESULTS)
+    total = search_match_count(normalized) if len(ids) >= SEARCH_MAX_RESULTS else len(ids)
+    result = (ids, total)
+    cache.set(key, result, SEARCH_CACHE_TIMEOUT)
+    return result
+
+
+def search_cache_stats():
+    """{"hits": n, "misses": n} since the last reset (all workers sharing the cache)."""
+    values = cache.get_many([_stats_key(name) for name in SEARCH_STATS])
+    return {name: values.get(_stats_key(name), 0) for name in SEARCH_STATS}
+
+
+def reset_search_cache_stats():
+    cache.delete_many([_stats_key(name) for name in SEARCH_STATS])
@@ -0,0 +1,64 @@
+# /bicycles/signals.py
+"""
+Product/Category badle to catalog version stamp bump karo (cached aggregates invalidate).
+Review save/delete par Product ke rating columns recompute karo.
+Product/Category save par search documents refresh karo (bicycles.search).
+"""
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete
+
+from quesecrides.cache_versions import bump_version
+
+from .catalog import CATALOG_NAMESPACE
+from .models import Category, Product, ProductReview
+from .ratings import refresh_product_rating
+from .search import forget_search_documents, refresh_search_documents
+
+CATALOG_MODELS = (Category, Product)
+
+
+def bump_catalog_version(sender, **kwargs):
+    transaction.on_commit(lambda: bump_version(CATALOG_NAMESPACE))
+
+
+for _model in CATALOG_MODELS:
+    post_save.connect(bump_catalog_version, sender=_model, dispatch_uid=f"catalog-save-{_model.__name__}")
+    post_delete.connect(bump_catalog_version, sender=_model, dispatch_uid=f"catalog-delete-{_model.__name__}")
+
+
+def sync_product_rating(sender, instance, **kwargs):
+    refresh_product_rating(instance.product_id)
+
+
+post_save.connect(sync_product_rating, sender=ProductReview, dispatch_uid="rating-save")
+post_delete.connect(sync_product_rating, sender=ProductReview, dispatch_uid="rating-delete")
+
+
+def refresh_product_search(sender, instance, **kwargs):
+    product_id = instance.pk
+    transaction.on_commit(lambda: refresh_search_documents([product_id]))
+
+
+def drop_product_search(sender, instance, **kwargs):
+    # After commit: a rolled-back delete must keep the product searchable
+    product_id = instance.pk
+    transaction.on_commit(lambda: forget_search_documents([product_id]))
+
+
+def refresh_category_search(sender, instance, **kwargs):
+    # Name change shows up in every product of the subtree; path is final after commit
+    category_id = instance.pk
+
+    def refresh():
+        path = Category.objects.filter(pk=category_id).values_list("path", flat=True).first()
+        if path:
+            refresh_search_documents(
+                Product.objects.filter(category__path__startswith=path).values_list("id", flat=True)
+            )
+
+    transaction.on_commit(refresh)
+
+
+post_save.connect(refresh_product_search, sender=Product, dispatch_uid="search-product-save")
+post_delete.connect(drop_product_search, sender=Product, dispatch_uid="search-product-delete")
+post_save.connect(refresh_category_search, sender=Category, dispatch_uid="search-category-save")
@@ -0,0 +1,173 @@
+# /bicycles/suggest.py
+"""
+In-memory index for the search dropdown (search_suggest).
+
+Har available product ke title/SKU words ko lower-case tokens me tod kar
+token -> product ids (newest first) postings banti hain, aur har product ka
+JSON payload (title, sku, price, url, image) pehle se ready rehta hai.
+Lookup = query ke har term ka word-prefix match, sab terms AND:
+
+  - sorted distinct tokens par bisect -> har term ke prefix wale tokens
+  - sabse kam postings wala term candidates deta hai (prefix sums se size
+    O(1) me); baaki similar-size terms ka set intersection (C me)
+  - bahut broad prefixes ("t", "1"): newest-first candidates par product ke
+    tokens check; `limit` milte hi ruk jao
+  - 1-2 letter single-term queries (pehle keystrokes, sabse zyada products
+    match) ke top results build time par hi precompute
+
+Index process memory me rehta hai (wsgi.py worker start par warm karta hai)
+aur "catalog" version stamp badalne par agle call par rebuild hota hai
+(coupons.index jaisa). Warm lookup me koi DB query nahi, sirf ek cache.get.
+"""
+import heapq
+import threading
+from bisect import bisect_left
+from collections import defaultdict
+from itertools import accumulate
+
+from quesecrides.cache_versions import get_version
+
+from .cards import load_cards
+from .catalog import CATALOG_NAMESPACE
+from .models import Product
+from .search import search_terms
+
+SUGGEST_LIMIT = 8
+SHORT_PREFIX = 2  # single-term prefixes up to this length are precomputed
+UNION_TOKENS = 16  # a multi-token term is intersected as a set only up to this many tokens
+
+
+def unique_sorted(ids):
+    """Drop repeats from a sorted stream (a product under several merged tokens)."""
+    last = None
+    for product_id in ids:
+        if product_id != last:
+            last = product_id
+            yield product_id
+
+
+def suggestion_payload(card):
+    return {
+        "title": card.title,
+        "sku": card.sku or "",
+        "price": float(card.discount_price) if card.discount_price else 0.0,
+        "url": card.url,
+        "image": card.image.url,
+    }
+
+
+class SuggestIndex:
+    """
+    entries: iterable of (product_id, title, sku, payload). Results are
+    ordered newest (highest id) first, like the old `-id` query.
+    """
+
+    def __init__(self, entries, top_k=SUGGEST_LIMIT):
+        postings = defaultdict(set)
+        self.payloads = {}
+        self.product_tokens = {}
+        for product_id, title, sku, payload in entries:
+            tokens = set(search_terms(f"{title} {sku}"))
+            for token in tokens:
+                postings[token].add(product_id)
+            self.payloads[product_id] = payload
+            self.product_tokens[product_id] = tuple(tokens)
+
+        self.tokens = sorted(postings)
+        self.postings = {token: sorted(ids, reverse=True) for token, ids in postings.items()}
+        self.posting_sets = {token: frozenset(ids) for token, ids in postings.items()}
+        # offsets[i] = postings in tokens[:i] -> any prefix range's size in O(1)
+        self.offsets = [0, *accumulate(len(self.postings[token]) for token in self.tokens)]
+
+        short = defaultdict(set)
+        for token, ids in self.postings.items():
+            for n in range(1, min(SHORT_PREFIX, len(token)) + 1):
+                short[token[:n]].update(ids[:top_k])
+        self.top_short = {prefix: heapq.nlargest(top_k, ids) for prefix, ids in short.items()}
+        self.top_k = top_k
+
+    def __len__(self):
+        return len(self.payloads)
+
+    def _token_range(self, prefix):
+        start = bisect_left(self.tokens, prefix)
+        return start, bisect_left(self.tokens, prefix + "\uffff", start)
+
+    def _ids(self, start, end):
+        if end - start == 1:
+            return self.posting_sets[self.tokens[start]]
+        return set().union(*(self.posting_sets[token] for token in self.tokens[start:end]))
+
+    def _has_prefix(self, product_id, term):
+        return any(token.startswith(term) for token in self.product_tokens[product_id])
+
+    def lookup(self, query, limit=SUGGEST_LIMIT):
+        """Product ids whose title/SKU words start with every term of `query`."""
+        terms = search_terms(query)  # "KC-100" -> ["kc", "100"]
+        if not terms:
+            return []
+        if len(terms) == 1 and len(terms[0]) <= SHORT_PREFIX and limit <= self.top_k:
+            return self.top_short.get(terms[0], [])[:limit]
+
+        # Rarest term first (postings count from the prefix sums)
+        ranges = {term: self._token_range(term) for term in set(terms)}
+        sizes = {term: self.offsets[end] - self.offsets[start] for term, (start, end) in ranges.items()}
+        driver, *others = sorted(ranges, key=sizes.get)
+        start, end = ranges[driver]
+
+        # Whole-token terms and narrow prefixes -> set intersection (in C);
+        # broad prefixes ("s", "1": many tokens, most products) are checked
+        # per candidate instead of building their union
+        intersect = [
+            term for term in others
+            if ranges[term][1] - ranges[term][0] == 1
+            or (ranges[term][1] - ranges[term][0] <= UNION_TOKENS and sizes[term] <= 2 * sizes[driver])
+        ]
+        broad = [term for term in others if term not in intersect]
+        if intersect:
+            ids = self._ids(start, end)
+            for term in intersect:
+                ids = ids & self._ids(*ranges[term])
+            if not broad:
+                return heapq.nlargest(limit, ids)
+            candidates = sorted(ids, reverse=True)
+        else:
+            merged = heapq.merge(*(self.postings[token] for token in self.tokens[start:end]), reverse=True)
+            candidates = unique_sorted(merged)
+
+        results = []
+        for product_id in candidates:
+            if all(self._has_prefix(product_id, term) for term in broad):
+                results.append(product_id)
+                if len(results) >= limit:
+                    break
+        return results
+
+    def suggest(self, query, limit=SUGGEST_LIMIT):
+        return [self.payloads[product_id] for product_id in self.lookup(query, limit)]
+
+
+def build_suggest_index():
+    """One card query over available products."""
+    cards = load_cards(Product.objects.filter(is_available=True))
+    return SuggestIndex((card.id, card.title, card.sku, suggestion_payload(card)) for card in cards)
+
+
+_state = {"version": None, "index": None}
+_lock = threading.Lock()
+
+
+def get_suggest_index():
+    """Process-local index; one cache.get (catalog stamp) per call when warm."""
+    version = get_version(CATALOG_NAMESPACE)
+    if _state["index"] is not None and _state["version"] == version:
+        return _state["index"]
+    with _lock:
+        if _state["index"] is None or _state["version"] != version:
+            _state["index"], _state["version"] = build_suggest_index(), version
+    return _state["index"]
+
+
+def warm_suggest_index():
+    """Build at worker start so the first keystroke doesn't pay for it."""
+    return get_suggest_index()
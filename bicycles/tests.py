@@ -1,3 +1,450 @@
-from django.test import TestCase
+from unittest import mock
 
-# Create your tests here.
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+
+from accounts.models import CustomUser
+from quesecrides.keyset import KeysetPage, encode_cursor
+from quesecrides.testing import LOCAL_STORAGES, make_product
+
+from .cards import ProductCard, card_rows, cards_by_ids, page_cards, page_cards_by_ids
+from .catalog import category_product_counts
+from .models import Category, Product, ProductReview, ProductSearchDocument, subtree_q
+from .search import (
+    normalize_query, refresh_search_documents, reset_search_cache_stats, search_cache_stats, search_match_count,
+    search_product_ids,
+)
+from .suggest import SuggestIndex, get_suggest_index
+from .views import SHOP_SORTS
+
+
+class CategoryTreeTests(TestCase):
+
+    def setUp(self):
+        self.bikes = Category.objects.create(name="Bicycles", slug="bicycles")
+        self.kids = Category.objects.create(name="Kids", slug="kids", parent=self.bikes)
+        self.girls = Category.objects.create(name="Girls", slug="girls", parent=self.kids)
+        self.parts = Category.objects.create(name="Parts", slug="parts")
+
+    def paths(self):
+        return dict(Category.objects.values_list("slug", "path"))
+
+    def test_create_sets_ancestor_path(self):
+        b, k, g = self.bikes.pk, self.kids.pk, self.girls.pk
+        self.assertEqual(self.paths(), {
+            "bicycles": f"{b}/", "kids": f"{b}/{k}/", "girls": f"{b}/{k}/{g}/", "parts": f"{self.parts.pk}/",
+        })
+        self.assertEqual(self.girls.path, f"{b}/{k}/{g}/")  # in-memory copy too
+
+    def test_move_rewrites_descendant_paths(self):
+        self.kids.parent = self.parts
+        self.kids.save()
+        p, k, g = self.parts.pk, self.kids.pk, self.girls.pk
+        self.assertEqual(self.paths()["kids"], f"{p}/{k}/")
+        self.assertEqual(self.paths()["girls"], f"{p}/{k}/{g}/")
+        self.assertEqual(self.paths()["bicycles"], f"{self.bikes.pk}/")
+
+        self.kids.parent = None
+        self.kids.save()
+        self.assertEqual(self.paths()["girls"], f"{k}/{g}/")
+
+    def test_move_under_own_descendant_is_rejected(self):
+        for new_parent in (self.girls, self.bikes):
+            self.bikes.parent = new_parent
+            with self.assertRaises(ValueError):
+                self.bikes.save()
+        self.assertEqual(self.paths()["girls"], f"{self.bikes.pk}/{self.kids.pk}/{self.girls.pk}/")
+
+    def test_subtree_q_matches_self_and_descendants(self):
+        def slugs(*categories):
+            return set(Category.objects.filter(subtree_q(categories, prefix="")).values_list("slug", flat=True))
+
+        self.assertEqual(slugs(self.kids), {"kids", "girls"})
+        self.assertEqual(slugs(self.bikes, self.girls), {"bicycles", "kids", "girls"})
+        self.assertEqual(slugs(self.girls, self.parts), {"girls", "parts"})
+        self.assertEqual(slugs(), set())
+
+        bell = make_product(self.girls, "BELL-1", "Bell")
+        make_product(self.parts, "CHAIN-1", "Chain")
+        self.assertEqual(list(Product.objects.filter(subtree_q([self.bikes]))), [bell])
+        self.assertEqual(self.bikes.total_products, 1)
+        self.assertEqual(set(self.kids.get_descendants(include_self=False)), {self.girls})
+
+
+class UrlPathTests(TestCase):
+
+    def setUp(self):
+        self.bikes = Category.objects.create(name="Bicycles", slug="bicycles")
+        self.kids = Category.objects.create(name="Kids", slug="kids", parent=self.bikes)
+        self.girls = Category.objects.create(name="Girls", slug="girls", parent=self.kids)
+        self.parts = Category.objects.create(name="Parts", slug="parts")
+        self.kid_bike = make_product(self.kids, "KC-1", "Kids Cycle")
+        self.road_bike = make_product(self.bikes, "RB-1", "Road Bike")
+        self.girls_bike = make_product(self.girls, "GC-1", "Girls Cycle")
+
+    def urls(self):
+        categories = dict(Category.objects.values_list("name", "url_path"))
+        products = dict(Product.objects.values_list("sku", "url_path"))
+        return categories, products
+
+    def test_create_stores_parent_and_own_slug(self):
+        categories, products = self.urls()
+        self.assertEqual(categories, {
+            "Bicycles": "/bicycles/", "Kids": "/bicycles/kids/", "Girls": "/kids/girls/", "Parts": "/parts/",
+        })
+        self.assertEqual(products, {"KC-1": "/bicycles/kids/kc-1/", "RB-1": "/bicycles/rb-1/", "GC-1": "/kids/girls/gc-1/"})
+        self.assertEqual(self.kid_bike.get_absolute_url(), "/bicycles/kids/kc-1/")
+
+    def test_parent_slug_change_cascades_to_children_and_products(self):
+        self.bikes.slug = "cycles"
+        self.bikes.save()
+        categories, products = self.urls()
+        self.assertEqual((categories["Bicycles"], categories["Kids"], categories["Girls"]),
+                         ("/cycles/", "/cycles/kids/", "/kids/girls/"))
+        self.assertEqual(products, {"KC-1": "/cycles/kids/kc-1/", "RB-1": "/cycles/rb-1/", "GC-1": "/kids/girls/gc-1/"})
+
+    def test_child_slug_change_and_move_cascade(self):
+        self.kids.slug = "children"
+        self.kids.save()
+        categories, products = self.urls()
+        self.assertEqual((categories["Kids"], categories["Girls"]), ("/bicycles/children/", "/children/girls/"))
+        self.assertEqual((products["KC-1"], products["GC-1"]), ("/bicycles/children/kc-1/", "/children/girls/gc-1/"))
+
+        self.kids.parent = self.parts
+        self.kids.save()
+        categories, products = self.urls()
+        self.assertEqual(categories["Kids"], "/parts/children/")
+        self.assertEqual((products["KC-1"], products["RB-1"]), ("/parts/children/kc-1/", "/bicycles/rb-1/"))
+
+    def test_product_slug_or_category_change_recomputes_its_url(self):
+        self.road_bike.slug = "road"
+        self.road_bike.category = self.parts
+        self.road_bike.save()
+        self.assertEqual(Product.objects.get(pk=self.road_bike.pk).url_path, "/parts/road/")
+
+
+class CategoryProductCountTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.bikes = Category.objects.create(name="Bicycles", slug="bicycles")
+            self.kids = Category.objects.create(name="Kids", slug="kids", parent=self.bikes)
+            self.girls = Category.objects.create(name="Girls", slug="girls", parent=self.kids)
+            self.parts = Category.objects.create(name="Parts", slug="parts")
+            make_product(self.bikes, "RB-1", "Road Bike")
+            make_product(self.kids, "KC-1", "Kids Cycle", is_available=False)
+            self.girls_bike = make_product(self.girls, "GC-1", "Girls Cycle")
+            make_product(self.girls, "GC-2", "Girls Trike")
+
+    def test_counts_roll_up_to_every_ancestor(self):
+        self.assertEqual(category_product_counts(), {
+            self.bikes.pk: (4, 3), self.kids.pk: (3, 2), self.girls.pk: (2, 2),
+        })  # parts has no products -> absent
+
+    def test_cached_until_catalog_changes(self):
+        category_product_counts()
+        with self.assertNumQueries(0):
+            category_product_counts()
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.girls_bike.is_available = False
+            self.girls_bike.save()
+            make_product(self.parts, "CH-1", "Chain")
+        counts = category_product_counts()
+        self.assertEqual((counts[self.bikes.pk], counts[self.girls.pk], counts[self.parts.pk]), ((4, 2), (2, 1), (1, 1)))
+
+
+class ProductSaveTests(TestCase):
+
+    def test_full_save_keeps_concurrent_rating_and_hold_columns(self):
+        category = Category.objects.create(name="Kids", slug="kids")
+        product = make_product(category, "KC-1", "Kids Cycle", stock=5)
+        stale = Product.objects.get(pk=product.pk)  # admin form's copy
+
+        user = CustomUser.objects.create_user(email="r@example.com")
+        ProductReview.objects.create(user=user, product=product, rating=4, comment="-", name="R")
+        Product.objects.filter(pk=product.pk).update(reserved=2)
+
+        stale.title = "Kids Cycle 2"
+        stale.save()
+        product.refresh_from_db()
+        self.assertEqual(product.title, "Kids Cycle 2")
+        self.assertEqual((product.rating_count, product.rating_4_count, product.reserved), (1, 1, 2))
+
+
+@override_settings(STORAGES=LOCAL_STORAGES)
+class ProductSearchTests(TestCase):
+
+    def setUp(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.bikes = Category.objects.create(name="Bicycles", slug="bicycles")
+            self.kids = Category.objects.create(name="Kids Cycles", slug="kids-cycles", parent=self.bikes)
+            self.ride = make_product(self.kids, "RIDE-20", "Rider 20 inch")
+            self.mention = make_product(
+                self.kids, "TRAIL-1", "Trail Blazer",
+                description="<p>Lighter than a <strong>rider</strong> frame &amp; more.</p>",
+            )
+            self.hidden = make_product(self.kids, "RIDE-OLD", "Rider classic", is_available=False)
+
+    def test_title_match_ranks_above_description_match(self):
+        self.assertEqual(search_product_ids("rider"), [self.ride.id, self.mention.id])
+
+    def test_prefix_sku_and_category_terms(self):
+        self.assertEqual(search_product_ids("rid"), [self.ride.id, self.mention.id])
+        self.assertEqual(search_product_ids("trail-1"), [self.mention.id])
+        # Parent category name is part of every child product's document
+        self.assertCountEqual(search_product_ids("bicycles blazer"), [self.mention.id])
+
+    def test_description_html_is_stripped(self):
+        doc = ProductSearchDocument.objects.get(product=self.mention)
+        self.assertEqual(doc.body, "- Lighter than a rider frame & more.")
+        self.assertEqual(search_product_ids("strong"), [])
+
+    def test_category_rename_and_product_delete_update_index(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.bikes.name = "Cycles"
+            self.bikes.save()
+        self.assertEqual(search_product_ids("bicycles"), [])
+        self.assertEqual(len(search_product_ids("cycles")), 2)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.ride.delete()
+        self.assertEqual(search_product_ids("rider"), [self.mention.id])
+
+    def test_full_rebuild_matches_incremental_index(self):
+        before = search_product_ids("rider")
+        self.assertEqual(refresh_search_documents(), 3)
+        self.assertEqual(search_product_ids("rider"), before)
+
+    def test_search_page_ranks_results(self):
+        self.client.get("/search/?q=warm")  # site chrome cache
+        with self.assertNumQueries(2):  # ranked ids, page cards
+            response = self.client.get("/search/?q=rider")
+        self.assertEqual(response.context["total"], 2)
+        self.assertEqual([p.id for p in response.context["products"]], [self.ride.id, self.mention.id])
+
+    def test_search_results_cached_per_normalized_query(self):
+        self.assertEqual(normalize_query("Rider,  rider TRAIL"), "rider trail")
+        self.client.get("/search/?q=warm")
+        reset_search_cache_stats()
+
+        self.client.get("/search/?q=rider")
+        with self.assertNumQueries(1):  # page cards only
+            response = self.client.get("/search/?q=RIDER!&page=2")
+        self.assertEqual(response.context["total"], 2)
+        self.assertEqual(search_cache_stats(), {"hits": 1, "misses": 1})
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.mention.is_available = False
+            self.mention.save()
+        response = self.client.get("/search/?q=rider")
+        self.assertEqual(response.context["total"], 1)
+        self.assertEqual(search_cache_stats(), {"hits": 1, "misses": 2})
+
+    def test_total_counts_matches_past_the_ranked_cap(self):
+        self.assertEqual(search_match_count("rider"), 2)
+        with mock.patch("bicycles.search.SEARCH_MAX_RESULTS", 1):
+            response = self.client.get("/search/?q=rider")
+        self.assertEqual(len(response.context["products"]), 1)
+        self.assertEqual(response.context["total"], 2)
+        self.assertContains(response, "showing the best 1 matches")
+
+
+@override_settings(STORAGES=LOCAL_STORAGES)
+class SearchSuggestTests(TestCase):
+
+    def setUp(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            kids = Category.objects.create(name="Kids Cycles", slug="kids-cycles")
+            self.ride = make_product(kids, "RIDE-20", "Rider 20 inch", discount_price=899)
+            self.trail = make_product(kids, "TRAIL-1", "Trail Rider")
+            make_product(kids, "RIDE-OLD", "Rider classic", is_available=False)
+
+    def titles(self, q):
+        return [item["title"] for item in self.client.get("/search/suggest/", {"q": q}).json()["items"]]
+
+    def test_word_prefix_and_sku_match_newest_first(self):
+        self.assertEqual(self.titles("rid"), ["Trail Rider", "Rider 20 inch"])
+        self.assertEqual(self.titles("rider 2"), ["Rider 20 inch"])
+        self.assertEqual(self.titles("TRAIL-1"), ["Trail Rider"])
+        self.assertEqual(self.titles("ider"), [])  # word prefix, not substring
+        self.assertEqual(self.titles(""), [])
+
+    def test_payload(self):
+        item = self.client.get("/search/suggest/", {"q": "ride-20"}).json()["items"][0]
+        self.assertEqual(item["sku"], "RIDE-20")
+        self.assertEqual(item["price"], 899.0)
+        self.assertEqual(item["url"], self.ride.get_absolute_url())
+
+    def test_warm_lookup_skips_database(self):
+        get_suggest_index()
+        with self.assertNumQueries(0):
+            self.assertEqual(len(get_suggest_index().suggest("r")), 2)
+
+    def test_catalog_change_rebuilds_index(self):
+        before = get_suggest_index()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.trail.is_available = False
+            self.trail.save()
+        self.assertIsNot(get_suggest_index(), before)
+        self.assertEqual(self.titles("rider"), ["Rider 20 inch"])
+
+    def test_index_matches_every_term(self):
+        index = SuggestIndex(
+            (pk, title, f"SKU-{pk}", title)
+            for pk, title in enumerate(["road bike", "kids road", "kids bike", "bike bell"], start=1)
+        )
+        self.assertEqual(index.suggest("bi"), ["bike bell", "kids bike", "road bike"])
+        self.assertEqual(index.suggest("kid bi"), ["kids bike"])
+        self.assertEqual(index.suggest("sku 3"), ["kids bike"])
+        self.assertEqual(index.lookup("road", limit=1), [2])
+
+
+@override_settings(STORAGES=LOCAL_STORAGES)
+class ProductCardTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.bikes = Category.objects.create(name="Bikes", slug="bikes")
+        cls.kids = Category.objects.create(name="Kids", slug="kids", parent=cls.bikes)
+        cls.bike = make_product(cls.kids, "KC-1", price=1000, discount_price=750)
+        cls.plain = make_product(cls.bikes, "RB-1", "Road Bike", price=2000)
+        Product.objects.filter(pk=cls.bike.pk).update(rating_avg=4.256, rating_count=3)
+        Product.objects.filter(pk=cls.plain.pk).update(image="")
+        cls.ids = [make_product(cls.bikes, f"L-{i}", f"Bike {i}").id for i in range(5)]
+
+    def test_card_resolves_prices_urls_and_rating(self):
+        card, plain = cards_by_ids([self.bike.id, self.plain.id])
+        self.assertEqual((card.effective_price, card.discount_percentage), (750, 25))
+        self.assertEqual(card.average_rating, 4.26)
+        self.assertEqual(card.get_absolute_url(), "/bikes/kids/kc-1/")
+        self.assertEqual(card.get_absolute_url(), Product.objects.get(pk=self.bike.pk).get_absolute_url())
+        self.assertEqual(card.category.get_absolute_url(), "/bikes/kids/")
+        self.assertEqual(card.category, self.kids)  # compares by pk with a real Category
+        self.assertEqual((card.name, card.display_category()), ("Kids Cycle", "Kids"))
+        self.assertTrue(card.image.url.endswith("products/x.jpg"))
+
+        self.assertEqual((plain.effective_price, plain.discount_percentage, plain.average_rating), (2000, 0, 0))
+        self.assertFalse(plain.image)
+
+    def test_cards_by_ids_keeps_order_in_one_slim_query(self):
+        wanted = [self.ids[3], 999999, self.ids[0], self.bike.id]
+        with self.assertNumQueries(1):
+            cards = cards_by_ids(wanted)
+        self.assertEqual([c.id for c in cards], [self.ids[3], self.ids[0], self.bike.id])
+        self.assertTrue(all(isinstance(c, ProductCard) for c in cards))
+        sql = str(card_rows(Product.objects.all()).query)
+        self.assertNotIn("description", sql)
+        self.assertNotIn("short_desc", sql)
+
+    def test_page_cards_numbered_and_cursor_modes(self):
+        queryset = Product.objects.filter(category=self.bikes)
+        ordering = ["-price", "id"]
+        page2 = page_cards(queryset, ordering, 2, {"page": "2"})
+        self.assertEqual([c.id for c in page2.object_list], self.ids[1:3])
+        self.assertTrue(page2.prev_cursor and page2.next_cursor)
+
+        with self.assertNumQueries(1):
+            page3 = page_cards(queryset, ordering, 2, {"after": page2.next_cursor})
+        self.assertIsInstance(page3, KeysetPage)
+        self.assertEqual([c.id for c in page3], self.ids[3:5])
+        back = page_cards(queryset, ordering, 2, {"before": page3.prev_cursor})
+        self.assertEqual([c.id for c in back], self.ids[1:3])
+
+    def test_page_cards_by_ids_follows_ranked_order(self):
+        ranked = list(reversed(self.ids))
+        first = page_cards_by_ids(ranked, 2, {})
+        self.assertEqual([c.id for c in first.object_list], ranked[:2])
+        with self.assertNumQueries(1):
+            second = page_cards_by_ids(ranked, 2, {"after": first.next_cursor})
+        self.assertEqual([c.id for c in second], ranked[2:4])
+
+    def test_previous_page_from_unaligned_cursor_does_not_overlap(self):
+        ranked = list(reversed(self.ids))
+        # A page starting at position 1, off the size-2 grid
+        shifted = page_cards_by_ids(ranked, 2, {"after": encode_cursor([ranked[0]])})
+        self.assertEqual([c.id for c in shifted], ranked[1:3])
+        back = page_cards_by_ids(ranked, 2, {"before": shifted.prev_cursor})
+        self.assertEqual([c.id for c in back], ranked[:1])
+        self.assertFalse(back.has_previous)
+        self.assertEqual(back.next_cursor, encode_cursor([ranked[0]]))
+
+        back = page_cards_by_ids(ranked, 2, {"before": encode_cursor([ranked[3]])})
+        self.assertEqual([c.id for c in back], ranked[1:3])
+
+
+@override_settings(STORAGES=LOCAL_STORAGES)
+class ListingPaginationTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.bikes = Category.objects.create(name="Bikes", slug="bikes")
+        # Repeated prices / titles / discounts: ties must be broken by id
+        for i in range(30):
+            make_product(
+                cls.bikes, f"L-{i}", f"Bike {i % 4}", price=1000 + (i % 5) * 100,
+                discount_price=900 if i % 3 == 0 else None,
+            )
+
+    def walk(self, url, sort, first):
+        """Every product id by following Next cursors from `first` page."""
+        ids, response = [], self.client.get(url, {"sort": sort, **first})
+        while True:
+            products = response.context["products"]
+            ids += [p.id for p in products]
+            if not products.has_next:
+                return ids
+            response = self.client.get(url, {"sort": sort, "after": products.next_cursor})
+
+    def numbered(self, url, sort):
+        ids, page = [], 1
+        while True:
+            products = self.client.get(url, {"sort": sort, "page": page}).context["products"]
+            ids += [p.id for p in products]
+            if not products.has_next():
+                return ids
+            page += 1
+
+    def test_cursor_pages_match_numbered_pages_for_every_sort(self):
+        for sort in SHOP_SORTS:
+            with self.subTest(sort=sort):
+                expected = self.numbered("/shop/", sort)
+                self.assertEqual(len(set(expected)), 30)
+                self.assertEqual(self.walk("/shop/", sort, {}), expected)
+                self.assertEqual(self.walk("/shop/", sort, {"page": 2}), expected[12:])
+
+    def test_previous_cursor_returns_previous_page(self):
+        page1 = self.client.get("/shop/", {"sort": "low-to-high"}).context["products"]
+        page2 = self.client.get("/shop/", {"sort": "low-to-high", "after": page1.next_cursor}).context["products"]
+        back = self.client.get("/shop/", {"sort": "low-to-high", "before": page2.prev_cursor}).context["products"]
+        self.assertEqual([p.id for p in back], [p.id for p in page1])
+        self.assertFalse(back.has_previous)
+
+    def test_deep_cursor_page_costs_like_first(self):
+        self.client.get("/shop/")  # site chrome cache
+        cursor = self.client.get("/shop/", {"page": 2}).context["products"].next_cursor
+        with self.assertNumQueries(1):  # one LIMIT page query, no COUNT
+            response = self.client.get("/shop/", {"after": cursor})
+        self.assertEqual(len(response.context["products"]), 6)
+        self.assertContains(response, "?before=")
+
+    def test_bad_cursor_falls_back_to_first_page(self):
+        first = [p.id for p in self.client.get("/shop/").context["products"]]
+        for cursor in ("junk", encode_cursor(["2026-01-01T00:00:00+00:00", 1])):  # aware datetime
+            with self.subTest(cursor=cursor):
+                products = self.client.get("/shop/", {"after": cursor}).context["products"]
+                self.assertEqual([p.id for p in products], first)
+
+    def test_category_and_search_cursors(self):
+        ids = self.walk("/bikes/", "low-to-high", {})
+        self.assertEqual(ids, self.numbered("/bikes/", "low-to-high"))
+        prices = [p.effective_price for p in cards_by_ids(ids)]
+        self.assertEqual(prices, sorted(prices))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            refresh_search_documents()
+        page1 = self.client.get("/search/", {"q": "bike"}).context["page_obj"]
+        page2 = self.client.get("/search/", {"q": "bike", "after": page1.next_cursor}).context["products"]
+        self.assertEqual(len(page2), 6)
+        self.assertFalse(set(p.id for p in page1) & set(p.id for p in page2))
@@ -4,81 +4,74 @@ from django.core.paginator import Paginator
 from orders.models import OrderItem   
 from django.contrib.auth.decorators import login_required
 from django.db.models import Avg
-from coupons.models import Coupon
+from coupons.index import get_coupon_index
 from django.utils import timezone
 from datetime import datetime
 from decimal import Decimal
-from django.db.models.functions import Coalesce
+from django.db.models.functions import Coalesce, Round
 from django.db.models import Case, When, Value, F, ExpressionWrapper, DecimalField, Count
+from .cards import page_cards, load_cards
 
 
 
 
-def shop_view(request):
-    """
-    Shop page with dynamic sorting + pagination.
-    Supported sort keys:
-      - popularity (default)
-      - low-to-high
-      - high-to-low
-      - rating
-      - a-to-z
-      - z-to-a
-      - off-high
-    """
-    sort = request.GET.get('sort', 'popularity')
-    page_number = request.GET.get('page', 1)
+# Sort key -> ordering. Every ordering ends in id (unique), so keyset
+# cursors (?after= / ?before=) are stable; see cards.page_cards.
+SHOP_SORTS = {
+    'popularity': ('-created_at', '-id'),    # popularity proxy = latest products first
+    'low-to-high': ('effective_price', 'id'),
+    'high-to-low': ('-effective_price', 'id'),
+    'rating': ('-rating_avg', '-id'),
+    'a-to-z': ('title', 'id'),
+    'z-to-a': ('-title', 'id'),
+    'off-high': ('-discount_percent', '-id'),
+}
+CATEGORY_SORTS = {
+    'low-to-high': ('effective_price', 'id'),
+    'high-to-low': ('-effective_price', 'id'),
+}
 
-    # Base queryset: only available products
-    qs = Product.objects.filter(is_available=True)
 
+def with_price_annotations(qs):
     # Effective price = discount_price (if exists) else price
     qs = qs.annotate(
         effective_price=Coalesce('discount_price', 'price')
     )
 
-    # Average rating (for sorting by rating)
-    qs = qs.annotate(
-        avg_rating=Avg('reviews__rating')
-    )
-
     # Discount % = ((price - effective_price) / price) * 100
-    # When price is 0, keep 0 to avoid division error
-    discount_percent_expr = Case(
+    # When price is 0, keep 0 to avoid division error. Rounded in SQL so the
+    # value in a cursor compares equal to the row it came from.
+    discount_percent_expr = Round(Case(
         When(price__gt=0, then=ExpressionWrapper(
             ((F('price') - F('effective_price')) * 100.0) / F('price'),
             output_field=DecimalField(max_digits=6, decimal_places=2)
         )),
         default=Value(0),
         output_field=DecimalField(max_digits=6, decimal_places=2)
-    )
-    qs = qs.annotate(discount_percent=discount_percent_expr)
-
-    # Apply sort
-    if sort == 'low-to-high':
-        qs = qs.order_by('effective_price', 'id')
-    elif sort == 'high-to-low':
-        qs = qs.order_by('-effective_price', 'id')
-    elif sort == 'rating':
-        qs = qs.order_by('-avg_rating', '-id')
-    elif sort == 'a-to-z':
-        qs = qs.order_by('title', 'id')
-    elif sort == 'z-to-a':
-        qs = qs.order_by('-title', 'id')
-    elif sort == 'off-high':
-        qs = qs.order_by('-discount_percent', '-id')
-    else:
-        # popularity proxy = latest products first
-        qs = qs.order_by('-created_at', '-id')
+    ), 2)
+    return qs.annotate(discount_percent=discount_percent_expr)
+
 
-    # Pagination (12 per page)
-    paginator = Paginator(qs, 12)
-    page_obj = paginator.get_page(page_number)
+def shop_view(request):
+    """
+    Shop page with dynamic sorting + pagination.
+    Supported sort keys: SHOP_SORTS (popularity is the default).
+    ?page=N -> numbered page; ?after= / ?before= -> keyset page (Next /
+    Previous arrows), same cost however deep.
+    """
+    sort = request.GET.get('sort', 'popularity')
+    ordering = SHOP_SORTS.get(sort, SHOP_SORTS['popularity'])
+
+    # Base queryset: only available products
+    qs = with_price_annotations(Product.objects.filter(is_available=True))
+
+    # 12 per page -> slim ProductCard objects
+    page_obj = page_cards(qs, ordering, 12, request.GET)
 
     categories = Category.objects.all()
 
     return render(request, 'shop.html', {
-        'products': page_obj,   # page object (supports .has_next, .paginator, etc.)
+        'products': page_obj,   # Paginator page or KeysetPage (.has_next, .next_cursor, ...)
         'categories': categories,
         'sort': sort,
     })
@@ -86,22 +79,17 @@ def shop_view(request):
 
 def category_view(request, parent_slug, child_slug=None):
     sort_option = request.GET.get('sort')
-    page_number = request.GET.get('page')
+    ordering = CATEGORY_SORTS.get(sort_option, ('id',))
 
     parent_category = get_object_or_404(Category, slug=parent_slug, parent=None)
 
     if child_slug:
         # Child Category Page
         category = get_object_or_404(Category, slug=child_slug, parent=parent_category)
-        product_list = Product.objects.filter(category=category)
-
-        if sort_option == 'low-to-high':
-            product_list = product_list.order_by('discount_price')
-        elif sort_option == 'high-to-low':
-            product_list = product_list.order_by('-discount_price')
+        # Child + ALL its descendants (materialized path prefix)
+        product_list = Product.objects.filter(category__path__startswith=category.path)
 
-        paginator = Paginator(product_list, 8)
-        page_obj = paginator.get_page(page_number)
+        page_obj = page_cards(with_price_annotations(product_list), ordering, 8, request.GET)
 
         return render(request, 'category.html', {
             'category': category,
@@ -118,17 +106,10 @@ def category_view(request, parent_slug, child_slug=None):
         # Products under parent only (not children) — for listing & pagination
         parent_product_list = Product.objects.filter(category=parent_category)
 
-        if sort_option == 'low-to-high':
-            parent_product_list = parent_product_list.order_by('discount_price')
-        elif sort_option == 'high-to-low':
-            parent_product_list = parent_product_list.order_by('-discount_price')
+        page_obj = page_cards(with_price_annotations(parent_product_list), ordering, 8, request.GET)
 
-        paginator = Paginator(parent_product_list, 8)
-        page_obj = paginator.get_page(page_number)
-
-        # All products under parent + children — only for slider
-        all_categories = [parent_category] + list(child_categories)
-        slider_products = Product.objects.filter(category__in=all_categories)
+        # All products under parent + ALL descendants — only for slider
+        slider_products = load_cards(Product.objects.filter(category__path__startswith=parent_category.path))
 
         return render(request, 'category.html', {
             'category': parent_category,
@@ -156,8 +137,8 @@ def product_detail_view(request, product_slug, category_slug=None, parent_slug=N
     # Related products
     related_products = Product.objects.filter(category=category).exclude(id=product.id)[:6]
 
-    # ✅ Related reviews
-    reviews = ProductReview.objects.filter(product=product)
+    # ✅ Related reviews (user for JSON-LD author fallback)
+    reviews = ProductReview.objects.filter(product=product).select_related('user')
 
     # ✅ Check if logged in and eligible to review
     has_purchased = False
@@ -191,25 +172,19 @@ def product_detail_view(request, product_slug, category_slug=None, parent_slug=N
                     name=name
                 )
             return redirect(request.path)
-    rating_distribution = ProductReview.objects.filter(product=product).values('rating').annotate(count=Count('rating'))
-    rating_dict = {r['rating']: r['count'] for r in rating_distribution}
-    total_reviews = sum(rating_dict.values())
-
-    average_rating = reviews.aggregate(avg=Avg('rating'))['avg'] or 0
-
-    # Filter only active, valid coupons for this product
-    coupons = Coupon.objects.filter(
-        active=True,
-        public=True,
-        valid_from__lte=timezone.now(),
-        valid_to__gte=timezone.now(),
-        applicable_products=product
-    )
+    # Stored aggregates on Product (see bicycles/ratings.py) -- no review queries
+    rating_dict = product.rating_histogram
+    total_reviews = product.rating_count
+    average_rating = product.average_rating
+
+    # Only active, valid public coupons for this product (in-memory coupon index)
+    coupons = [entry for entry, _ in get_coupon_index().for_products([product.id])]
 
     # Annotate coupons with ₹ discount and sort by max discount
+    selling_price = product.discount_price or product.price
     coupon_data = []
     for coupon in coupons:
-        off_amount = int(product.discount_price * (Decimal(coupon.discount_percent) / Decimal(100)))
+        off_amount = int(selling_price * (Decimal(coupon.discount_percent) / Decimal(100)))
         coupon_data.append({
             'name': coupon.name,
             'amount': off_amount,
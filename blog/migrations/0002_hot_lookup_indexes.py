@@ -0,0 +1,17 @@
+# Generated by Django 5.2.4 on 2026-10-18 13:43
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='blogpost',
+            index=models.Index(fields=['status', 'published_at'], name='blog_post_status_pub_idx'),
+        ),
+    ]
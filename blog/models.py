@@ -43,6 +43,10 @@ class BlogPost(models.Model):
 
     class Meta:
         ordering = ["-published_at", "-created_at"]
+        indexes = [
+            # Published listing / home blog strip, newest first
+            models.Index(fields=["status", "published_at"], name="blog_post_status_pub_idx"),
+        ]
 
     def __str__(self):
         return self.title
@@ -1,6 +1,9 @@
 from django.core.paginator import Paginator
 from django.shortcuts import get_object_or_404, render
 from .models import BlogPost, BlogCategory
+from sitecontent.route_context import register_route_context
+
+register_route_context("blog:list", "blog:category", "blog:detail", processors=["site_info"])
 
 def post_list(request):
     posts_qs = BlogPost.objects.filter(status="published").select_related("category")
@@ -0,0 +1,72 @@
+# /cartwatch/api.py
+"""
+JSON cart API (storefront AJAX).
+
+    GET  -> current mini-cart + pricing
+    POST {"ops": [{"op": "add"|"set"|"remove", "product_id": 12, "qty": 2}, ...]}
+         -> saare ops ek storage write me, phir updated mini-cart + pricing
+
+Cart page ke qty +/- buttons yahi call karte hain (templates/cart.html);
+add_to_cart / remove_from_cart abhi redirect wale views hi hain.
+"""
+from rest_framework.authentication import SessionAuthentication
+from rest_framework.renderers import JSONRenderer
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from quesecrides.cart_pricing import price_request_cart
+
+from .cart_store import CartBusy, get_cart_store
+from .serializers import CartBatchSerializer
+
+
+class CartSessionAuthentication(SessionAuthentication):
+    """Session auth that also checks CSRF for guests (the cart is session-scoped)."""
+
+    def authenticate(self, request):
+        self.enforce_csrf(request)
+        return super().authenticate(request)
+
+
+def _line_payload(line):
+    product = line.product
+    return {
+        "product_id": product.id,
+        "title": product.title,
+        "sku": product.sku,
+        "qty": line.qty,
+        "unit_price": f"{line.unit_price:.2f}",
+        "line_total": f"{line.line_total:.2f}",
+        "url": product.get_absolute_url(),
+        "image": product.image.url if product.image else "",
+    }
+
+
+def cart_payload(pricing):
+    return {
+        "success": True,
+        "count": len(pricing.lines),
+        "items": [_line_payload(line) for line in pricing.lines],
+        **pricing.as_json(),
+    }
+
+
+class CartAPIView(APIView):
+    authentication_classes = [CartSessionAuthentication]
+    renderer_classes = [JSONRenderer]
+
+    def get(self, request):
+        return Response(cart_payload(price_request_cart(request._request)))
+
+    def post(self, request):
+        serializer = CartBatchSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response({"success": False, "errors": serializer.errors}, status=400)
+
+        http_request = request._request
+        try:
+            get_cart_store(http_request).apply(serializer.as_tuples())
+        except CartBusy:
+            # Cart lock abhi kisi aur request ke paas hai; client retry kare
+            return Response({"success": False, "errors": {"ops": ["Cart is busy, try again."]}}, status=409)
+        return Response(cart_payload(price_request_cart(http_request, refresh=True)))
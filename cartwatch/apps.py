@@ -4,3 +4,6 @@ from django.apps import AppConfig
 class CartwatchConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'cartwatch'
+
+    def ready(self):
+        from . import signals  # noqa: F401  (guest -> user cart merge on login)
@@ -0,0 +1,382 @@
+# /cartwatch/cart_store.py
+"""
+Server-side cart storage.
+
+Pehle poora cart request.session['cart'] me tha aur har add/update/remove par
+poori session row dobara likhi jaati thi; parallel AJAX qty updates ek dusre
+ke writes kha jaate the. Ab har line alag se atomic upsert hoti hai.
+
+Backend settings.CART_STORE_BACKEND se chuna jaata hai:
+  - DBCartStore    (default) CartLine table, per-line conditional UPDATE / INSERT
+  - CacheCartStore shared cache (Redis/Memcached) me, short lock ke saath
+
+Owner: logged-in user ke liye "user:<id>", guest ke liye "guest:<cart_id>"
+(cart_id session me; login par session key rotate hoti hai, cart_id nahi).
+Login par guest cart user cart me merge hota hai (cartwatch.signals).
+Carts settings.CART_TTL_DAYS tak bina activity ke rehte hain.
+"""
+import time
+import uuid
+from abc import ABC, abstractmethod
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import IntegrityError, transaction
+from django.db.models import F
+from django.db.models.functions import Least
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from .models import CartLine
+
+SESSION_CART_ID = "cart_id"
+LEGACY_SESSION_CART = "cart"
+
+
+CART_OPS = ("add", "set", "remove")
+MAX_LINE_QTY = 999
+
+
+class CartBusy(Exception):
+    """Another writer held the cart lock for longer than CacheCartStore.LOCK_WAIT."""
+
+
+def apply_ops(lines, ops):
+    """
+    Apply [(op, product_id, qty), ...] to a {product_id: qty} dict in place.
+    add = qty badhao, set = exact qty (<= 0 hata deta hai), remove = line hatao.
+    Resulting line qty MAX_LINE_QTY par clamp hoti hai (repeated adds bhi).
+    """
+    for op, product_id, qty in ops:
+        if op == "add":
+            lines[product_id] = min(lines.get(product_id, 0) + qty, MAX_LINE_QTY)
+        elif op == "set":
+            lines[product_id] = min(qty, MAX_LINE_QTY)
+        elif op == "remove":
+            lines.pop(product_id, None)
+        else:
+            raise ValueError(f"Unknown cart op: {op}")
+        if lines.get(product_id, 1) <= 0:
+            lines.pop(product_id, None)
+    return lines
+
+
+def cart_ttl():
+    return timedelta(days=getattr(settings, "CART_TTL_DAYS", 30))
+
+
+def user_owner(user):
+    return f"user:{user.pk}"
+
+
+def guest_owner(cart_id):
+    return f"guest:{cart_id}"
+
+
+class BaseCartStore(ABC):
+    """
+    Quantities are keyed by int product id. Every mutation is a single-line
+    operation; nothing rewrites the whole cart.
+    """
+
+    def __init__(self, owner):
+        self.owner = owner
+
+    @abstractmethod
+    def items(self):
+        """{product_id: qty} in the order lines were first added."""
+
+    def count(self):
+        return len(self.items())
+
+    @abstractmethod
+    def add(self, product_id, qty=1):
+        """Insert the line if missing (existing qty is left alone). True if inserted."""
+
+    @abstractmethod
+    def increment(self, product_id, delta=1):
+        """Add `delta` to the line, inserting it if missing."""
+
+    @abstractmethod
+    def set(self, product_id, qty, create=True):
+        """Set the quantity (qty <= 0 removes). With create=False, missing lines stay missing."""
+
+    @abstractmethod
+    def remove(self, product_id):
+        """Drop the line (no-op if missing)."""
+
+    @abstractmethod
+    def clear(self):
+        """Drop every line of this owner."""
+
+    @abstractmethod
+    def apply(self, ops):
+        """Apply a batch of (op, product_id, qty) as one storage write."""
+
+    def merge_from(self, other):
+        """Fold another owner's lines into this cart (larger qty wins), then empty it."""
+        mine = self.items()
+        ops = [
+            ("set", product_id, qty)
+            for product_id, qty in other.items().items()
+            if qty > mine.get(product_id, 0)
+        ]
+        if ops:
+            self.apply(ops)
+        other.clear()
+
+    @classmethod
+    def purge_expired(cls):
+        """Drop carts idle for longer than CART_TTL_DAYS. Returns lines removed."""
+        return 0
+
+
+class DBCartStore(BaseCartStore):
+
+    def _lines(self):
+        return CartLine.objects.filter(owner=self.owner)
+
+    def _live_lines(self):
+        return self._lines().filter(updated_at__gte=timezone.now() - cart_ttl())
+
+    def _touch(self):
+        # Cart ki har line ka updated_at saath chalta hai -> TTL poore cart par lagta hai.
+        # Expired leftovers touch nahi hote (warna wo wapas cart me aa jaate)
+        self._live_lines().update(updated_at=timezone.now())
+
+    def _insert(self, product_id, qty):
+        try:
+            with transaction.atomic():
+                CartLine.objects.create(owner=self.owner, product_id=product_id, quantity=qty)
+            return True
+        except IntegrityError:
+            # Line already there (concurrent add or an expired leftover)
+            return False
+
+    def items(self):
+        return dict(self._live_lines().order_by("id").values_list("product_id", "quantity"))
+
+    def count(self):
+        return self._live_lines().count()
+
+    def add(self, product_id, qty=1):
+        qty = min(qty, MAX_LINE_QTY)
+        with transaction.atomic():
+            inserted = self._insert(product_id, qty)
+            if not inserted:
+                # Expired leftover counts as absent
+                inserted = bool(
+                    self._lines()
+                    .filter(product_id=product_id, updated_at__lt=timezone.now() - cart_ttl())
+                    .update(quantity=qty, updated_at=timezone.now())
+                )
+            self._touch()
+        return inserted
+
+    def increment(self, product_id, delta=1):
+        with transaction.atomic():
+            updated = self._live_lines().filter(product_id=product_id).update(
+                quantity=Least(F("quantity") + delta, MAX_LINE_QTY)
+            )
+            if not updated and not self._insert(product_id, min(delta, MAX_LINE_QTY)):
+                # Expired leftover counts as absent: start again from delta
+                self._lines().filter(product_id=product_id).update(
+                    quantity=min(delta, MAX_LINE_QTY), updated_at=timezone.now()
+                )
+            self._touch()
+
+    def set(self, product_id, qty, create=True):
+        if qty <= 0:
+            return self.remove(product_id)
+        qty = min(qty, MAX_LINE_QTY)
+        with transaction.atomic():
+            # Expired leftover counts as absent (create=False must not revive it)
+            updated = self._live_lines().filter(product_id=product_id).update(quantity=qty)
+            if not updated and create and not self._insert(product_id, qty):
+                self._lines().filter(product_id=product_id).update(quantity=qty, updated_at=timezone.now())
+            self._touch()
+
+    def remove(self, product_id):
+        self._lines().filter(product_id=product_id).delete()
+
+    def clear(self):
+        self._lines().delete()
+
+    def apply(self, ops):
+        touched = {product_id for _, product_id, _ in ops}
+        adding = {product_id for op, product_id, _ in ops if op != "remove"}
+        with transaction.atomic():
+            # select_for_update sirf maujood rows lock karta hai: missing lines ki
+            # pehle 0-qty row daalo, taaki do concurrent first adds bhi ek hi row
+            # lock par queue hon (dusra wait karega, phir pehle ka qty padhega)
+            if adding:
+                CartLine.objects.bulk_create(
+                    [CartLine(owner=self.owner, product_id=product_id, quantity=0) for product_id in adding],
+                    ignore_conflicts=True,
+                )
+            cutoff = timezone.now() - cart_ttl()
+            locked = (
+                self._lines().select_for_update()
+                .filter(product_id__in=touched)
+                .values_list("product_id", "quantity", "updated_at")
+            )
+            # Placeholders (qty 0) aur expired leftovers absent maane jaate hain
+            current = {
+                product_id: qty for product_id, qty, updated_at in locked
+                if qty > 0 and updated_at >= cutoff
+            }
+            final = apply_ops(dict(current), ops)
+
+            removed = touched - final.keys()
+            if removed:
+                self._lines().filter(product_id__in=removed).delete()
+            now = timezone.now()
+            changed = [
+                CartLine(owner=self.owner, product_id=product_id, quantity=qty, updated_at=now)
+                for product_id, qty in final.items()
+                if current.get(product_id) != qty
+            ]
+            if changed:
+                CartLine.objects.bulk_create(
+                    changed,
+                    update_conflicts=True,
+                    unique_fields=["owner", "product"],
+                    update_fields=["quantity", "updated_at"],
+                )
+            self._touch()
+
+    @classmethod
+    def purge_expired(cls):
+        deleted, _ = CartLine.objects.filter(updated_at__lt=timezone.now() - cart_ttl()).delete()
+        return deleted
+
+
+class CacheCartStore(BaseCartStore):
+    """
+    Cart dict under one cache key (expires after CART_TTL_DAYS idle). Writes
+    take a short cache.add() lock so parallel updates don't overwrite each
+    other; needs a cache shared by all workers (Redis/Memcached) in production.
+    If the lock stays taken for LOCK_WAIT the write fails with CartBusy --
+    it never writes unlocked. A crashed writer's lock expires after LOCK_TIMEOUT.
+    """
+    LOCK_TIMEOUT = 5
+    LOCK_WAIT = 2.0
+
+    def _key(self):
+        return f"cart:{self.owner}"
+
+    def _timeout(self):
+        return int(cart_ttl().total_seconds())
+
+    def _mutate(self, change):
+        lock_key = f"{self._key()}:lock"
+        token = uuid.uuid4().hex
+        deadline = time.monotonic() + self.LOCK_WAIT
+        while not cache.add(lock_key, token, self.LOCK_TIMEOUT):
+            if time.monotonic() > deadline:
+                raise CartBusy(self.owner)
+            time.sleep(0.01)
+        try:
+            lines = cache.get(self._key()) or {}
+            result = change(lines)
+            cache.set(self._key(), lines, self._timeout())
+            return result
+        finally:
+            # Sirf apna lock hatao: LOCK_TIMEOUT ke baad ye kisi aur ka ho sakta hai
+            if cache.get(lock_key) == token:
+                cache.delete(lock_key)
+
+    def items(self):
+        return dict(cache.get(self._key()) or {})
+
+    def add(self, product_id, qty=1):
+        def change(lines):
+            if product_id in lines:
+                return False
+            lines[product_id] = min(qty, MAX_LINE_QTY)
+            return True
+        return self._mutate(change)
+
+    def increment(self, product_id, delta=1):
+        def change(lines):
+            lines[product_id] = min(lines.get(product_id, 0) + delta, MAX_LINE_QTY)
+        self._mutate(change)
+
+    def set(self, product_id, qty, create=True):
+        def change(lines):
+            if qty <= 0:
+                lines.pop(product_id, None)
+            elif create or product_id in lines:
+                lines[product_id] = min(qty, MAX_LINE_QTY)
+        self._mutate(change)
+
+    def remove(self, product_id):
+        self._mutate(lambda lines: lines.pop(product_id, None))
+
+    def clear(self):
+        cache.delete(self._key())
+
+    def apply(self, ops):
+        self._mutate(lambda lines: apply_ops(lines, ops))
+
+
+def get_store_class():
+    return import_string(getattr(settings, "CART_STORE_BACKEND", "cartwatch.cart_store.DBCartStore"))
+
+
+def _import_legacy_session_cart(request, store):
+    # Deploy se pehle ke session carts ek baar store me aa jaate hain
+    legacy = request.session.pop(LEGACY_SESSION_CART, None)
+    for product_id, qty in (legacy or {}).items():
+        try:
+            store.add(int(product_id), max(int(qty), 1))
+        except (TypeError, ValueError):
+            continue
+
+
+def get_cart_store(request):
+    """
+    Cart store for this request (memoized). Guests get a cart_id in the
+    session the first time one is needed.
+    """
+    store = getattr(request, "_cart_store", None)
+    if store is not None:
+        return store
+
+    user = getattr(request, "user", None)
+    if user is not None and user.is_authenticated:
+        owner = user_owner(user)
+    else:
+        cart_id = request.session.get(SESSION_CART_ID)
+        if not cart_id:
+            cart_id = uuid.uuid4().hex
+            request.session[SESSION_CART_ID] = cart_id
+        owner = guest_owner(cart_id)
+
+    store = get_store_class()(owner)
+    if LEGACY_SESSION_CART in request.session:
+        _import_legacy_session_cart(request, store)
+    request._cart_store = store
+    return store
+
+
+def peek_cart_count(request):
+    """Header badge count; 0 without touching storage for guests with no cart yet."""
+    user = getattr(request, "user", None)
+    if (user is None or not user.is_authenticated) and SESSION_CART_ID not in request.session \
+            and LEGACY_SESSION_CART not in request.session:
+        return 0
+    return get_cart_store(request).count()
+
+
+def merge_guest_cart(request, user):
+    """Move the session's guest cart into `user`'s cart (called on login)."""
+    cart_id = request.session.pop(SESSION_CART_ID, None)
+    store_class = get_store_class()
+    user_store = store_class(user_owner(user))
+    if cart_id:
+        user_store.merge_from(store_class(guest_owner(cart_id)))
+    request._cart_store = user_store
+    if LEGACY_SESSION_CART in request.session:
+        _import_legacy_session_cart(request, user_store)
@@ -0,0 +1,8 @@
+from django.utils.functional import SimpleLazyObject
+
+from .cart_store import peek_cart_count
+
+
+def cart_count(request):
+    """Header cart badge; storage is read only if the template renders it."""
+    return {"cart_count": SimpleLazyObject(lambda: peek_cart_count(request))}
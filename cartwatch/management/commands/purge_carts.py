@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from cartwatch.cart_store import cart_ttl, get_store_class
+
+
+class Command(BaseCommand):
+    help = "Delete server-side carts idle for longer than CART_TTL_DAYS (deploy/quesecrides-purge-carts.timer, daily)."
+
+    def handle(self, *args, **options):
+        removed = get_store_class().purge_expired()
+        self.stdout.write(self.style.SUCCESS(f"Purged {removed} cart lines older than {cart_ttl().days} days."))
@@ -0,0 +1,29 @@
+# Generated by Django 5.2.4 on 2026-10-18 13:32
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bicycles', '0023_url_path'),
+        ('cartwatch', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CartLine',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('owner', models.CharField(max_length=64)),
+                ('quantity', models.PositiveIntegerField(default=1)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='bicycles.product')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['updated_at'], name='cartwatch_line_updated_idx')],
+                'constraints': [models.UniqueConstraint(fields=('owner', 'product'), name='unique_cart_line')],
+            },
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.2.4 on 2026-10-18 13:43
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cartwatch', '0002_cart_line'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='cartlead',
+            index=models.Index(fields=['phone'], name='cartwatch_lead_phone_idx'),
+        ),
+    ]
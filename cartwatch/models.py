@@ -6,5 +6,33 @@ class CartLead(models.Model):
     cart_items = models.TextField()  # Store product info as text/JSON
     created_at = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        indexes = [
+            # save_checkout_lead exists() check + lead cleanup after an order
+            models.Index(fields=['phone'], name='cartwatch_lead_phone_idx'),
+        ]
+
     def __str__(self):
         return f"{self.name} ({self.phone})"
+
+
+class CartLine(models.Model):
+    """
+    Server-side cart line (cartwatch.cart_store.DBCartStore).
+    owner = "user:<id>" ya guest ke liye "guest:<session cart_id>".
+    """
+    owner = models.CharField(max_length=64)
+    product = models.ForeignKey('bicycles.Product', on_delete=models.CASCADE, related_name='+')
+    quantity = models.PositiveIntegerField(default=1)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['owner', 'product'], name='unique_cart_line'),
+        ]
+        indexes = [
+            models.Index(fields=['updated_at'], name='cartwatch_line_updated_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.owner}: {self.product_id} x{self.quantity}"
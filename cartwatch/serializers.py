@@ -0,0 +1,29 @@
+from rest_framework import serializers
+
+from bicycles.models import Product
+
+from .cart_store import CART_OPS, MAX_LINE_QTY
+
+MAX_OPS_PER_REQUEST = 50
+
+
+class CartOpSerializer(serializers.Serializer):
+    op = serializers.ChoiceField(choices=CART_OPS)
+    product_id = serializers.IntegerField(min_value=1)
+    qty = serializers.IntegerField(min_value=0, max_value=MAX_LINE_QTY, default=1)
+
+
+class CartBatchSerializer(serializers.Serializer):
+    ops = CartOpSerializer(many=True, allow_empty=False, max_length=MAX_OPS_PER_REQUEST)
+
+    def validate_ops(self, ops):
+        # add/set ke products ek hi query me check; remove ke liye zaroori nahi
+        wanted = {op["product_id"] for op in ops if op["op"] != "remove"}
+        known = set(Product.objects.filter(id__in=wanted).values_list("id", flat=True)) if wanted else set()
+        missing = sorted(wanted - known)
+        if missing:
+            raise serializers.ValidationError(f"Unknown product ids: {', '.join(map(str, missing))}")
+        return ops
+
+    def as_tuples(self):
+        return [(op["op"], op["product_id"], op["qty"]) for op in self.validated_data["ops"]]
@@ -0,0 +1,11 @@
+from django.contrib.auth.signals import user_logged_in
+from django.dispatch import receiver
+
+from .cart_store import merge_guest_cart
+
+
+@receiver(user_logged_in, dispatch_uid="cartwatch_merge_guest_cart")
+def merge_cart_on_login(sender, request, user, **kwargs):
+    # OTP login aur checkout/PayU auto-login dono yahin se guzarte hain
+    if request is not None:
+        merge_guest_cart(request, user)
@@ -1,3 +1,162 @@
-from django.test import TestCase
+import threading
+from datetime import timedelta
 
-# Create your tests here.
+from django.core.cache import cache
+from django.db import connection
+from django.test import Client, TestCase, TransactionTestCase, override_settings
+from django.utils import timezone
+
+from bicycles.models import Category
+from quesecrides.testing import LOCAL_STORAGES, make_product
+
+from .cart_store import MAX_LINE_QTY, BaseCartStore, CacheCartStore, CartBusy, DBCartStore
+from .models import CartLine
+
+
+class CartStoreTests(TestCase):
+
+    def setUp(self):
+        category = Category.objects.create(name="Kids", slug="kids")
+        self.product = make_product(category)
+        cache.clear()
+
+    def test_base_store_is_abstract(self):
+        with self.assertRaises(TypeError):
+            BaseCartStore("guest:x")
+
+    def test_set_without_create_leaves_expired_line_absent(self):
+        store = DBCartStore("guest:a")
+        store.add(self.product.id, 2)
+        CartLine.objects.update(updated_at=timezone.now() - timedelta(days=365))
+
+        store.set(self.product.id, 5, create=False)
+        self.assertEqual(store.items(), {})
+        store.increment(self.product.id, 1)
+        self.assertEqual(store.items(), {self.product.id: 1})
+
+    def test_cache_store_never_writes_or_unlocks_without_its_lock(self):
+        store = CacheCartStore("guest:b")
+        store.LOCK_WAIT = 0.05
+        lock_key = f"{store._key()}:lock"
+        cache.set(lock_key, "other-writer", 60)
+
+        with self.assertRaises(CartBusy):
+            store.add(self.product.id, 1)
+        self.assertEqual(store.items(), {})
+        self.assertEqual(cache.get(lock_key), "other-writer")
+
+        cache.delete(lock_key)
+        store.add(self.product.id, 1)
+        self.assertEqual(store.items(), {self.product.id: 1})
+        self.assertIsNone(cache.get(lock_key))
+
+    def test_line_quantity_clamped_across_ops_and_calls(self):
+        pid = self.product.id
+        for store in (DBCartStore("guest:c"), CacheCartStore("guest:c")):
+            store.apply([("add", pid, MAX_LINE_QTY)] * 3)
+            self.assertEqual(store.items(), {pid: MAX_LINE_QTY})
+            store.apply([("add", pid, 5)])
+            store.increment(pid, 5)
+            store.set(pid, 10 ** 6)
+            self.assertEqual(store.items(), {pid: MAX_LINE_QTY})
+
+
+@override_settings(STORAGES=LOCAL_STORAGES)
+class CartAPITests(TestCase):
+    URL = "/cartwatch/api/cart/"
+
+    def setUp(self):
+        category = Category.objects.create(name="Kids", slug="kids")
+        self.bike = make_product(category, "KC-1", price=1000, discount_price=900)
+        self.trike = make_product(category, "KC-2", price=2000)
+
+    def post(self, *ops, client=None, **extra):
+        return (client or self.client).post(self.URL, {"ops": list(ops)}, content_type="application/json", **extra)
+
+    def test_get_returns_lines_and_totals(self):
+        self.client.get(f"/add-to-cart/{self.bike.id}/")
+        data = self.client.get(self.URL).json()
+        self.assertEqual(
+            set(data), {"success", "count", "items", "subtotal", "discount", "total",
+                         "cart_total", "product_discount", "shipping"},
+        )
+        self.assertEqual(data["count"], 1)
+        self.assertEqual(data["items"][0]["product_id"], self.bike.id)
+        self.assertEqual((data["items"][0]["qty"], data["items"][0]["unit_price"]), (1, "900.00"))
+        self.assertEqual(data["subtotal"], "900.00")
+        self.assertContains(self.client.get("/cart/"), 'fetch("/cartwatch/api/cart/"')  # qty buttons
+
+    def test_post_applies_batched_ops_in_order(self):
+        response = self.post(
+            {"op": "add", "product_id": self.bike.id, "qty": 2},
+            {"op": "add", "product_id": self.trike.id},
+            {"op": "add", "product_id": self.bike.id, "qty": 1},
+            {"op": "remove", "product_id": self.trike.id},
+        )
+        data = response.json()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([(i["product_id"], i["qty"]) for i in data["items"]], [(self.bike.id, 3)])
+        self.assertEqual(data["subtotal"], "2700.00")
+
+        data = self.post({"op": "set", "product_id": self.bike.id, "qty": 0}).json()
+        self.assertEqual((data["count"], data["items"]), (0, []))
+
+    def test_invalid_ops_are_rejected_without_writing(self):
+        for op, field in (
+            ({"op": "double", "product_id": self.bike.id}, "op"),
+            ({"op": "add", "product_id": self.bike.id, "qty": -1}, "qty"),
+            ({"op": "add", "product_id": self.bike.id, "qty": MAX_LINE_QTY + 1}, "qty"),
+        ):
+            response = self.post({"op": "add", "product_id": self.trike.id}, op)
+            self.assertEqual(response.status_code, 400)
+            self.assertIn(field, response.json()["errors"]["ops"][1])
+
+        response = self.post({"op": "add", "product_id": 999999})
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("999999", str(response.json()["errors"]))
+        self.assertEqual(self.client.get(self.URL).json()["count"], 0)
+
+    def test_resulting_line_quantity_is_clamped(self):
+        ops = [{"op": "add", "product_id": self.bike.id, "qty": MAX_LINE_QTY}] * 3
+        self.post(*ops)
+        data = self.post({"op": "add", "product_id": self.bike.id, "qty": 5}).json()
+        self.assertEqual(data["items"][0]["qty"], MAX_LINE_QTY)
+
+    def test_post_requires_csrf_token(self):
+        client = Client(enforce_csrf_checks=True)
+        client.get(f"/add-to-cart/{self.bike.id}/")  # guest session
+        op = {"op": "add", "product_id": self.trike.id}
+        self.assertEqual(self.post(op, client=client).status_code, 403)
+
+        client.cookies["csrftoken"] = "a" * 32
+        response = self.post(op, client=client, HTTP_X_CSRFTOKEN="a" * 32)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["count"], 2)
+
+
+class ConcurrentCartApplyTests(TransactionTestCase):
+
+    def test_concurrent_first_adds_of_a_line_all_count(self):
+        category = Category.objects.create(name="Kids", slug="kids")
+        product = make_product(category)
+        workers = 6
+        barrier = threading.Barrier(workers)
+        errors = []
+
+        def add_one():
+            try:
+                barrier.wait()
+                DBCartStore("guest:race").apply([("add", product.id, 1)])
+            except Exception as exc:  # surfaced below
+                errors.append(exc)
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=add_one) for _ in range(workers)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(errors, [])
+        self.assertEqual(DBCartStore("guest:race").items(), {product.id: workers})
@@ -1,6 +1,8 @@
 from django.urls import path
+from .api import CartAPIView
 from .views import save_checkout_lead
 
 urlpatterns = [
     path('save-lead/', save_checkout_lead, name='save_checkout_lead'),
-]
\ No newline at end of file
+    path('api/cart/', CartAPIView.as_view(), name='cart_api'),
+]
@@ -1,26 +1,22 @@
 from django.views.decorators.csrf import csrf_exempt
 from django.http import JsonResponse
 from .models import CartLead
-from bicycles.models import Product
+from quesecrides.cart_pricing import price_request_cart
 
 @csrf_exempt
 def save_checkout_lead(request):
     if request.method == 'POST':
         phone = request.POST.get('phone')
         name = request.POST.get('name', '')
-        cart = request.session.get('cart', {})
 
         if not phone:
             return JsonResponse({'status': 'phone_required'})
 
         # Build readable cart summary
-        product_list = []
-        for product_id, qty in cart.items():
-            try:
-                product = Product.objects.get(id=int(product_id))
-                product_list.append(f"{product.title} (Qty: {qty})")
-            except Product.DoesNotExist:
-                continue
+        product_list = [
+            f"{line.product.title} (Qty: {line.qty})"
+            for line in price_request_cart(request).lines
+        ]
 
         cart_summary = "\n".join(product_list)
 
@@ -0,0 +1,76 @@
+# /coupons/best.py
+"""
+Cart ke liye sabse zyada ₹ bachane wala coupon.
+
+Saare public, live coupons ek hi pass me evaluate hote hain: har cart line ke
+liye index ka product -> coupons map dekh kar us coupon ka eligible total
+jodte hain; "all products" coupons poore subtotal par. Koi per-coupon query
+ya per-coupon line scan nahi -- kaam ~ lines x (us product ke coupons).
+"""
+from collections import defaultdict
+from dataclasses import dataclass
+from decimal import Decimal
+
+from django.utils import timezone
+
+from quesecrides.cart_pricing import coupon_share
+
+from .index import get_coupon_index
+
+ZERO = Decimal("0.00")
+
+
+@dataclass(frozen=True)
+class BestCoupon:
+    coupon: object          # coupons.index.CouponEntry
+    saving: Decimal
+    product_ids: frozenset  # cart lines the coupon discounts
+    pricing: object         # CartPricing with this coupon applied
+
+
+def best_coupon_for_cart(pricing, now=None):
+    """BestCoupon for a priced cart, or None if no public coupon saves anything."""
+    if not pricing:
+        return None
+    now = now or timezone.now()
+    index = get_coupon_index()
+
+    live = {entry.id: entry for entry in index.live(now, public_only=True)}
+    if not live:
+        return None
+
+    savings = defaultdict(lambda: ZERO)
+    eligible = defaultdict(set)
+    for line in pricing.lines:
+        product_id = line.product.id
+        for entry in index.by_product.get(product_id, ()):
+            if entry.id in live:
+                savings[entry.id] += coupon_share(line.line_total, entry.discount_percent)
+                eligible[entry.id].add(product_id)
+
+    # "All products" coupons: same % -> same saving, so compute once per %
+    all_ids = set(pricing.product_ids)
+    by_percent = {}
+    for entry in live.values():
+        if entry.applies_to_all:
+            percent = entry.discount_percent
+            if percent not in by_percent:
+                by_percent[percent] = sum((coupon_share(line.line_total, percent) for line in pricing.lines), ZERO)
+            savings[entry.id] = by_percent[percent]
+            eligible[entry.id] = all_ids
+
+    if not savings:
+        return None
+    # Ties: higher %, then the older coupon
+    best_id = max(savings, key=lambda cid: (savings[cid], live[cid].discount_percent, -cid))
+    if savings[best_id] <= 0:
+        return None
+
+    best = live[best_id]
+    product_ids = frozenset(eligible[best_id])
+    return BestCoupon(
+        coupon=best,
+        saving=savings[best_id],
+        product_ids=product_ids,
+        pricing=pricing.with_coupon(best.code, best.discount_percent, product_ids),
+    )
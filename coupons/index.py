@@ -0,0 +1,161 @@
+# /coupons/index.py
+"""
+In-memory coupon eligibility index.
+
+Har active, abhi-ya-aage valid coupon ka compact entry: product-id frozenset
+(khaali = saare products par lagta hai) + validity window. Cart / product pages
+eligibility sirf set intersection se nikalte hain, koi query nahi.
+
+Index process memory me rehta hai aur rebuild hota hai jab:
+  - "coupons" version stamp bump ho (Coupon save/delete, applicable_products
+    M2M change -- coupons.signals), ya
+  - koi valid_from / valid_to boundary cross ho jaaye.
+Build = 2 queries (coupons + M2M rows).
+"""
+import threading
+from dataclasses import dataclass
+
+from django.utils import timezone
+
+from quesecrides.cache_versions import get_version
+
+from .models import Coupon
+
+COUPON_NAMESPACE = "coupons"
+
+
+@dataclass(frozen=True)
+class CouponEntry:
+    id: int
+    name: str
+    code: str
+    discount_percent: int
+    valid_from: object
+    valid_to: object
+    public: bool
+    product_ids: frozenset  # empty -> every product
+
+    @property
+    def applies_to_all(self):
+        return not self.product_ids
+
+    def is_live(self, now):
+        return self.valid_from <= now <= self.valid_to
+
+    def eligible_ids(self, product_ids):
+        """Cart product ids this coupon discounts."""
+        if self.applies_to_all:
+            return set(product_ids)
+        return self.product_ids.intersection(product_ids)
+
+
+class CouponIndex:
+
+    def __init__(self, entries, built_at):
+        # Highest % first (cart modal / product page order)
+        self.entries = tuple(sorted(entries, key=lambda e: (-e.discount_percent, e.id)))
+        self.by_code = {entry.code.lower(): entry for entry in self.entries}
+        self.by_product = {}
+        for entry in self.entries:
+            for product_id in entry.product_ids:
+                self.by_product.setdefault(product_id, []).append(entry)
+
+        boundaries = [e.valid_from for e in self.entries if e.valid_from > built_at]
+        boundaries += [e.valid_to for e in self.entries]
+        self.expires_at = min(boundaries) if boundaries else None
+
+    def is_stale(self, now):
+        # valid_to inclusive hai, isliye boundary ke *baad* rebuild
+        return self.expires_at is not None and now > self.expires_at
+
+    def live(self, now=None, public_only=False):
+        now = now or timezone.now()
+        return [e for e in self.entries if e.is_live(now) and (e.public or not public_only)]
+
+    def lookup(self, code, now=None):
+        """Live coupon for a code (case-insensitive), public or not; else None."""
+        entry = self.by_code.get((code or "").strip().lower())
+        if entry and entry.is_live(now or timezone.now()):
+            return entry
+        return None
+
+    def for_products(self, product_ids, now=None, public_only=True):
+        """
+        Product-restricted live coupons matching any of `product_ids`, as
+        [(entry, matched_ids)] highest % first. "All products" coupons are not
+        listed here (same as the old applicable_products join).
+        """
+        now = now or timezone.now()
+        product_ids = set(product_ids)
+        seen = set()
+        matches = []
+        for product_id in product_ids:
+            for entry in self.by_product.get(product_id, ()):
+                if entry.id in seen or not entry.is_live(now) or (public_only and not entry.public):
+                    continue
+                seen.add(entry.id)
+                matches.append((entry, entry.product_ids & product_ids))
+        matches.sort(key=lambda m: (-m[0].discount_percent, m[0].id))
+        return matches
+
+
+def build_coupon_index(now=None):
+    now = now or timezone.now()
+    rows = list(
+        Coupon.objects.filter(active=True, valid_to__gte=now)
+        .values_list("id", "name", "code", "discount_percent", "valid_from", "valid_to", "public")
+    )
+    product_ids = {}
+    if rows:
+        through = Coupon.applicable_products.through
+        for coupon_id, product_id in (through.objects
+                                      .filter(coupon_id__in=[r[0] for r in rows])
+                                      .values_list("coupon_id", "product_id")):
+            product_ids.setdefault(coupon_id, set()).add(product_id)
+
+    entries = [
+        CouponEntry(
+            id=cid, name=name, code=code, discount_percent=pct,
+            valid_from=valid_from, valid_to=valid_to, public=public,
+            product_ids=frozenset(product_ids.get(cid, ())),
+        )
+        for cid, name, code, pct, valid_from, valid_to, public in rows
+    ]
+    return CouponIndex(entries, built_at=now)
+
+
+_state = {"version": None, "index": None}
+_lock = threading.Lock()
+
+
+def get_coupon_index():
+    """Process-local index; one cache.get (version stamp) per call when warm."""
+    version = get_version(COUPON_NAMESPACE)
+    now = timezone.now()
+    index = _state["index"]
+    if index is not None and _state["version"] == version and not index.is_stale(now):
+        return index
+    with _lock:
+        index = _state["index"]
+        if index is None or _state["version"] != version or index.is_stale(now):
+            index = build_coupon_index(now)
+            _state["index"], _state["version"] = index, version
+    return index
+
+
+def cart_coupon_offers(products, now=None):
+    """
+    Cart modal rows: public coupons matching cart products, with the matched
+    SKUs resolved from the already-loaded products.
+    """
+    by_id = {p.id: p for p in products}
+    offers = []
+    for entry, matched in get_coupon_index().for_products(by_id, now=now):
+        offers.append({
+            "name": entry.name,
+            "code": entry.code,
+            "discount_percent": entry.discount_percent,
+            "valid_to": entry.valid_to,
+            "skus": [by_id[pid].sku for pid in sorted(matched)],
+        })
+    return offers
@@ -0,0 +1,18 @@
+# /coupons/signals.py
+"""Coupon ya uske applicable_products badle to coupon index ka version stamp bump karo."""
+from django.db import transaction
+from django.db.models.signals import m2m_changed, post_delete, post_save
+
+from quesecrides.cache_versions import bump_version
+
+from .index import COUPON_NAMESPACE
+from .models import Coupon
+
+
+def bump_coupon_version(sender, **kwargs):
+    transaction.on_commit(lambda: bump_version(COUPON_NAMESPACE))
+
+
+post_save.connect(bump_coupon_version, sender=Coupon, dispatch_uid="coupon-save")
+post_delete.connect(bump_coupon_version, sender=Coupon, dispatch_uid="coupon-delete")
+m2m_changed.connect(bump_coupon_version, sender=Coupon.applicable_products.through, dispatch_uid="coupon-products")
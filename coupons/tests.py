@@ -1,3 +1,153 @@
+from datetime import timedelta
+from decimal import Decimal
+from unittest import mock
+
+from django.core.cache import cache
 from django.test import TestCase
+from django.utils import timezone
+
+from bicycles.models import Category
+from quesecrides.cart_pricing import CartPricer
+from quesecrides.testing import make_product
+
+from .best import best_coupon_for_cart
+from .index import get_coupon_index
+from .models import Coupon
+
+
+class CouponFixture:
+
+    def setUp(self):
+        cache.clear()  # fresh "coupons" stamp -> index rebuilt for this test's rows
+        self.now = timezone.now()
+        category = Category.objects.create(name="Kids", slug="kids")
+        self.bike = make_product(category, "KC-1", price=1000)
+        self.trike = make_product(category, "KC-2", price=2000)
+
+    def coupon(self, code, percent, products=(), **fields):
+        values = {
+            "name": code, "code": code, "discount_percent": percent,
+            "valid_from": self.now - timedelta(days=1), "valid_to": self.now + timedelta(days=1),
+        }
+        values.update(fields)
+        with self.captureOnCommitCallbacks(execute=True):
+            coupon = Coupon.objects.create(**values)
+            if products:
+                coupon.applicable_products.set(products)
+        return coupon
+
+
+class BestCouponTests(CouponFixture, TestCase):
+
+    def best(self, cart=None):
+        pricing = CartPricer(cart or {self.bike.id: 1, self.trike.id: 1}).price()
+        return best_coupon_for_cart(pricing, now=self.now)
+
+    def test_all_products_coupon_beats_smaller_restricted_saving(self):
+        self.coupon("BIKE20", 20, [self.bike])   # 200 off
+        self.coupon("ALL10", 10)                 # 300 off
+        best = self.best()
+        self.assertEqual((best.coupon.code, best.saving), ("ALL10", Decimal("300.00")))
+        self.assertEqual(best.product_ids, {self.bike.id, self.trike.id})
+        self.assertEqual(best.pricing.discount_amount, Decimal("300.00"))
+
+    def test_restricted_coupon_discounts_only_its_lines(self):
+        self.coupon("ALL10", 10)
+        self.coupon("TRIKE30", 30, [self.trike])  # 600 off
+        best = self.best()
+        self.assertEqual((best.coupon.code, best.saving, best.product_ids), ("TRIKE30", Decimal("600.00"), {self.trike.id}))
+
+    def test_private_expired_and_inactive_coupons_are_skipped(self):
+        self.coupon("STAFF50", 50, public=False)
+        self.coupon("OLD40", 40, valid_to=self.now - timedelta(hours=1))
+        self.coupon("SOON40", 40, valid_from=self.now + timedelta(hours=1))
+        self.coupon("OFF40", 40, active=False)
+        self.coupon("ALL5", 5)
+        self.assertEqual(self.best().coupon.code, "ALL5")
+
+    def test_no_coupon_when_nothing_matches(self):
+        self.coupon("TRIKE30", 30, [self.trike])
+        self.assertIsNone(self.best({self.bike.id: 1}))
+        self.assertIsNone(best_coupon_for_cart(CartPricer({}).price(), now=self.now))
+
+    def test_ties_prefer_higher_percent_then_older_coupon(self):
+        self.coupon("ALL10", 10)                  # 300 off
+        self.coupon("TRIKE15", 15, [self.trike])  # 300 off, higher %
+        self.assertEqual(self.best().coupon.code, "TRIKE15")
+
+        first = self.coupon("BIKE40A", 40, [self.bike])  # 400 off each
+        self.coupon("BIKE40B", 40, [self.bike])
+        self.assertEqual(self.best().coupon.id, first.id)
+
+    def test_query_count_does_not_grow_with_coupons(self):
+        for i in range(3):
+            self.coupon(f"C{i}", 5 + i, [self.bike] if i % 2 else ())
+        pricing = CartPricer({self.bike.id: 1, self.trike.id: 1}).price()
+        get_coupon_index()
+        with self.assertNumQueries(0):  # warm index: pure in-memory evaluation
+            best_coupon_for_cart(pricing, now=self.now)
+
+        self.client.get(f"/add-to-cart/{self.bike.id}/")
+        self.client.get("/best-coupon/")  # warm session + index
+        with self.assertNumQueries(3):  # session, cart lines, products
+            self.client.get("/best-coupon/")
+
+        for i in range(30):
+            self.coupon(f"MORE{i}", 1, [self.trike] if i % 2 else ())
+        get_coupon_index()
+        with self.assertNumQueries(3):
+            response = self.client.get("/best-coupon/")
+        self.assertEqual(response.json()["code"], "C2")
+
+
+class CouponIndexTests(CouponFixture, TestCase):
+
+    def index_at(self, when):
+        with mock.patch("coupons.index.timezone.now", return_value=when):
+            return get_coupon_index()
+
+    def test_code_lookup_is_case_insensitive(self):
+        self.coupon("Kids10", 10)
+        index = get_coupon_index()
+        self.assertEqual(index.lookup("  kIDS10 ").code, "Kids10")
+        self.assertIsNone(index.lookup("KIDS11"))
+        self.assertIsNone(index.lookup(None))
+
+    def test_coupon_save_and_product_changes_rebuild_the_index(self):
+        coupon = self.coupon("KIDS10", 10, [self.bike])
+        self.assertEqual(get_coupon_index().lookup("kids10").discount_percent, 10)
+        with self.assertNumQueries(0):  # warm
+            get_coupon_index()
+
+        with self.captureOnCommitCallbacks(execute=True):
+            coupon.discount_percent = 15
+            coupon.save()
+        self.assertEqual(get_coupon_index().lookup("kids10").discount_percent, 15)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            coupon.applicable_products.add(self.trike)
+        index = get_coupon_index()
+        self.assertEqual(index.lookup("kids10").product_ids, {self.bike.id, self.trike.id})
+        self.assertEqual([e.code for e in index.by_product[self.trike.id]], ["KIDS10"])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            coupon.applicable_products.remove(self.bike)
+        self.assertNotIn(self.bike.id, get_coupon_index().by_product)
+
+    def test_validity_boundaries_rebuild_a_warm_index(self):
+        self.coupon("SOON", 10, valid_from=self.now + timedelta(hours=1))
+        self.coupon("ENDING", 20, valid_to=self.now + timedelta(hours=2))
+
+        index = self.index_at(self.now)
+        self.assertIsNone(index.lookup("soon", now=self.now))
+        with self.assertNumQueries(0):  # no boundary crossed yet
+            self.assertIs(self.index_at(self.now + timedelta(minutes=30)), index)
+
+        later = self.now + timedelta(minutes=90)
+        rebuilt = self.index_at(later)
+        self.assertIsNot(rebuilt, index)
+        self.assertEqual([e.code for e in rebuilt.live(later)], ["ENDING", "SOON"])
 
-# Create your tests here.
+        after = self.now + timedelta(hours=3)
+        self.assertEqual([e.code for e in self.index_at(after).live(after)], ["SOON"])
+        self.assertIsNone(self.index_at(after).lookup("ending", now=after))
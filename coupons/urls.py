@@ -4,4 +4,5 @@ from . import views
 urlpatterns = [
     path('apply-coupon/', views.apply_coupon, name='apply_coupon'),
     path('remove-coupon/', views.remove_coupon, name='remove_coupon'),
+    path('best-coupon/', views.best_coupon, name='best_coupon'),
 ]
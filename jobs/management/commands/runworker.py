@@ -0,0 +1,38 @@
+import signal
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from jobs.queue import run_pending
+
+
+class Command(BaseCommand):
+    help = "Process background jobs (OTP emails, post-payment work). Run under a process manager; several workers can run in parallel."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch", type=int, default=10, help="Jobs claimed per poll.")
+        parser.add_argument("--sleep", type=float, default=1.0, help="Seconds to wait when the queue is empty.")
+        parser.add_argument("--once", action="store_true", help="Drain due jobs once and exit (cron / tests).")
+
+    def handle(self, *args, **options):
+        self._stop = False
+        signal.signal(signal.SIGTERM, self._request_stop)
+        signal.signal(signal.SIGINT, self._request_stop)
+
+        processed = 0
+        while not self._stop:
+            close_old_connections()
+            done = run_pending(options["batch"])
+            processed += done
+            if options["once"]:
+                if not done:
+                    break
+            elif not done:
+                time.sleep(options["sleep"])
+
+        self.stdout.write(self.style.SUCCESS(f"Worker stopped after {processed} jobs."))
+
+    def _request_stop(self, signum, frame):
+        # Current batch finish hone do, phir nikal jao
+        self._stop = True
@@ -0,0 +1,146 @@
+# /jobs/queue.py
+"""
+Chhota DB-backed job queue.
+
+  @task("accounts.send_otp_email")      -> handler register (app ka tasks.py)
+  enqueue("accounts.send_otp_email", otp_id=..)
+                                        -> Job row, caller ke transaction me
+                                           (rollback = job bhi gaya)
+  manage.py runworker                   -> claim -> run -> done / retry
+
+Claim: PostgreSQL par SELECT .. FOR UPDATE SKIP LOCKED (kai workers ek saath,
+koi ek doosre ka wait nahi karta). SQLite par row locks nahi hain, wahan
+har candidate ka conditional UPDATE (status=queued -> running) hi claim hai.
+
+Fail hone par exponential backoff (JOB_RETRY_BASE_SECONDS x 2^attempt,
+JOB_RETRY_MAX_SECONDS tak); max_attempts ke baad status=failed. Worker crash
+me atke "running" jobs JOB_LOCK_TIMEOUT_SECONDS baad phir queue ho jaate hain,
+isliye handlers idempotent hone chahiye.
+
+Settings.JOBS_EAGER=True (dev bina worker ke) par job commit ke baad isi
+process me chal jaata hai.
+"""
+import logging
+import traceback
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import Job
+
+logger = logging.getLogger(__name__)
+
+_registry = {}
+
+
+def task(name):
+    """Register a job handler: handler(**payload)."""
+    def decorator(func):
+        _registry[name] = func
+        return func
+    return decorator
+
+
+def _setting(name, default):
+    return getattr(settings, name, default)
+
+
+def enqueue(task_name, run_at=None, max_attempts=None, **payload):
+    """Queue `task_name(**payload)`; payload must be JSON-serialisable."""
+    if task_name not in _registry:
+        raise KeyError(f"Unknown job task: {task_name}")
+    job = Job.objects.create(
+        task=task_name,
+        payload=payload,
+        run_at=run_at or timezone.now(),
+        max_attempts=max_attempts or _setting("JOB_MAX_ATTEMPTS", 5),
+    )
+    if _setting("JOBS_EAGER", False):
+        transaction.on_commit(lambda: run_job_id(job.pk))
+    return job
+
+
+def retry_delay(attempts):
+    base = _setting("JOB_RETRY_BASE_SECONDS", 30)
+    cap = _setting("JOB_RETRY_MAX_SECONDS", 60 * 60)
+    return timedelta(seconds=min(base * 2 ** max(attempts - 1, 0), cap))
+
+
+def requeue_stale(now=None):
+    """Running jobs whose worker died: back to the queue. Returns count."""
+    now = now or timezone.now()
+    timeout = timedelta(seconds=_setting("JOB_LOCK_TIMEOUT_SECONDS", 15 * 60))
+    return (Job.objects
+            .filter(status=Job.RUNNING, locked_at__lt=now - timeout)
+            .update(status=Job.QUEUED, locked_at=None))
+
+
+def claim_jobs(limit=10, now=None):
+    """Mark up to `limit` due jobs running for this worker and return them."""
+    now = now or timezone.now()
+    due = Job.objects.filter(status=Job.QUEUED, run_at__lte=now).order_by("run_at", "id")
+
+    if connection.features.has_select_for_update_skip_locked:
+        with transaction.atomic():
+            ids = list(due.select_for_update(skip_locked=True).values_list("id", flat=True)[:limit])
+            Job.objects.filter(id__in=ids).update(
+                status=Job.RUNNING, locked_at=now, attempts=F("attempts") + 1,
+            )
+    else:
+        # No row locks: the conditional flip is the claim (0 rows = another worker won)
+        ids = [
+            job_id for job_id in due.values_list("id", flat=True)[:limit]
+            if Job.objects.filter(pk=job_id, status=Job.QUEUED).update(
+                status=Job.RUNNING, locked_at=now, attempts=F("attempts") + 1,
+            )
+        ]
+    return list(Job.objects.filter(id__in=ids).order_by("run_at", "id"))
+
+
+def run_job(job):
+    """Run one claimed job and record the outcome. True on success."""
+    handler = _registry.get(job.task)
+    try:
+        if handler is None:
+            raise KeyError(f"Unknown job task: {job.task}")
+        handler(**job.payload)
+    except Exception:
+        error = traceback.format_exc()
+        now = timezone.now()
+        if job.attempts >= job.max_attempts:
+            logger.error("Job %s (%s) failed permanently:\n%s", job.pk, job.task, error)
+            Job.objects.filter(pk=job.pk).update(
+                status=Job.FAILED, locked_at=None, last_error=error, finished_at=now,
+            )
+        else:
+            logger.warning("Job %s (%s) failed, attempt %s/%s", job.pk, job.task, job.attempts, job.max_attempts)
+            Job.objects.filter(pk=job.pk).update(
+                status=Job.QUEUED, locked_at=None, last_error=error,
+                run_at=now + retry_delay(job.attempts),
+            )
+        return False
+
+    Job.objects.filter(pk=job.pk).update(status=Job.DONE, locked_at=None, finished_at=timezone.now())
+    return True
+
+
+def run_job_id(job_id):
+    """Claim and run a specific job now (JOBS_EAGER)."""
+    claimed = Job.objects.filter(pk=job_id, status=Job.QUEUED).update(
+        status=Job.RUNNING, locked_at=timezone.now(), attempts=F("attempts") + 1,
+    )
+    if claimed:
+        return run_job(Job.objects.get(pk=job_id))
+    return False
+
+
+def run_pending(limit=10):
+    """One worker pass: claim due jobs and run them. Returns jobs processed."""
+    requeue_stale()
+    jobs = claim_jobs(limit)
+    for job in jobs:
+        run_job(job)
+    return len(jobs)
@@ -0,0 +1,101 @@
+from datetime import timedelta
+from io import StringIO
+from unittest import mock
+
+from django.core import mail
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from accounts.models import CustomUser, EmailOTP
+
+from .models import Job
+from .queue import enqueue, requeue_stale, run_pending, task
+
+calls = []
+
+
+@task("jobs.tests.record")
+def record(value, fail=False):
+    if fail:
+        raise RuntimeError("boom")
+    calls.append(value)
+
+
+class JobQueueTests(TestCase):
+
+    def setUp(self):
+        calls.clear()
+
+    def test_enqueue_is_deferred_until_worker_runs(self):
+        enqueue("jobs.tests.record", value=1)
+        self.assertEqual(calls, [])
+
+        self.assertEqual(run_pending(), 1)
+        self.assertEqual(calls, [1])
+        self.assertEqual(Job.objects.get().status, Job.DONE)
+        self.assertEqual(run_pending(), 0)
+
+    def test_unknown_task_is_rejected(self):
+        with self.assertRaises(KeyError):
+            enqueue("jobs.tests.missing")
+
+    def test_failure_retries_with_backoff_then_gives_up(self):
+        job = enqueue("jobs.tests.record", max_attempts=2, value=1, fail=True)
+
+        with self.assertLogs("jobs.queue", "WARNING"):
+            run_pending()
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), (Job.QUEUED, 1))
+        self.assertGreater(job.run_at, timezone.now())
+        self.assertIn("boom", job.last_error)
+        self.assertEqual(run_pending(), 0)  # not due yet
+
+        Job.objects.filter(pk=job.pk).update(run_at=timezone.now())
+        with self.assertLogs("jobs.queue", "ERROR"):
+            run_pending()
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), (Job.FAILED, 2))
+
+    def test_stale_running_job_is_requeued(self):
+        job = enqueue("jobs.tests.record", value=1)
+        Job.objects.filter(pk=job.pk).update(status=Job.RUNNING, locked_at=timezone.now() - timedelta(hours=1))
+
+        self.assertEqual(requeue_stale(), 1)
+        run_pending()
+        self.assertEqual(calls, [1])
+
+    def test_runworker_once_drains_queue(self):
+        for value in range(3):
+            enqueue("jobs.tests.record", value=value)
+        out = StringIO()
+        # Like the test client: don't let the worker drop the test transaction's connection
+        with mock.patch("jobs.management.commands.runworker.close_old_connections"):
+            call_command("runworker", "--once", "--batch", "2", stdout=out)
+
+        self.assertEqual(sorted(calls), [0, 1, 2])
+        self.assertIn("3 jobs", out.getvalue())
+
+    @override_settings(JOBS_EAGER=True)
+    def test_eager_mode_runs_after_commit(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            enqueue("jobs.tests.record", value=7)
+            self.assertEqual(calls, [])
+        self.assertEqual(calls, [7])
+
+
+@override_settings(EMAIL_BACKEND="django.core.mail.backends.locmem.EmailBackend")
+class OTPEmailJobTests(TestCase):
+
+    def test_login_queues_otp_email(self):
+        user = CustomUser.objects.create_user(email="asha@example.com")
+        with mock.patch("django.core.mail.send_mail") as inline_send:
+            response = self.client.post("/login/", {"email": user.email})
+        self.assertEqual(response.status_code, 302)
+        inline_send.assert_not_called()
+        self.assertEqual(len(mail.outbox), 0)
+
+        run_pending()
+        otp = EmailOTP.objects.get(user=user)
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertIn(otp.otp_code, mail.outbox[0].body)
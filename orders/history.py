@@ -0,0 +1,42 @@
+# /orders/history.py
+"""
+My-account order history: keyset pages + cached per-user order count.
+
+Count cache key ko Order create/delete (orders.signals) aur guest order ke
+user se link hone (_ensure_order_user) par drop kiya jaata hai; admin me
+order ka user badalne jaise rare cases ke liye TTL upper bound hai.
+"""
+from django.core.cache import cache
+
+from quesecrides.keyset import paginate
+
+from .models import Order
+
+ORDERS_PER_PAGE = 10
+ORDER_HISTORY_ORDERING = ("-created_at", "-id")  # (user, created_at) index
+ORDER_COUNT_TIMEOUT = 60 * 60
+
+
+def _count_key(user_id):
+    return f"orders:count:user:{user_id}"
+
+
+def user_order_count(user_id):
+    key = _count_key(user_id)
+    count = cache.get(key)
+    if count is None:
+        count = Order.objects.filter(user_id=user_id).count()
+        cache.set(key, count, ORDER_COUNT_TIMEOUT)
+    return count
+
+
+def forget_user_order_count(*user_ids):
+    keys = [_count_key(uid) for uid in user_ids if uid]
+    if keys:
+        cache.delete_many(keys)
+
+
+def order_history_page(user, after=None, before=None, size=ORDERS_PER_PAGE):
+    """One page of the user's orders, newest first, items prefetched for the page only."""
+    queryset = Order.objects.filter(user=user).prefetch_related("items")
+    return paginate(queryset, ORDER_HISTORY_ORDERING, size, after=after, before=before)
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from orders.sales import rebuild_sales_rollup
+
+
+class Command(BaseCommand):
+    help = "Rebuild the ProductSalesDaily best-seller rollup from order history (backfill/repair)."
+
+    def handle(self, *args, **options):
+        rows = rebuild_sales_rollup()
+        self.stdout.write(self.style.SUCCESS(f"Sales rollup rebuilt: {rows} product/day rows."))
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from orders.stock import release_expired_holds
+
+
+class Command(BaseCommand):
+    help = "Release expired PayU stock holds back to available stock (deploy/quesecrides-release-holds.timer, every minute)."
+
+    def handle(self, *args, **options):
+        released = release_expired_holds()
+        self.stdout.write(self.style.SUCCESS(f"Released {released} expired stock holds."))
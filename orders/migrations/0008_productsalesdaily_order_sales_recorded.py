@@ -0,0 +1,65 @@
+# Generated by Django 5.2.4 on 2026-10-18 13:23
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Q, Sum
+from django.db.models.functions import TruncDate
+
+# Frozen copy of orders.sales rules at the time of this migration
+ONLINE_PAYMENT_METHODS = ("payu", "payu_upi")
+
+
+def counted_orders_q(prefix=""):
+    return (
+        ~Q(**{f"{prefix}payment_method__in": ONLINE_PAYMENT_METHODS})
+        | Q(**{f"{prefix}payment_status": "Paid"})
+    )
+
+
+def backfill_rollup(apps, schema_editor):
+    """Existing order history -> rollup, so the best-seller rail isn't empty after deploy."""
+    Order = apps.get_model("orders", "Order")
+    OrderItem = apps.get_model("orders", "OrderItem")
+    ProductSalesDaily = apps.get_model("orders", "ProductSalesDaily")
+    rows = (
+        OrderItem.objects.filter(counted_orders_q("order__"))
+        .annotate(day=TruncDate("order__created_at"))
+        .values("product_id", "day")
+        .annotate(quantity=Sum("quantity"))
+        .order_by()
+    )
+    ProductSalesDaily.objects.bulk_create(
+        [ProductSalesDaily(product_id=r["product_id"], day=r["day"], quantity=r["quantity"]) for r in rows],
+        batch_size=1000,
+    )
+    Order.objects.filter(counted_orders_q()).update(sales_recorded=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bicycles', '0021_category_path'),
+        ('orders', '0007_alter_order_payment_method'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='order',
+            name='sales_recorded',
+            field=models.BooleanField(default=False, editable=False),
+        ),
+        migrations.CreateModel(
+            name='ProductSalesDaily',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('quantity', models.PositiveIntegerField(default=0)),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_sales', to='bicycles.product')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['day'], name='orders_sales_day_idx')],
+                'constraints': [models.UniqueConstraint(fields=('product', 'day'), name='unique_product_sales_day')],
+            },
+        ),
+        migrations.RunPython(backfill_rollup, migrations.RunPython.noop),
+    ]
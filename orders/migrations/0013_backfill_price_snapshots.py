@@ -0,0 +1,63 @@
+from decimal import Decimal, ROUND_HALF_UP
+
+from django.db import migrations
+
+CENT = Decimal("0.01")
+
+
+def _money(value):
+    return Decimal(value).quantize(CENT, rounding=ROUND_HALF_UP)
+
+
+def backfill(apps, schema_editor):
+    """
+    Existing orders: copy line details from the current product and derive the
+    breakdown the way thank_you used to (coupon % on the whole subtotal,
+    shipping = whatever is left of total_amount).
+    """
+    Order = apps.get_model("orders", "Order")
+    OrderItem = apps.get_model("orders", "OrderItem")
+
+    for order in Order.objects.prefetch_related("items__product").iterator(chunk_size=200):
+        items = list(order.items.all())
+        percent = Decimal(order.coupon_discount or 0)
+        subtotal = Decimal("0.00")
+        for item in items:
+            product = item.product
+            price = product.price or Decimal("0.00")
+            item.title = product.title
+            item.sku = product.sku
+            item.image = product.image.name if product.image else ""
+            colors = [c for c in (product.color_1_name, product.color_2_name) if c]
+            item.color = " & ".join(colors)
+            item.product_url = product.url_path
+            item.unit_price = product.discount_price or price
+            item.mrp = price
+            item.shipping = (product.shipping_charge or Decimal("0.00")) * item.quantity
+            line_total = item.unit_price * item.quantity
+            item.coupon_discount = _money(line_total * percent / 100)
+            subtotal += line_total
+        OrderItem.objects.bulk_update(items, [
+            "title", "sku", "image", "color", "product_url",
+            "unit_price", "mrp", "shipping", "coupon_discount",
+        ])
+
+        discount = _money(subtotal * percent / 100)
+        total = _money(Decimal(str(order.total_amount or 0)))
+        Order.objects.filter(pk=order.pk).update(
+            subtotal=subtotal,
+            discount_amount=discount,
+            shipping_total=max(total - max(subtotal - discount, Decimal("0.00")), Decimal("0.00")),
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orders', '0012_price_snapshots'),
+        ('bicycles', '0024_product_reserved'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill, migrations.RunPython.noop),
+    ]
@@ -26,16 +26,96 @@ class Order(models.Model):
     total_amount = models.FloatField()
     coupon_code = models.CharField(max_length=50, blank=True, null=True)
     coupon_discount = models.PositiveIntegerField(default=0)
+    # Price breakdown at placement (CartPricing); total_amount = subtotal - discount_amount + shipping_total
+    subtotal = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    discount_amount = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    shipping_total = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    # True once this order's lines are counted in ProductSalesDaily (see orders/sales.py)
+    sales_recorded = models.BooleanField(default=False, editable=False)
+    # True once paid lines are deducted from Product.stock (see orders/stock.py)
+    stock_committed = models.BooleanField(default=False, editable=False)
+    # Checkout form token; same token = same order (double-submit guard, orders/placement.py)
+    idempotency_key = models.CharField(max_length=64, unique=True, null=True, blank=True, editable=False)
 
     created_at = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        indexes = [
+            # PayU surl/furl callbacks look orders up by txnid
+            models.Index(fields=['transaction_id'], name='orders_order_txnid_idx'),
+            # my_account: user's orders newest first
+            models.Index(fields=['user', 'created_at'], name='orders_order_user_created_idx'),
+        ]
+
     def __str__(self):
         return f"Order #{self.id} - {self.name}"
 
 class OrderItem(models.Model):
+    """
+    One order line. Product details and prices are copied at placement
+    (orders.placement.create_order_items), so order pages render from this
+    row alone and stay as billed after catalog edits.
+    """
     order = models.ForeignKey(Order, on_delete=models.CASCADE, related_name='items')
     product = models.ForeignKey(Product, on_delete=models.CASCADE)
     quantity = models.PositiveIntegerField(default=1)
 
+    title = models.CharField(max_length=200, blank=True)
+    sku = models.CharField(max_length=200, blank=True)
+    image = models.ImageField(upload_to='products/', blank=True, editable=False)  # product's file, not a copy
+    color = models.CharField(max_length=100, blank=True)
+    product_url = models.CharField(max_length=255, blank=True)
+    unit_price = models.DecimalField(max_digits=10, decimal_places=2, default=0)  # selling price per unit
+    mrp = models.DecimalField(max_digits=10, decimal_places=2, default=0)         # list price per unit
+    shipping = models.DecimalField(max_digits=10, decimal_places=2, default=0)    # line shipping, before the free-shipping rule
+    coupon_discount = models.DecimalField(max_digits=10, decimal_places=2, default=0)
+
+    @property
+    def line_total(self):
+        return self.unit_price * self.quantity
+
+    def __str__(self):
+        return f"{self.title or self.product_id} (x{self.quantity})"
+
+class ProductSalesDaily(models.Model):
+    """
+    Per-product units sold per day (best-seller rollup).
+    Maintained incrementally by orders.sales.record_order_sales;
+    `manage.py rebuild_sales_rollup` recomputes it from order history.
+    """
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='daily_sales')
+    day = models.DateField()
+    quantity = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['product', 'day'], name='unique_product_sales_day')
+        ]
+        indexes = [
+            models.Index(fields=['day'], name='orders_sales_day_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.product_id} @ {self.day}: {self.quantity}"
+
+class StockHold(models.Model):
+    """
+    Units of a product held for a pending PayU order until it is paid,
+    fails or expires. Mirrors Product.reserved; see orders/stock.py.
+    """
+    order = models.ForeignKey(Order, on_delete=models.CASCADE, related_name='stock_holds')
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='stock_holds')
+    quantity = models.PositiveIntegerField()
+    expires_at = models.DateTimeField()
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['order', 'product'], name='unique_order_stock_hold')
+        ]
+        indexes = [
+            models.Index(fields=['expires_at'], name='orders_hold_expires_idx'),
+        ]
+
     def __str__(self):
-        return f"{self.product.title} (x{self.quantity})"
\ No newline at end of file
+        return f"Order #{self.order_id}: {self.product_id} x{self.quantity}"
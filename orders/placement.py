@@ -0,0 +1,112 @@
+# /orders/placement.py
+"""
+Order placement: save_order (Razorpay/COD) aur PayU initiate dono yahi use karte hain.
+
+Ek transaction me Order (price breakdown ke saath) + saari OrderItem rows
+(price snapshot, ek bulk INSERT) + sales rollup; beech me fail ho to kuch
+bhi aadha-likha nahi bachta. Checkout form ka
+idempotency_key same ho (double click / resubmit) to pehle wala order hi
+wapas milta hai, naya nahi banta.
+"""
+import uuid
+
+from django.db import IntegrityError, transaction
+
+from .models import Order, OrderItem
+from .sales import counts_as_sale, record_order_sales
+from .stock import commit_order_stock, reserve_order_stock
+
+SESSION_CHECKOUT_TOKEN = "checkout_token"
+
+
+def checkout_token(session):
+    """Idempotency key for the checkout form (one per placed order)."""
+    token = session.get(SESSION_CHECKOUT_TOKEN)
+    if not token:
+        token = uuid.uuid4().hex
+        session[SESSION_CHECKOUT_TOKEN] = token
+    return token
+
+
+def _color(product):
+    colors = [c for c in (product.color_1_name, product.color_2_name) if c]
+    return " & ".join(colors)
+
+
+def create_order_items(order, lines):
+    """
+    Persist priced cart lines (CartPricing.lines) as OrderItem rows in one
+    INSERT, with the product details and prices as billed.
+    """
+    OrderItem.objects.bulk_create([
+        OrderItem(
+            order=order,
+            product=line.product,
+            quantity=line.qty,
+            title=line.product.title,
+            sku=line.product.sku,
+            image=line.product.image.name if line.product.image else "",
+            color=_color(line.product),
+            product_url=line.product.get_absolute_url(),
+            unit_price=line.unit_price,
+            mrp=line.product.price or 0,
+            shipping=line.shipping,
+            coupon_discount=line.coupon_discount,
+        )
+        for line in lines
+    ])
+
+
+def _clean_key(idempotency_key):
+    return (idempotency_key or "").strip()[:64] or None
+
+
+def placed_order_for(idempotency_key):
+    """Order already placed with this key, else None."""
+    idempotency_key = _clean_key(idempotency_key)
+    if not idempotency_key:
+        return None
+    return Order.objects.filter(idempotency_key=idempotency_key).first()
+
+
+def place_order(pricing, idempotency_key=None, reserve_stock=False, **order_fields):
+    """
+    Persist a priced cart as an Order. Returns (order, created);
+    created is False when `idempotency_key` already placed an order.
+    `order_fields`: customer/payment columns (name, email, payment_method, ...).
+    reserve_stock=True holds the lines' stock in the same transaction and
+    raises orders.stock.OutOfStock (nothing written) if a line can't be held.
+    """
+    idempotency_key = _clean_key(idempotency_key)
+    existing = placed_order_for(idempotency_key)
+    if existing:
+        return existing, False
+
+    try:
+        with transaction.atomic():
+            order = Order.objects.create(
+                total_amount=float(pricing.total),
+                coupon_code=pricing.coupon_code,
+                coupon_discount=pricing.coupon_percent,
+                subtotal=pricing.subtotal,
+                discount_amount=pricing.discount_amount,
+                shipping_total=pricing.shipping_total,
+                idempotency_key=idempotency_key,
+                **order_fields,
+            )
+            create_order_items(order, pricing.lines)
+            if reserve_stock:
+                reserve_order_stock(order, pricing.snapshot())
+            # Non-PayU orders count as sales and leave stock right away;
+            # pending PayU orders do both on payu_success
+            if counts_as_sale(order):
+                record_order_sales(order)
+                commit_order_stock(order)
+    except IntegrityError:
+        # Concurrent submit with the same key won the race; any other
+        # integrity failure (items, stock, ...) is a real error
+        winner = placed_order_for(idempotency_key)
+        if winner is None:
+            raise
+        return winner, False
+    return order, True
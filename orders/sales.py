@@ -0,0 +1,96 @@
+# /orders/sales.py
+"""
+Best-seller rollup (ProductSalesDaily) maintenance.
+
+Kab count hota hai:
+  - PayU orders (payu / payu_upi): jab payment "Paid" mark ho
+  - Baaki (Razorpay full / COD): order create hote hi
+Order.sales_recorded flag se har order sirf ek baar count hota hai.
+"""
+from collections import Counter
+
+from django.db import transaction
+from django.db.models import Case, F, IntegerField, Q, Sum, Value, When
+from django.db.models.functions import TruncDate
+
+from .models import Order, OrderItem, ProductSalesDaily
+
+ONLINE_PAYMENT_METHODS = ("payu", "payu_upi")
+
+
+def counts_as_sale(order):
+    if order.payment_method in ONLINE_PAYMENT_METHODS:
+        return order.payment_status == "Paid"
+    return True
+
+
+def counted_orders_q(prefix=""):
+    """Same rule as counts_as_sale(), as a Q for querysets."""
+    return (
+        ~Q(**{f"{prefix}payment_method__in": ONLINE_PAYMENT_METHODS})
+        | Q(**{f"{prefix}payment_status": "Paid"})
+    )
+
+
+def _add_quantities(day, per_product):
+    """
+    Add {product_id: qty} to the day's rows in two statements, whatever the
+    line count: create missing rows at 0 (a concurrent first sale of the day
+    is simply ignored), then one UPDATE ... quantity + CASE product_id.
+    """
+    ProductSalesDaily.objects.bulk_create(
+        [ProductSalesDaily(product_id=product_id, day=day, quantity=0) for product_id in per_product],
+        ignore_conflicts=True,
+    )
+    increment = Case(
+        *[When(product_id=product_id, then=Value(qty)) for product_id, qty in per_product.items()],
+        default=Value(0),
+        output_field=IntegerField(),
+    )
+    (ProductSalesDaily.objects
+     .filter(day=day, product_id__in=list(per_product))
+     .update(quantity=F("quantity") + increment))
+
+
+def record_order_sales(order):
+    """
+    Add this order's lines to the rollup (no-op if it doesn't count yet
+    or was already recorded). Safe to call more than once.
+    """
+    if not counts_as_sale(order):
+        return False
+
+    with transaction.atomic():
+        # Conditional flip = idempotency guard (duplicate callbacks / retries)
+        claimed = Order.objects.filter(pk=order.pk, sales_recorded=False).update(sales_recorded=True)
+        if not claimed:
+            return False
+        order.sales_recorded = True
+
+        day = order.created_at.date()
+        per_product = Counter()
+        for product_id, qty in OrderItem.objects.filter(order=order).values_list("product_id", "quantity"):
+            per_product[product_id] += qty
+        if per_product:
+            _add_quantities(day, per_product)
+    return True
+
+
+def rebuild_sales_rollup():
+    """Recompute the whole rollup from order history. Returns rows written."""
+    with transaction.atomic():
+        rows = (
+            OrderItem.objects.filter(counted_orders_q("order__"))
+            .annotate(day=TruncDate("order__created_at"))
+            .values("product_id", "day")
+            .annotate(quantity=Sum("quantity"))
+            .order_by()
+        )
+        ProductSalesDaily.objects.all().delete()
+        ProductSalesDaily.objects.bulk_create(
+            [ProductSalesDaily(product_id=r["product_id"], day=r["day"], quantity=r["quantity"]) for r in rows],
+            batch_size=1000,
+        )
+        Order.objects.filter(counted_orders_q()).update(sales_recorded=True)
+        Order.objects.exclude(counted_orders_q()).update(sales_recorded=False)
+        return ProductSalesDaily.objects.count()
@@ -0,0 +1,14 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .history import forget_user_order_count
+from .models import Order
+
+
+@receiver(post_save, sender=Order, dispatch_uid="orders_forget_count_on_save")
+@receiver(post_delete, sender=Order, dispatch_uid="orders_forget_count_on_delete")
+def forget_order_count(sender, instance, **kwargs):
+    if instance.user_id:
+        user_id = instance.user_id
+        transaction.on_commit(lambda: forget_user_order_count(user_id))
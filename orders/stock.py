@@ -0,0 +1,150 @@
+# /orders/stock.py
+"""
+Stock reservation for PayU checkouts.
+
+  payu_initiate  -> reserve_order_stock: har line ke liye
+                    UPDATE product SET reserved = reserved + qty
+                    WHERE id = .. AND stock >= reserved + qty
+                    (koi row lock hold nahi hota; 0 rows = out of stock)
+  payu_success   -> commit_order_stock: hold hatao, stock se qty ghatao
+  payu_failure   -> release_order_stock: hold hatao, reserved wapas
+                    (sirf signed callback; Failed ke baad late success par
+                    rehold_order_stock phir commit)
+  COD / Razorpay -> place_order hi commit_order_stock karta hai (stock ghatao)
+  expiry         -> `manage.py release_stock_holds`
+                    (deploy/quesecrides-release-holds.timer, har minute)
+
+Holds sirf Product.track_stock wale products par lagte hain; baaki (stock
+kabhi enter hi nahi hua) checkout ko kabhi block nahi karte.
+
+Order.stock_committed aur hold rows ka delete dono conditional hain, isliye
+duplicate callbacks / sweeper ke saath race me bhi count do baar nahi badalta.
+"""
+from collections import Counter
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F, Value
+from django.db.models.functions import Greatest
+from django.utils import timezone
+
+from bicycles.models import Product
+
+from .models import Order, OrderItem, StockHold
+
+
+class OutOfStock(Exception):
+    def __init__(self, product):
+        self.product = product
+        super().__init__(f"Not enough stock for {product}")
+
+
+def holds_enabled():
+    return getattr(settings, "STOCK_HOLDS_ENABLED", True)
+
+
+def hold_ttl():
+    return timedelta(minutes=getattr(settings, "STOCK_HOLD_MINUTES", 15))
+
+
+def reserve_order_stock(order, snap):
+    """
+    Hold stock for every (product, qty) line of a pending order. Must run in
+    the order's transaction: OutOfStock rolls back the holds and the order.
+    """
+    if not holds_enabled():
+        return
+    per_product = Counter()
+    products = {}
+    for product, qty in snap:
+        per_product[product.id] += max(int(qty), 1)
+        products[product.id] = product
+    tracked = set(Product.objects.filter(pk__in=per_product, track_stock=True).values_list("id", flat=True))
+    per_product = Counter({product_id: qty for product_id, qty in per_product.items() if product_id in tracked})
+
+    # Fixed order (product id) so concurrent multi-line checkouts can't deadlock
+    for product_id in sorted(per_product):
+        qty = per_product[product_id]
+        held = (Product.objects
+                .filter(pk=product_id, stock__gte=F("reserved") + qty)
+                .update(reserved=F("reserved") + qty))
+        if not held:
+            raise OutOfStock(products[product_id])
+
+    expires_at = timezone.now() + hold_ttl()
+    StockHold.objects.bulk_create([
+        StockHold(order=order, product_id=product_id, quantity=qty, expires_at=expires_at)
+        for product_id, qty in per_product.items()
+    ])
+
+
+def rehold_order_stock(order):
+    """
+    Failed -> Paid (PayU captured the payment after a signed failure already
+    released the holds): hold the lines again so commit_order_stock deducts
+    real stock. False if a line is out of stock by now -- the order stays
+    paid, the oversell needs a manual follow-up.
+    """
+    if not holds_enabled():
+        return True
+    snap = [(item.product, item.quantity) for item in OrderItem.objects.filter(order=order).select_related("product")]
+    try:
+        with transaction.atomic():
+            reserve_order_stock(order, snap)
+    except OutOfStock:
+        return False
+    return True
+
+
+def _release_hold(hold):
+    # Delete is the claim: only the caller that removed the row gives units back
+    deleted, _ = StockHold.objects.filter(pk=hold.pk).delete()
+    if deleted:
+        (Product.objects.filter(pk=hold.product_id)
+         .update(reserved=Greatest(F("reserved") - hold.quantity, Value(0))))
+    return bool(deleted)
+
+
+def release_order_stock(order):
+    """Give back a pending order's holds (payment failed / abandoned)."""
+    with transaction.atomic():
+        return sum(_release_hold(hold) for hold in StockHold.objects.filter(order=order))
+
+
+def commit_order_stock(order):
+    """
+    Paid / placed order: deduct its lines from stock and drop its holds. Runs
+    once per order (Order.stock_committed flip); lines whose hold already
+    expired (or were never held) are still deducted.
+    """
+    with transaction.atomic():
+        claimed = Order.objects.filter(pk=order.pk, stock_committed=False).update(stock_committed=True)
+        if not claimed:
+            return False
+        order.stock_committed = True
+
+        held = {}
+        for hold in StockHold.objects.filter(order=order):
+            if StockHold.objects.filter(pk=hold.pk).delete()[0]:
+                held[hold.product_id] = hold.quantity
+
+        per_product = Counter()
+        for product_id, qty in OrderItem.objects.filter(order=order).values_list("product_id", "quantity"):
+            per_product[product_id] += qty
+        for product_id in sorted(per_product):
+            (Product.objects.filter(pk=product_id).update(
+                stock=Greatest(F("stock") - per_product[product_id], Value(0)),
+                reserved=Greatest(F("reserved") - held.get(product_id, 0), Value(0)),
+            ))
+    return True
+
+
+def release_expired_holds(now=None):
+    """Sweeper: release every hold past its expiry. Returns holds released."""
+    now = now or timezone.now()
+    released = 0
+    for hold in StockHold.objects.filter(expires_at__lt=now).order_by("product_id").iterator():
+        with transaction.atomic():
+            released += _release_hold(hold)
+    return released
@@ -0,0 +1,9 @@
+# /orders/tasks.py
+from cartwatch.models import CartLead
+from jobs.queue import task
+
+
+@task("orders.clear_cart_lead")
+def clear_cart_lead(phone):
+    """Customer ne order kar diya: abandoned-cart lead ab lead nahi raha."""
+    CartLead.objects.filter(phone=phone).delete()
@@ -1,3 +1,383 @@
-from django.test import TestCase
+import hashlib
+import threading
+from datetime import timedelta
+from unittest import mock
 
-# Create your tests here.
+from django.db import IntegrityError, connection
+from django.test import Client, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from accounts.models import CustomUser
+from bicycles.models import Category, Product
+from cartwatch.cart_store import DBCartStore, user_owner
+from cartwatch.models import CartLead
+from jobs.queue import run_pending
+from quesecrides.cart_pricing import CartPricer
+from quesecrides.testing import LOCAL_STORAGES, make_order, make_product
+
+from .models import Order, OrderItem, ProductSalesDaily, StockHold
+from .placement import placed_order_for, place_order
+from .sales import rebuild_sales_rollup, record_order_sales
+from .stock import OutOfStock, release_expired_holds, reserve_order_stock
+
+PAYU_SETTINGS = {"PAYU_MERCHANT_KEY": "testkey", "PAYU_MERCHANT_SALT": "testsalt"}
+
+
+def payu_callback(order, status="success", amount=None):
+    """POST data PayU would send to surl/furl for `order`, correctly signed."""
+    data = {
+        "status": status,
+        "txnid": order.transaction_id,
+        "amount": amount or f"{order.total_amount:.2f}",
+        "productinfo": f"Order_{order.id}",
+        "firstname": order.name,
+        "email": order.email,
+    }
+    seq = (
+        f"{PAYU_SETTINGS['PAYU_MERCHANT_SALT']}|{data['status']}|||||||||||{data['email']}|{data['firstname']}"
+        f"|{data['productinfo']}|{data['amount']}|{data['txnid']}|{PAYU_SETTINGS['PAYU_MERCHANT_KEY']}"
+    )
+    data["hash"] = hashlib.sha512(seq.encode("utf-8")).hexdigest().lower()
+    return data
+
+
+class PayUCallbackFixture:
+    """Pending PayU order for 2 units of a 5-unit product, stock held."""
+
+    def make_pending_order(self):
+        category = Category.objects.create(name="Kids", slug="kids")
+        self.product = make_product(category, price=5000, discount_price=4500, stock=5, track_stock=True)
+        order = make_order(
+            payment_method="payu", payment_status="Pending", transaction_id="txn-dup-1", total_amount=9000.0,
+        )
+        OrderItem.objects.create(order=order, product=self.product, quantity=2)
+        reserve_order_stock(order, [(self.product, 2)])
+        CartLead.objects.create(name="Asha", phone=order.phone, cart_items="Kids Cycle (Qty: 2)")
+        return order
+
+    def assert_processed_once(self, order):
+        order.refresh_from_db()
+        self.product.refresh_from_db()
+        self.assertEqual(order.payment_status, "Paid")
+        self.assertTrue(order.sales_recorded)
+        self.assertTrue(order.stock_committed)
+        self.assertEqual(self.product.stock, 3)
+        self.assertEqual(self.product.reserved, 0)
+        self.assertFalse(StockHold.objects.filter(order=order).exists())
+        self.assertEqual(ProductSalesDaily.objects.get(product=self.product).quantity, 2)
+        self.assertFalse(CartLead.objects.filter(phone=order.phone).exists())
+        self.assertIsNotNone(order.user_id)
+
+
+@override_settings(**PAYU_SETTINGS)
+class PayUCallbackIdempotencyTests(PayUCallbackFixture, TestCase):
+
+    def setUp(self):
+        self.order = self.make_pending_order()
+
+    def post_success(self, data):
+        response = Client().post("/payu-success/", data)
+        run_pending()
+        return response
+
+    def test_duplicate_success_callbacks_apply_once(self):
+        data = payu_callback(self.order)
+        responses = [self.post_success(data) for _ in range(5)]
+
+        self.assertTrue(all(r.status_code == 302 for r in responses))
+        self.assert_processed_once(self.order)
+
+    def test_failure_after_success_keeps_order_paid(self):
+        self.post_success(payu_callback(self.order))
+        Client().post("/payu-failure/", payu_callback(self.order, status="failure"))
+
+        self.assert_processed_once(self.order)
+
+    def test_bad_hash_does_not_touch_paid_order(self):
+        self.post_success(payu_callback(self.order))
+        forged = dict(payu_callback(self.order), hash="0" * 128)
+        Client().post("/payu-success/", forged)
+
+        self.assert_processed_once(self.order)
+
+    def assert_still_pending_with_hold(self):
+        self.order.refresh_from_db()
+        self.product.refresh_from_db()
+        self.assertEqual(self.order.payment_status, "Pending")
+        self.assertEqual((self.product.stock, self.product.reserved), (5, 2))
+        self.assertTrue(StockHold.objects.filter(order=self.order).exists())
+
+    def test_unsigned_callbacks_change_nothing(self):
+        # Only the txnid is needed to post these
+        Client().post("/payu-failure/", {"txnid": self.order.transaction_id})
+        Client().post("/payu-success/", dict(payu_callback(self.order, status="failure"), hash="0" * 128))
+
+        self.assert_still_pending_with_hold()
+
+    def test_amount_mismatch_leaves_order_pending(self):
+        with self.assertLogs("orders.views", "ERROR"):
+            Client().post("/payu-success/", payu_callback(self.order, amount="1.00"))
+
+        self.assert_still_pending_with_hold()
+
+    def test_success_after_signed_failure_reholds_stock(self):
+        Client().post("/payu-failure/", payu_callback(self.order, status="failure"))
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.reserved, 0)
+
+        self.post_success(payu_callback(self.order))
+        self.assert_processed_once(self.order)
+
+    def test_success_after_failure_when_sold_out_is_logged(self):
+        Client().post("/payu-failure/", payu_callback(self.order, status="failure"))
+        Product.objects.filter(pk=self.product.pk).update(stock=1)
+
+        with self.assertLogs("orders.views", "ERROR"):
+            self.post_success(payu_callback(self.order))
+        self.order.refresh_from_db()
+        self.product.refresh_from_db()
+        self.assertEqual(self.order.payment_status, "Paid")
+        self.assertEqual((self.product.stock, self.product.reserved), (0, 0))
+
+
+class OrderStockTests(TestCase):
+
+    def setUp(self):
+        category = Category.objects.create(name="Kids", slug="kids")
+        self.product = make_product(category, price=5000)
+
+    def place(self, payment_method, **fields):
+        pricing = CartPricer({self.product.id: 2}).price()
+        return place_order(
+            pricing, reserve_stock=payment_method == "payu", name="Asha", phone="9999999999",
+            email="asha@example.com", address="-", pincode="110001", city="Delhi", state="Delhi",
+            payment_method=payment_method, **fields,
+        )[0]
+
+    def test_cod_order_decrements_stock(self):
+        Product.objects.filter(pk=self.product.pk).update(stock=5)
+        order = self.place("cod")
+        self.product.refresh_from_db()
+        self.assertTrue(order.stock_committed)
+        self.assertEqual(self.product.stock, 3)
+
+    def test_untracked_stock_does_not_block_payu_checkout(self):
+        order = self.place("payu", payment_status="Pending", transaction_id="txn-1")
+        self.product.refresh_from_db()
+        self.assertFalse(order.stock_committed)
+        self.assertEqual((self.product.stock, self.product.reserved), (0, 0))
+        self.assertFalse(StockHold.objects.exists())
+
+    def test_tracked_stock_holds_and_limits_payu_checkout(self):
+        Product.objects.filter(pk=self.product.pk).update(stock=3, track_stock=True)
+        self.place("payu", payment_status="Pending", transaction_id="txn-1")
+        with self.assertRaises(OutOfStock):
+            self.place("payu", payment_status="Pending", transaction_id="txn-2")
+        self.product.refresh_from_db()
+        self.assertEqual((self.product.stock, self.product.reserved), (3, 2))
+
+        StockHold.objects.update(expires_at=timezone.now() - timedelta(minutes=1))
+        self.assertEqual(release_expired_holds(), 1)
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.reserved, 0)
+
+
+@override_settings(STORAGES=LOCAL_STORAGES)
+class CheckoutIdempotencyTests(TestCase):
+    """Same checkout token twice -> one order, one stock decrement, one sales row."""
+
+    ORDER_FIELDS = {
+        "name": "Asha", "phone": "9999999999", "email": "asha@example.com", "address": "-",
+        "pincode": "110001", "city": "Delhi", "state": "Delhi", "payment_method": "cod",
+    }
+
+    def setUp(self):
+        category = Category.objects.create(name="Kids", slug="kids")
+        self.product = make_product(category, price=5000, stock=5)
+
+    def place(self, key="tok-1"):
+        return place_order(CartPricer({self.product.id: 2}).price(), idempotency_key=key, **self.ORDER_FIELDS)
+
+    def assert_placed_once(self):
+        self.product.refresh_from_db()
+        self.assertEqual(Order.objects.count(), 1)
+        self.assertEqual(OrderItem.objects.count(), 1)
+        self.assertEqual(self.product.stock, 3)
+        self.assertEqual(list(ProductSalesDaily.objects.values_list("quantity", flat=True)), [2])
+
+    def test_double_submit_from_checkout_returns_same_order(self):
+        self.client.get(f"/add-to-cart/{self.product.id}/")
+        self.client.post("/save-order/", {"idempotency_key": "tok-1", **self.ORDER_FIELDS})
+        order = Order.objects.get()
+        response = self.client.post("/save-order/", {"idempotency_key": "tok-1", **self.ORDER_FIELDS})
+        self.assertRedirects(response, f"/thank-you/?order_id={order.id}", fetch_redirect_response=False)
+        self.product.refresh_from_db()
+        self.assertEqual((Order.objects.count(), self.product.stock), (1, 4))
+
+    def test_same_key_returns_same_order(self):
+        order, created = self.place()
+        again, created_again = self.place()
+        self.assertEqual((again.pk, created, created_again), (order.pk, True, False))
+        self.assert_placed_once()
+
+    def test_concurrent_submit_losing_the_insert_race_gets_the_winner(self):
+        order, _ = self.place()
+        # Loser checked before the winner committed, then hit the unique key
+        with mock.patch("orders.placement.placed_order_for", side_effect=[None, order]):
+            again, created = self.place()
+        self.assertEqual((again.pk, created), (order.pk, False))
+        self.assert_placed_once()
+
+    def test_failure_part_way_rolls_everything_back(self):
+        with mock.patch("orders.placement.record_order_sales", side_effect=RuntimeError("boom")):
+            with self.assertRaises(RuntimeError):
+                self.place()
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.stock, 5)
+        self.assertFalse(Order.objects.exists() or OrderItem.objects.exists() or ProductSalesDaily.objects.exists())
+        self.assertIsNone(placed_order_for("tok-1"))
+
+    def test_other_integrity_errors_are_not_taken_for_a_duplicate(self):
+        with mock.patch("orders.placement.create_order_items", side_effect=IntegrityError("item row")):
+            with self.assertRaisesMessage(IntegrityError, "item row"):
+                self.place()
+        self.assertFalse(Order.objects.exists())
+
+
+@override_settings(STORAGES=LOCAL_STORAGES)
+class CheckoutCartMergeTests(TestCase):
+    """Checkout logs the customer in (guest cart merges into the saved cart); only ordered lines go."""
+
+    def test_checkout_keeps_saved_lines_that_were_not_ordered(self):
+        category = Category.objects.create(name="Kids", slug="kids")
+        ordered = make_product(category, "KC-1", price=5000)
+        saved = make_product(category, "KC-2", price=3000)
+        user = CustomUser.objects.create_user(email="asha@example.com")
+        DBCartStore(user_owner(user)).add(saved.id, 3)
+
+        self.client.get(f"/add-to-cart/{ordered.id}/")
+        self.client.post("/save-order/", {
+            "idempotency_key": "tok-1", "name": "Asha", "phone": "9999999999", "email": user.email,
+            "address": "-", "pincode": "110001", "city": "Delhi", "state": "Delhi", "payment_method": "cod",
+        })
+
+        order = Order.objects.get()
+        self.assertEqual(list(order.items.values_list("product_id", flat=True)), [ordered.id])
+        self.assertEqual(DBCartStore(user_owner(user)).items(), {saved.id: 3})
+
+
+class SalesRollupTests(TestCase):
+
+    def setUp(self):
+        category = Category.objects.create(name="Kids", slug="kids")
+        self.bike = make_product(category, "KC-1")
+        self.trike = make_product(category, "KC-2")
+
+    def order(self, lines, **fields):
+        order = make_order(**fields)
+        for product, qty in lines:
+            OrderItem.objects.create(order=order, product=product, quantity=qty)
+        return order
+
+    def rollup(self):
+        return sorted(ProductSalesDaily.objects.values_list("product_id", "day", "quantity"))
+
+    def test_record_order_sales_counts_an_order_once(self):
+        order = self.order([(self.bike, 2), (self.trike, 1), (self.bike, 1)])
+        self.assertTrue(record_order_sales(order))
+        self.assertFalse(record_order_sales(order))
+        self.assertFalse(record_order_sales(Order.objects.get(pk=order.pk)))  # fresh copy, flag from DB
+        day = order.created_at.date()
+        self.assertEqual(self.rollup(), [(self.bike.id, day, 3), (self.trike.id, day, 1)])
+
+    def test_pending_online_order_is_not_counted_until_paid(self):
+        order = self.order([(self.bike, 2)], payment_method="payu", payment_status="Pending")
+        self.assertFalse(record_order_sales(order))
+        self.assertEqual(self.rollup(), [])
+
+    def test_rebuild_matches_incremental_rollup(self):
+        orders = [
+            self.order([(self.bike, 2)]),
+            self.order([(self.bike, 1), (self.trike, 4)]),
+            self.order([(self.trike, 1)], payment_method="payu", payment_status="Paid"),
+            self.order([(self.bike, 7)], payment_method="payu", payment_status="Pending"),
+        ]
+        for order in orders:
+            record_order_sales(order)
+        incremental = self.rollup()
+
+        rebuild_sales_rollup()
+        self.assertEqual(self.rollup(), incremental)
+        self.assertEqual(
+            list(Order.objects.order_by("pk").values_list("sales_recorded", flat=True)), [True, True, True, False]
+        )
+
+
+@override_settings(**PAYU_SETTINGS)
+class ConcurrentPayUCallbackTests(PayUCallbackFixture, TransactionTestCase):
+    """Fires duplicate success callbacks from parallel threads at the same order."""
+
+    CALLBACKS = 8
+
+    def fire_concurrently(self, data):
+        barrier = threading.Barrier(self.CALLBACKS)
+        statuses, errors = [], []
+
+        def worker():
+            try:
+                barrier.wait()
+                statuses.append(Client().post("/payu-success/", data).status_code)
+            except Exception as exc:  # surfaced below
+                errors.append(exc)
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=worker) for _ in range(self.CALLBACKS)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return statuses, errors
+
+    def test_concurrent_duplicate_callbacks_apply_once(self):
+        # PostgreSQL: row locks; SQLite (file test DB, IMMEDIATE transactions):
+        # writers queue on the database lock -- either way one Paid transition
+        order = self.make_pending_order()
+        statuses, errors = self.fire_concurrently(payu_callback(order))
+        run_pending()
+
+        self.assertEqual(errors, [])
+        self.assertEqual(statuses, [302] * self.CALLBACKS)
+        self.assert_processed_once(order)
+
+
+@override_settings(STORAGES=LOCAL_STORAGES)
+class OrderSnapshotTests(TestCase):
+
+    def test_order_pages_keep_billed_prices_after_catalog_change(self):
+        category = Category.objects.create(name="Kids", slug="kids")
+        product = make_product(category, price=5000, discount_price=4500, shipping_charge=100)
+        pricing = CartPricer({product.id: 2}, "KIDS10", 10, [product.id]).price()
+        order, _ = place_order(
+            pricing, name="Asha", phone="9999999999", email="asha@example.com", address="-",
+            pincode="110001", city="Delhi", state="Delhi", payment_method="cod",
+        )
+
+        Product.objects.filter(pk=product.pk).update(price=8000, discount_price=7000, title="Renamed")
+
+        item = order.items.get()
+        self.assertEqual((item.title, item.sku, item.unit_price, item.mrp), ("Kids Cycle", "KC-1", 4500, 5000))
+        self.assertEqual(item.coupon_discount, 900)
+        self.assertEqual((order.subtotal, order.discount_amount, order.shipping_total), (9000, 900, 0))
+
+        session = self.client.session
+        session["last_order_id"] = order.id
+        session.save()
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(f"/thank-you/?order_id={order.id}")
+        self.assertFalse([q for q in queries if "bicycles_product" in q["sql"]])
+        self.assertEqual(response.context["items"][0]["price"], 4500)
+        self.assertEqual(response.context["totals"]["coupon_value"], 900)
+        self.assertContains(response, "Kids Cycle")
+        self.assertNotContains(response, "Renamed")
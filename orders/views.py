@@ -1,18 +1,31 @@
 from django.shortcuts import render, redirect
+from django.db import transaction
 from django.http import HttpResponseBadRequest, Http404
 from decimal import Decimal
 from django.contrib import messages
-from .models import Order, OrderItem
-from bicycles.models import Product
+from .models import Order
+from .history import forget_user_order_count
+from .placement import SESSION_CHECKOUT_TOKEN, create_order_items, place_order, placed_order_for
+from .sales import record_order_sales
+from .stock import OutOfStock, commit_order_stock, rehold_order_stock, release_order_stock
+from cartwatch.cart_store import get_cart_store
+from quesecrides.cart_pricing import price_request_cart
 from django.views.decorators.csrf import csrf_exempt
 from accounts.models import CustomUser
 from django.contrib.auth import login
-from cartwatch.models import CartLead
+from jobs.queue import enqueue
 import hashlib
+import hmac
+import logging
 import random
 import string
 from django.urls import reverse
 from django.conf import settings
+from sitecontent.route_context import register_route_context
+
+logger = logging.getLogger(__name__)
+
+register_route_context("thank_you", processors=["site_info"])
 
 # ---------------- Helpers ----------------
 
@@ -25,25 +38,20 @@ def _safe_float(val, default=0.0):
     except Exception:
         return float(default)
 
-def _cart_snapshot(request):
-    """
-    Session cart -> list of {product, qty}
-    String keys ko int me coerce karta hai; missing products skip.
-    """
-    snap = []
-    cart = request.session.get("cart", {}) or {}
-    for pid, qty in cart.items():
-        try:
-            p = Product.objects.get(id=int(pid))
-            snap.append((p, int(qty)))
-        except Product.DoesNotExist:
-            continue
-    return snap
-
-def _create_order_items(order, snap):
-    """ Given a snapshot (product, qty) list, persist OrderItem rows. """
-    for p, qty in snap:
-        OrderItem.objects.create(order=order, product=p, quantity=max(int(qty), 1))
+def _clear_checkout_session(request, order):
+    """Cart/coupon clear, but remember order for thank-you access ✅"""
+    # Sirf ordered lines hatao: login ne guest cart user ke saved cart me merge
+    # kiya hai, baaki saved lines order ka hissa nahi the
+    ordered = order.items.values_list("product_id", flat=True).distinct()
+    ops = [("remove", product_id, 0) for product_id in ordered]
+    if ops:
+        get_cart_store(request).apply(ops)
+    request.session['coupon_code'] = None
+    request.session['coupon_discount'] = 0
+    request.session['coupon_product_ids'] = []
+    request.session.pop(SESSION_CHECKOUT_TOKEN, None)
+    request.session['last_order_id'] = order.id
+    request.session.modified = True
 
 # ---------------- Save order (Razorpay/COD etc.) ----------------
 
@@ -52,16 +60,16 @@ def save_order(request):
     if request.method != 'POST':
         return redirect('shop-page')
 
-    snap = _cart_snapshot(request)
-    if not snap:
-        return redirect('shop-page')
+    # Double submit: same checkout token -> already placed order
+    idempotency_key = request.POST.get('idempotency_key')
+    order = placed_order_for(idempotency_key)
+    if order:
+        return redirect(f"{reverse('thank_you')}?order_id={order.id}")
 
-    # totals (discount already applied frontend me; yahan simplified)
-    subtotal = sum(p.discount_price * qty for p, qty in snap)
-    coupon_code = request.session.get('coupon_code')
-    coupon_discount = int(request.session.get('coupon_discount', 0))
-    discount_amount = subtotal * coupon_discount / 100
-    total = subtotal - discount_amount
+    # totals -- same breakdown as cart/checkout page (shipping included)
+    pricing = price_request_cart(request)
+    if not pricing:
+        return redirect('shop-page')
 
     # user
     email = request.POST.get('email')
@@ -70,13 +78,12 @@ def save_order(request):
         user = CustomUser.objects.create_user(email=email)
     login(request, user)
 
-    # lead cleanup
     phone = request.POST.get('phone')
-    if phone:
-        CartLead.objects.filter(phone=phone).delete()
 
-    # order
-    order = Order.objects.create(
+    # order + items (one transaction) ✅
+    order, created = place_order(
+        pricing,
+        idempotency_key=idempotency_key,
         name=request.POST.get('name'),
         phone=phone,
         email=email,
@@ -88,42 +95,23 @@ def save_order(request):
         gst=request.POST.get('gst'),
         payment_method=request.POST.get('payment_method'),
         transaction_id=request.POST.get('transaction_id'),
-        total_amount=float(total),
-        coupon_code=coupon_code,
-        coupon_discount=coupon_discount,
         user=user,
     )
 
-    # items -> persist immediately ✅
-    _create_order_items(order, snap)
+    # lead cleanup (worker)
+    if created and phone:
+        enqueue("orders.clear_cart_lead", phone=phone)
 
-    # clear cart but remember order for thank-you access ✅
-    request.session['cart'] = {}
-    request.session['coupon_code'] = None
-    request.session['coupon_discount'] = 0
-    request.session['coupon_product_ids'] = []
-    request.session['last_order_id'] = order.id
-    request.session.modified = True
+    _clear_checkout_session(request, order)
 
     return redirect(f"{reverse('thank_you')}?order_id={order.id}")
 
-# ---------------- PayU Initiate (Full) ----------------
+# ---------------- PayU Initiate (Full / UPI-only) ----------------
 
-@csrf_exempt
-def payu_initiate(request):
+def _payu_initiate(request, payment_method, template, extra_context=None):
     if request.method != "POST":
         return HttpResponseBadRequest("Invalid request method.")
 
-    snap = _cart_snapshot(request)
-    if not snap:
-        return HttpResponseBadRequest("Cart is empty.")
-
-    subtotal = sum(p.discount_price * qty for p, qty in snap)
-    coupon_discount = int(request.session.get('coupon_discount', 0))
-    discount_amount = subtotal * coupon_discount / 100
-    final_total = subtotal - discount_amount
-    amount_str = f"{final_total:.2f}"
-
     # customer info
     name = request.POST.get("name", "").strip()
     email = request.POST.get("email", "").strip()
@@ -133,23 +121,37 @@ def payu_initiate(request):
     city = request.POST.get("city", "").strip()
     state = request.POST.get("state", "").strip()
 
-    txnid = _txnid()
-    order = Order.objects.create(
-        name=name, email=email, phone=phone,
-        address=address, pincode=pincode, city=city, state=state,
-        total_amount=float(final_total), payment_method="payu",
-        payment_status="Pending", transaction_id=txnid,
-        coupon_code=request.session.get('coupon_code'),
-        coupon_discount=coupon_discount,
-    )
-
-    # ✅ Persist items RIGHT NOW so success me session na bhi mile to items rahen
-    _create_order_items(order, snap)
+    # Resubmit with the same checkout token -> same order, same txnid
+    idempotency_key = request.POST.get("idempotency_key")
+    order = placed_order_for(idempotency_key)
+    if order is None:
+        pricing = price_request_cart(request)
+        if not pricing:
+            return HttpResponseBadRequest("Cart is empty.")
 
-    # remember last order id (fresh flow ke liye)
+        # ✅ Items persist RIGHT NOW so success me session na bhi mile to items rahen
+        # Stock is held until payment succeeds / fails / the hold expires
+        try:
+            order, _ = place_order(
+                pricing,
+                idempotency_key=idempotency_key,
+                reserve_stock=True,
+                name=name, email=email, phone=phone,
+                address=address, pincode=pincode, city=city, state=state,
+                payment_method=payment_method,
+                payment_status="Pending", transaction_id=_txnid(),
+            )
+        except OutOfStock as exc:
+            messages.error(request, f"Sorry, {exc.product.title} is out of stock right now.")
+            return redirect("view_cart")
+
+    # remember last order id (fresh flow ke liye); agla checkout naya token lega
+    request.session.pop(SESSION_CHECKOUT_TOKEN, None)
     request.session['last_order_id'] = order.id
     request.session.modified = True
 
+    txnid = order.transaction_id
+    amount_str = f"{Decimal(str(order.total_amount)):.2f}"
     key = settings.PAYU_MERCHANT_KEY
     salt = settings.PAYU_MERCHANT_SALT
     productinfo = f"Order_{order.id}"
@@ -159,143 +161,133 @@ def payu_initiate(request):
     hash_string = f"{key}|{txnid}|{amount_str}|{productinfo}|{name}|{email}|||||||||||{salt}"
     payu_hash = hashlib.sha512(hash_string.encode("utf-8")).hexdigest().lower()
 
-    return render(request, "payu_redirect.html", {
+    context = {
         "payu_url": settings.PAYU_BASE_URL,
         "payu_key": key,
         "txnid": txnid,
         "amount": amount_str,
         "productinfo": productinfo,
         "name": name, "email": email, "phone": phone,
-        "surl": surl, "furl": furl, "payu_hash": payu_hash
-    })
+        "surl": surl, "furl": furl, "payu_hash": payu_hash,
+    }
+    context.update(extra_context or {})
+    return render(request, template, context)
 
-# ---------------- PayU Initiate (UPI-only) ----------------
+@csrf_exempt
+def payu_initiate(request):
+    return _payu_initiate(request, "payu", "payu_redirect.html")
 
 @csrf_exempt
 def payu_initiate_upi(request):
-    if request.method != "POST":
-        return HttpResponseBadRequest("Invalid request method.")
-
-    snap = _cart_snapshot(request)
-    if not snap:
-        return HttpResponseBadRequest("Cart is empty.")
-
-    subtotal = sum(p.discount_price * qty for p, qty in snap)
-    coupon_discount = int(request.session.get('coupon_discount', 0))
-    discount_amount = subtotal * coupon_discount / 100
-    final_total = subtotal - discount_amount
-    amount_str = f"{final_total:.2f}"
-
-    # customer
-    name = request.POST.get("name", "").strip()
-    email = request.POST.get("email", "").strip()
-    phone = request.POST.get("phone", "").strip()
-    address = request.POST.get("address", "").strip()
-    pincode = request.POST.get("pincode", "").strip()
-    city = request.POST.get("city", "").strip()
-    state = request.POST.get("state", "").strip()
-
-    txnid = _txnid()
-    order = Order.objects.create(
-        name=name, email=email, phone=phone,
-        address=address, pincode=pincode, city=city, state=state,
-        total_amount=float(final_total), payment_method="payu_upi",
-        payment_status="Pending", transaction_id=txnid,
-        coupon_code=request.session.get('coupon_code'),
-        coupon_discount=coupon_discount,
-    )
-
-    # ✅ Persist items at initiate
-    _create_order_items(order, snap)
+    return _payu_initiate(request, "payu_upi", "payu_upi_redirect.html", {
+        "pg": "UPI", "bankcode": "UPI", "enforce_paymethod": "upi",
+    })
 
-    request.session['last_order_id'] = order.id
-    request.session.modified = True
+# ---------------- PayU Success / Failure ----------------
 
+def _payu_response_hash(data):
+    """Reverse hash PayU sends back on surl/furl."""
     key = settings.PAYU_MERCHANT_KEY
     salt = settings.PAYU_MERCHANT_SALT
-    productinfo = f"Order_{order.id}"
-    surl = request.build_absolute_uri(reverse("payu-success"))
-    furl = request.build_absolute_uri(reverse("payu-failure"))
-
-    hash_string = f"{key}|{txnid}|{amount_str}|{productinfo}|{name}|{email}|||||||||||{salt}"
-    payu_hash = hashlib.sha512(hash_string.encode("utf-8")).hexdigest().lower()
-
-    context = {
-        "payu_url": settings.PAYU_BASE_URL,
-        "payu_key": key,
-        "txnid": txnid,
-        "amount": amount_str,
-        "productinfo": productinfo,
-        "name": name, "email": email, "phone": phone,
-        "surl": surl, "furl": furl, "payu_hash": payu_hash,
-        "pg": "UPI", "bankcode": "UPI", "enforce_paymethod": "upi",
-    }
-    return render(request, "payu_upi_redirect.html", context)
-
-# ---------------- PayU Success / Failure ----------------
+    verify_seq = (
+        f"{salt}|{data.get('status')}|||||||||||{data.get('email')}|{data.get('firstname')}"
+        f"|{data.get('productinfo')}|{data.get('amount')}|{data.get('txnid')}|{key}"
+    )
+    return hashlib.sha512(verify_seq.encode("utf-8")).hexdigest().lower()
+
+def _signed(data):
+    """Callback carries PayU's reverse hash; anything else is ignored."""
+    return hmac.compare_digest(data.get("hash") or "", _payu_response_hash(data))
+
+def _mark_failed(order):
+    """Pending -> Failed only (signed callbacks only); a Paid order stays paid."""
+    if Order.objects.filter(pk=order.pk, payment_status="Pending").update(payment_status="Failed"):
+        order.payment_status = "Failed"
+        release_order_stock(order)
+
+def _ensure_order_user(order_id):
+    """Paid order ka customer account (email se) bana/link karo."""
+    order = Order.objects.only("id", "email", "user_id").get(pk=order_id)
+    if not order.email:
+        return None
+    user = CustomUser.objects.filter(email=order.email).first()
+    if not user:
+        user = CustomUser.objects.create_user(email=order.email)
+    if Order.objects.filter(pk=order_id, user__isnull=True).update(user=user):
+        forget_user_order_count(user.id)
+    return user
 
 @csrf_exempt
 def payu_success(request):
     data = request.POST
-    status = data.get("status")
     txnid = data.get("txnid")
-    hash_received = data.get("hash")
-    paid_amount_str = data.get("amount")
 
-    key = settings.PAYU_MERCHANT_KEY
-    salt = settings.PAYU_MERCHANT_SALT
-
-    try:
-        order = Order.objects.prefetch_related("items__product").get(transaction_id=txnid)
-    except Order.DoesNotExist:
+    order = Order.objects.filter(transaction_id=txnid).first() if txnid else None
+    if order is None:
         messages.error(request, "Order not found.")
         return redirect("shop-page")
 
-    # verify hash
-    verify_seq = f"{salt}|{status}|||||||||||{data.get('email')}|{data.get('firstname')}|{data.get('productinfo')}|{paid_amount_str}|{txnid}|{key}"
-    expected = hashlib.sha512(verify_seq.encode("utf-8")).hexdigest().lower()
-    if hash_received != expected:
-        order.payment_status = "Failed"; order.save()
+    # verify hash -- an unsigned callback changes nothing (anyone can post a txnid)
+    if not _signed(data):
         messages.error(request, "Payment verification failed.")
         return redirect("shop-page")
 
+    # signed, but not a success status
+    if data.get("status") != "success":
+        _mark_failed(order)
+        messages.error(request, "Payment failed. Please try again.")
+        return redirect("checkout_page")
+
     # amount check
-    if Decimal(paid_amount_str).quantize(Decimal("0.01")) != \
-       Decimal(str(order.total_amount)).quantize(Decimal("0.01")):
-        order.payment_status = "Failed"; order.save()
+    try:
+        paid_amount = Decimal(data.get("amount")).quantize(Decimal("0.01"))
+    except (TypeError, ArithmeticError):
+        paid_amount = None
+    if paid_amount != Decimal(str(order.total_amount)).quantize(Decimal("0.01")):
+        # Order stays Pending (hold expires via the sweeper); needs a manual look
+        logger.error("PayU amount mismatch for order %s: paid %s, expected %s", order.pk, paid_amount, order.total_amount)
         messages.error(request, "Amount mismatch. Order flagged.")
         return redirect("shop-page")
 
-    # login/create user if we have email
-    if order.email:
-        user = CustomUser.objects.filter(email=order.email).first()
-        if not user:
-            user = CustomUser.objects.create_user(email=order.email)
+    # Single conditional transition: duplicate / replayed callbacks find
+    # nothing to update and skip every side effect below
+    with transaction.atomic():
+        newly_paid = Order.objects.filter(pk=order.pk, payment_status="Pending").update(payment_status="Paid")
+        if not newly_paid:
+            # A signed failure came first and released the hold, then PayU
+            # captured the payment anyway: hold the stock again before commit
+            newly_paid = Order.objects.filter(pk=order.pk, payment_status="Failed").update(payment_status="Paid")
+            if newly_paid and not rehold_order_stock(order):
+                logger.error("Order %s paid after a failed callback but is out of stock now", order.pk)
+        if newly_paid:
+            order.payment_status = "Paid"
+
+            # safety net: if, for any reason, items are missing, try from current session snap
+            if not order.items.exists():
+                lines = price_request_cart(request).lines
+                if lines:
+                    create_order_items(order, lines)
+
+            record_order_sales(order)
+            commit_order_stock(order)
+            # Same transaction: the job exists iff the payment was recorded
+            if order.phone:
+                enqueue("orders.clear_cart_lead", phone=order.phone)
+
+    if not newly_paid:
+        # Already processed by an earlier callback
+        return redirect(f"{reverse('thank_you')}?order_id={order.id}")
+
+    # login the customer (account created/linked by email)
+    user = _ensure_order_user(order.pk)
+    if user:
         try:
             login(request, user)
         except Exception:
             pass
-        order.user = user
-
-    # safety net: if, for any reason, items are missing, try from current session snap
-    if not order.items.exists():
-        snap = _cart_snapshot(request)
-        if snap:
-            _create_order_items(order, snap)
-
-    # cleanup + mark paid
-    if order.phone:
-        CartLead.objects.filter(phone=order.phone).delete()
-    order.payment_status = "Paid"
-    order.save()
 
     # clear session but keep last order id
-    request.session['cart'] = {}
-    request.session['coupon_code'] = None
-    request.session['coupon_discount'] = 0
-    request.session['coupon_product_ids'] = []
-    request.session['last_order_id'] = order.id
-    request.session.modified = True
+    _clear_checkout_session(request, order)
 
     messages.success(request, "Payment successful! Thank you for your order.")
     return redirect(f"{reverse('thank_you')}?order_id={order.id}")
@@ -304,15 +296,14 @@ def payu_success(request):
 def payu_failure(request):
     data = request.POST
     txnid = data.get("txnid")
-    try:
-        order = Order.objects.get(transaction_id=txnid)
-    except Order.DoesNotExist:
+    order = Order.objects.filter(transaction_id=txnid).first() if txnid else None
+    if order is None:
         messages.error(request, "Order not found.")
         return redirect("shop-page")
-    order.payment_status = "Failed"
-    order.save()
+    if _signed(data):
+        _mark_failed(order)
     messages.error(request, "Payment failed. Please try again.")
-    return redirect("checkout-page")
+    return redirect("checkout_page")
 
 # ---------------- Secure Thank‑You ----------------
 
@@ -332,7 +323,7 @@ def thank_you(request):
     order_id = request.GET.get("order_id") or request.GET.get("order") or request.session.get("last_order_id")
 
     try:
-        order = Order.objects.prefetch_related("items__product").get(pk=order_id)
+        order = Order.objects.prefetch_related("items").get(pk=order_id)
     except Exception:
         order = None
 
@@ -352,44 +343,32 @@ def thank_you(request):
     if not allowed:
         raise Http404("Order not found")
 
-    # build items for template
+    # Everything as billed: OrderItem/Order snapshots, no catalog join
     items = []
-    subtotal = 0.0
     for oi in order.items.all():
-        p = oi.product
-        qty = int(getattr(oi, "quantity", 1))
-        price = _safe_float(getattr(p, "discount_price", None) or getattr(p, "price", 0))
-        line_total = price * qty
-        subtotal += line_total
         try:
-            image_url = p.image.url if getattr(p, "image", None) else None
+            image_url = oi.image.url if oi.image else None
         except Exception:
             image_url = None
         items.append({
-            "title": getattr(p, "title", "Product"),
-            "sku": getattr(p, "sku", None),
+            "title": oi.title or "Product",
+            "sku": oi.sku or None,
             "image": image_url,
-            "qty": qty,
-            "price": price,
-            "total": line_total,
+            "qty": oi.quantity,
+            "price": oi.unit_price,
+            "total": oi.line_total,
         })
 
-    coupon_percent = int(order.coupon_discount or 0)
-    coupon_value = round(subtotal * (coupon_percent / 100.0), 2)
-
     grand_total = _safe_float(order.total_amount)
-    shipping_total = grand_total - max(subtotal - coupon_value, 0)
-    if shipping_total < 0:
-        shipping_total = 0.0
 
     advance_amount = 0.0
     if order.payment_method == "cod":
         advance_amount = round(grand_total * 0.20, 2)
 
     totals = {
-        "subtotal": round(subtotal, 2),
-        "coupon_value": round(coupon_value, 2),
-        "shipping_total": round(shipping_total, 2),
+        "subtotal": order.subtotal,
+        "coupon_value": order.discount_amount,
+        "shipping_total": order.shipping_total,
         "advance_amount": advance_amount,
     }
 
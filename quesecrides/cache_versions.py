@@ -0,0 +1,65 @@
+# /quesecrides/cache_versions.py
+"""
+Namespaced cache version stamps.
+
+Har namespace ("sitecontent", "catalog", ...) ka ek integer stamp cache me rehta hai.
+Cached data ki key me yeh stamp hota hai, isliye data badalne par sirf stamp bump
+karna kaafi hai -- purani keys apne aap orphan ho kar expire ho jaati hain.
+"""
+import time
+
+from django.core.cache import cache
+
+# Orphaned entries ke liye default TTL (stamp bump ke baad yeh kabhi read nahi hoti)
+DEFAULT_TIMEOUT = 60 * 60 * 24
+
+
+def _version_key(namespace: str) -> str:
+    return f"version:{namespace}"
+
+
+def _seed() -> int:
+    # Time-based seed: agar sirf version key evict hui ho (data keys nahi),
+    # to naya stamp purane cached data se kabhi collide nahi karega.
+    return int(time.time() * 1000)
+
+
+def get_version(namespace: str) -> int:
+    """Current stamp for a namespace (created on first use)."""
+    key = _version_key(namespace)
+    version = cache.get(key)
+    if version is None:
+        # add() is a no-op if another worker seeded it first
+        cache.add(key, _seed(), timeout=None)
+        version = cache.get(key) or _seed()
+    return version
+
+
+def bump_version(namespace: str) -> int:
+    """Invalidate everything cached under a namespace."""
+    key = _version_key(namespace)
+    try:
+        return cache.incr(key)
+    except ValueError:
+        # Key missing (first run / cache flushed)
+        version = _seed()
+        cache.set(key, version, timeout=None)
+        return version
+
+
+def versioned_key(namespace: str, *parts) -> str:
+    suffix = ":".join(str(p) for p in parts)
+    return f"{namespace}:{get_version(namespace)}:{suffix}"
+
+
+def get_or_build(namespace: str, name, builder, timeout=DEFAULT_TIMEOUT):
+    """
+    Return the value cached under (namespace, current stamp, name);
+    on a miss call builder() once and store its result.
+    """
+    key = versioned_key(namespace, name)
+    value = cache.get(key)
+    if value is None:
+        value = builder()
+        cache.set(key, value, timeout)
+    return value
@@ -0,0 +1,223 @@
+# /quesecrides/cart_pricing.py
+"""
+CartPricer: cart ka ek hi jagah hisaab.
+
+Cart page, qty update, checkout, coupon remove, checkout lead aur order
+placement sab yahi breakdown use karte hain, isliye totals har jagah same
+rehte hain. Saare cart products ek hi `id__in` query me aate hain.
+
+Rules (pehle har view me alag-alag likhe the):
+  - line price = discount_price (na ho to price)
+  - coupon % sirf coupon_product_ids wali lines par
+  - shipping = shipping_charge x qty; subtotal >= FREE_SHIPPING_THRESHOLD par free
+  - total = subtotal - coupon discount + shipping
+"""
+from dataclasses import dataclass
+from decimal import Decimal, ROUND_HALF_UP
+
+from bicycles.models import Product
+from cartwatch.cart_store import get_cart_store
+
+FREE_SHIPPING_THRESHOLD = Decimal("5000")
+ZERO = Decimal("0.00")
+CENT = Decimal("0.01")
+
+# Cart templates never render the CKEditor bodies
+_DEFERRED_FIELDS = ("description", "short_desc")
+
+
+def _money(value):
+    return Decimal(value).quantize(CENT, rounding=ROUND_HALF_UP)
+
+
+def coupon_share(line_total, percent):
+    """Coupon discount on one line, rounded to paise."""
+    return _money(line_total * percent / Decimal(100))
+
+
+@dataclass(frozen=True)
+class PricedLine:
+    product: Product
+    qty: int
+    unit_price: Decimal        # discount_price or price
+    mrp_total: Decimal         # price x qty
+    line_total: Decimal        # unit_price x qty
+    shipping: Decimal          # shipping_charge x qty (before free-shipping rule)
+    coupon_discount: Decimal   # coupon share of this line
+
+    @property
+    def product_discount(self):
+        return self.mrp_total - self.line_total
+
+    # cart.html / checkout.html item keys
+    @property
+    def subtotal(self):
+        return self.line_total
+
+    @property
+    def cart_total(self):
+        return self.mrp_total
+
+    @property
+    def product_total_price(self):
+        return self.mrp_total
+
+    @property
+    def discount(self):
+        return self.coupon_discount
+
+    def get_absolute_url(self):
+        return self.product.get_absolute_url()
+
+
+@dataclass(frozen=True)
+class CartPricing:
+    lines: tuple
+    cart_total: Decimal        # sum of MRP
+    product_discount: Decimal  # MRP - selling price
+    subtotal: Decimal          # sum of selling price
+    discount_amount: Decimal   # coupon
+    shipping_total: Decimal
+    total: Decimal
+    coupon_code: object
+    coupon_percent: int
+
+    def __bool__(self):
+        return bool(self.lines)
+
+    @property
+    def product_ids(self):
+        return [line.product.id for line in self.lines]
+
+    def snapshot(self):
+        """[(product, qty), ...] for order placement."""
+        return [(line.product, line.qty) for line in self.lines]
+
+    def with_coupon(self, coupon_code, coupon_percent, coupon_product_ids):
+        """Same lines re-priced under another coupon (no queries)."""
+        pricer = CartPricer({}, coupon_code, coupon_percent, coupon_product_ids)
+        return pricer.total([pricer.price_line(line.product, line.qty) for line in self.lines])
+
+    def as_json(self):
+        """Totals as 2-dp strings (update_qty / cart API response)."""
+        return {
+            "subtotal": f"{self.subtotal:.2f}",
+            "discount": f"{self.discount_amount:.2f}",
+            "total": f"{self.total:.2f}",
+            "cart_total": f"{self.cart_total:.2f}",
+            "product_discount": f"{self.product_discount:.2f}",
+            "shipping": f"{self.shipping_total:.2f}",
+        }
+
+    def as_context(self):
+        return {
+            "cart_items": list(self.lines),
+            "cart_total": self.cart_total,
+            "product_discount": self.product_discount,
+            "subtotal": self.subtotal,
+            "coupon_code": self.coupon_code,
+            "coupon_discount": self.coupon_percent,
+            "discount_amount": self.discount_amount,
+            "shipping_total": self.shipping_total,
+            "total": self.total,
+        }
+
+
+class CartPricer:
+    """
+    cart: {product_id: qty} (cart store format; str keys bhi chalte hain)
+    coupon_percent / coupon_product_ids: session coupon state
+    """
+
+    def __init__(self, cart, coupon_code=None, coupon_percent=0, coupon_product_ids=()):
+        self.cart = cart or {}
+        self.coupon_code = coupon_code
+        self.coupon_percent = int(coupon_percent or 0)
+        self.coupon_product_ids = {int(pid) for pid in (coupon_product_ids or ())}
+
+    @classmethod
+    def from_request(cls, request):
+        session = request.session
+        return cls(
+            get_cart_store(request).items(),
+            coupon_code=session.get("coupon_code"),
+            coupon_percent=session.get("coupon_discount", 0),
+            coupon_product_ids=session.get("coupon_product_ids", []),
+        )
+
+    def _quantities(self):
+        quantities = {}
+        for pid, qty in self.cart.items():
+            try:
+                pid, qty = int(pid), int(qty)
+            except (TypeError, ValueError):
+                continue
+            if qty > 0:
+                quantities[pid] = qty
+        return quantities
+
+    def _load_products(self, ids):
+        if not ids:
+            return {}
+        products = (Product.objects.filter(id__in=ids)
+                    .select_related("category")
+                    .defer(*_DEFERRED_FIELDS))
+        return {p.id: p for p in products}
+
+    def price_line(self, product, qty):
+        price = product.price or ZERO
+        unit_price = product.discount_price or price
+        line_total = unit_price * qty
+        if self.coupon_percent and product.id in self.coupon_product_ids:
+            coupon_discount = coupon_share(line_total, self.coupon_percent)
+        else:
+            coupon_discount = ZERO
+        return PricedLine(
+            product=product,
+            qty=qty,
+            unit_price=unit_price,
+            mrp_total=price * qty,
+            line_total=line_total,
+            shipping=(product.shipping_charge or ZERO) * qty,
+            coupon_discount=coupon_discount,
+        )
+
+    def price(self):
+        quantities = self._quantities()
+        products = self._load_products(list(quantities))
+
+        # Cart order preserved; products deleted since being carted are skipped
+        return self.total(self.price_line(products[pid], qty) for pid, qty in quantities.items() if pid in products)
+
+    def total(self, lines):
+        lines = tuple(lines)
+        cart_total = sum((line.mrp_total for line in lines), ZERO)
+        subtotal = sum((line.line_total for line in lines), ZERO)
+        discount_amount = sum((line.coupon_discount for line in lines), ZERO)
+        shipping_total = sum((line.shipping for line in lines), ZERO)
+        if subtotal >= FREE_SHIPPING_THRESHOLD:
+            shipping_total = ZERO
+
+        return CartPricing(
+            lines=lines,
+            cart_total=cart_total,
+            product_discount=cart_total - subtotal,
+            subtotal=subtotal,
+            discount_amount=discount_amount,
+            shipping_total=shipping_total,
+            total=subtotal - discount_amount + shipping_total,
+            coupon_code=self.coupon_code,
+            coupon_percent=self.coupon_percent,
+        )
+
+
+def price_request_cart(request, refresh=False):
+    """
+    Request ke cart ka breakdown, ek request me ek hi baar compute hota hai.
+    Cart ya coupon badalne ke baad `refresh=True` pass karein.
+    """
+    pricing = getattr(request, "_cart_pricing", None)
+    if pricing is None or refresh:
+        pricing = CartPricer.from_request(request).price()
+        request._cart_pricing = pricing
+    return pricing
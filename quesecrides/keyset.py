@@ -0,0 +1,180 @@
+# /quesecrides/keyset.py
+"""
+Keyset (seek) pagination.
+
+OFFSET wali pagination har page ke liye pichhli saari rows padhti hai; yahan
+page "pichhle page ki aakhri row ke baad" se shuru hota hai:
+
+    WHERE (created_at, id) < (:last_created_at, :last_id)
+    ORDER BY created_at DESC, id DESC LIMIT size + 1
+
+Cost page number par depend nahi karta, bas (filter + ordering) wala index
+chahiye. Ordering ka aakhri field unique hona chahiye (usually id) taaki
+har row ki position fixed rahe. Mixed directions (e.g. price ASC, id DESC)
+bhi chalti hain.
+
+Cursor = last/first row ki ordering values, urlsafe base64 JSON me (opaque;
+galat / tampered cursor par pehla page). Rows model instances ya .values()
+dicts dono ho sakti hain.
+
+Pehle se ranked id list (cached search results) ke liye paginate_ids: cursor
+= page ki edge id, list me uski position se agla slice.
+"""
+import base64
+import datetime
+import json
+from dataclasses import dataclass
+from functools import reduce
+from operator import or_
+
+from django.core.exceptions import ValidationError
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Q
+
+
+@dataclass(frozen=True)
+class KeysetPage:
+    items: list
+    next_cursor: object = None   # older / further rows (?after=)
+    prev_cursor: object = None   # rows before this page (?before=)
+
+    def __iter__(self):
+        return iter(self.items)
+
+    def __len__(self):
+        return len(self.items)
+
+    def __bool__(self):
+        return bool(self.items)
+
+    @property
+    def has_next(self):
+        return self.next_cursor is not None
+
+    @property
+    def has_previous(self):
+        return self.prev_cursor is not None
+
+
+class _CursorEncoder(DjangoJSONEncoder):
+    # DjangoJSONEncoder cuts datetimes to milliseconds; a cursor needs the exact value
+    def default(self, o):
+        if isinstance(o, datetime.datetime):
+            return o.isoformat()
+        return super().default(o)
+
+
+def encode_cursor(values):
+    raw = json.dumps(list(values), cls=_CursorEncoder, separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor, size):
+    """Cursor -> list of `size` values; ValueError if it isn't one of ours."""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        values = json.loads(raw)
+    except (TypeError, ValueError, UnicodeDecodeError) as exc:
+        raise ValueError("Bad cursor") from exc
+    if not isinstance(values, list) or len(values) != size:
+        raise ValueError("Bad cursor")
+    return values
+
+
+def _fields(ordering):
+    return [(name.lstrip("-"), name.startswith("-")) for name in ordering]
+
+
+def row_key(obj, ordering):
+    if isinstance(obj, dict):
+        return [obj[name] for name, _ in _fields(ordering)]
+    return [getattr(obj, name) for name, _ in _fields(ordering)]
+
+
+def seek_filter(ordering, values, forward=True):
+    """
+    Q for rows strictly after (forward) / before the row with `values`:
+    a >= x AND ((a > x) OR (a = x AND b > y) OR ...) with > / < per field
+    direction. The leading a >= x is redundant but sargable: the index seeks
+    to x instead of walking every row before it.
+    """
+    fields = _fields(ordering)
+    clauses = []
+    for i, (name, descending) in enumerate(fields):
+        lookup = "lt" if descending == forward else "gt"
+        clause = Q(**{f"{name}__{lookup}": values[i]})
+        for j, (prev_name, _) in enumerate(fields[:i]):
+            clause &= Q(**{prev_name: values[j]})
+        clauses.append(clause)
+    first, descending = fields[0]
+    bound = Q(**{f"{first}__{'lte' if descending == forward else 'gte'}": values[0]})
+    return bound & reduce(or_, clauses)
+
+
+def _reverse(ordering):
+    return [name[1:] if name.startswith("-") else f"-{name}" for name in ordering]
+
+
+def _fetch(queryset, ordering, size, forward):
+    return list(queryset.order_by(*(ordering if forward else _reverse(ordering)))[:size + 1])
+
+
+def paginate(queryset, ordering, size, after=None, before=None):
+    """
+    One page of `queryset` ordered by `ordering` (e.g. ("-created_at", "-id")).
+    `after`: cursor from a page's next_cursor; `before`: from prev_cursor.
+    Runs a single LIMIT size + 1 query.
+    """
+    ordering = list(ordering)
+    cursor, forward = (before, False) if before and not after else (after, True)
+    values = None
+    if cursor:
+        try:
+            values = decode_cursor(cursor, len(ordering))
+            rows = _fetch(queryset.filter(seek_filter(ordering, values, forward)), ordering, size, forward)
+        except (ValueError, TypeError, ValidationError):
+            # Some values only fail when the SQL is built (e.g. an aware
+            # datetime on SQLite with USE_TZ off)
+            values, forward = None, True
+    if values is None:
+        rows = _fetch(queryset, ordering, size, True)
+    more = len(rows) > size
+    rows = rows[:size]
+    if not forward:
+        rows.reverse()
+    if not rows:
+        return KeysetPage(items=[])
+
+    first = encode_cursor(row_key(rows[0], ordering))
+    last = encode_cursor(row_key(rows[-1], ordering))
+    if forward:
+        # Came via a cursor -> there is something before this page
+        return KeysetPage(items=rows, next_cursor=last if more else None,
+                          prev_cursor=first if values is not None else None)
+    return KeysetPage(items=rows, next_cursor=last, prev_cursor=first if more else None)
+
+
+def paginate_ids(ids, size, after=None, before=None):
+    """
+    Keyset page over an already ranked id list: items are the ids after
+    (before) the cursor's id. Unknown id / bad cursor -> first page.
+    """
+    cursor, forward = (before, False) if before and not after else (after, True)
+    start, end = 0, size
+    if cursor:
+        try:
+            position = ids.index(decode_cursor(cursor, 1)[0])
+        except ValueError:
+            pass
+        else:
+            # Backward: the `size` ids just before the cursor (fewer near the top), never the cursor itself
+            start, end = (position + 1, position + 1 + size) if forward else (max(position - size, 0), position)
+    items = ids[start:end]
+    if not items:
+        return KeysetPage(items=[])
+    end = start + len(items)
+    return KeysetPage(
+        items=items,
+        next_cursor=encode_cursor([items[-1]]) if end < len(ids) else None,
+        prev_cursor=encode_cursor([items[0]]) if start > 0 else None,
+    )
@@ -1,53 +1,30 @@
 from django.shortcuts import render
-from django.db.models import Q
-from django.core.paginator import Paginator
-from bicycles.models import Product, Category
+from bicycles.cards import page_cards_by_ids
+from bicycles.search import cached_search
+from bicycles.suggest import get_suggest_index
 
 def search_view(request):
     """
     /search/?q=...  -> HTML results page (paginated)
-    Matches: title, description, short_desc, SKU, category name/slug.
+    Full-text over the product search documents (title, SKU, category
+    names, description text), best match first -- see bicycles.search.
     """
     query = (request.GET.get("q") or "").strip()
-    page_no = int(request.GET.get("page") or 1)
 
-    products = Product.objects.none()
-    total = 0
-
-    if query:
-        # Jo category query ko match karti ho (name ya slug)
-        cat_ids = list(
-            Category.objects.filter(
-                Q(name__icontains=query) | Q(slug__icontains=query)
-            ).values_list("id", flat=True)
-        )
-
-        # ✅ Yaha correct field names use kiye gaye hain:
-        # - short_desc  (NOT short_description)
-        # - description (NOT long_description)
-        products = (
-            Product.objects.select_related("category")
-            .filter(is_available=True)
-            .filter(
-                Q(title__icontains=query) |
-                Q(description__icontains=query) |
-                Q(short_desc__icontains=query) |
-                Q(sku__icontains=query) |
-                Q(category_id__in=cat_ids)
-            )
-            .order_by("-id")
-        )
-
-        total = products.count()
-
-    paginator = Paginator(products, 24)  # 24 items per page
-    page_obj = paginator.get_page(page_no)
+    # Ranked ids + total (cached per normalized query + catalog stamp), then
+    # cards for this page only (one query). 24 items per page; ?page=N or
+    # ?after= / ?before= cursors (bicycles.cards.page_cards_by_ids).
+    # Sirf best SEARCH_MAX_RESULTS pages me aate hain, `total` sab matches ginta hai
+    ids, total = cached_search(query) if query else ([], 0)
+    page_obj = page_cards_by_ids(ids, 24, request.GET)
 
     ctx = {
         "query": query,
         "total": total,
+        "capped": total > len(ids),
+        "ids_shown": len(ids),
         "page_obj": page_obj,
-        "products": page_obj.object_list,
+        "products": list(page_obj),  # Paginator page or KeysetPage
     }
     return render(request, "search_results.html", ctx)
 
@@ -58,30 +35,11 @@ def search_suggest(request):
     """
     /search/suggest/?q=... -> JSON suggestions for live dropdown
     Fields: title / sku (correct), price, url, image
+    Served from the in-process prefix index (bicycles.suggest): no DB query
+    per keystroke; title/SKU words must start with every typed term.
     """
     q = (request.GET.get("q") or "").strip()
     if not q:
         return JsonResponse({"items": []})
 
-    qs = (
-        Product.objects.filter(is_available=True)
-        .filter(Q(title__icontains=q) | Q(sku__icontains=q))
-        .order_by("-id")[:8]
-    )
-
-    items = []
-    for p in qs:
-        try:
-            url = p.get_absolute_url()
-        except Exception:
-            url = "#"
-
-        items.append({
-            "title": p.title,
-            "sku": getattr(p, "sku", ""),
-            "price": float(p.discount_price) if getattr(p, "discount_price", None) else 0.0,
-            "url": url,
-            "image": p.image.url if getattr(p, "image", None) else "",
-        })
-
-    return JsonResponse({"items": items})
+    return JsonResponse({"items": get_suggest_index().suggest(q)})
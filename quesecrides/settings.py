@@ -35,6 +35,7 @@ INSTALLED_APPS = [
     "blog",
     "pages",
     "contact",
+    "jobs",
     # S3 storage for MEDIA
     "storages",
 ]
@@ -70,6 +71,7 @@ TEMPLATES = [
                 "sitecontent.context_processors.best_seller_bicycles",
                 "sitecontent.context_processors.coupon_offers",
                 "sitecontent.context_processors.home_category_sections",
+                "cartwatch.context_processors.cart_count",
             ],
         },
     },
@@ -96,9 +98,53 @@ else:
         "default": {
             "ENGINE": "django.db.backends.sqlite3",
             "NAME": BASE_DIR / "db.sqlite3",
+            # Writers take the lock at BEGIN and wait for each other instead of
+            # failing with "database is locked" (concurrent callbacks / worker)
+            "OPTIONS": {"transaction_mode": "IMMEDIATE", "timeout": 20},
+            # File, not in-memory: threaded tests (orders.tests) need real
+            # connections that block on the lock, not shared-cache table locks
+            "TEST": {"NAME": BASE_DIR / "test_db.sqlite3"},
         }
     }
 
+# ── Cache ─────────────────────────────────────────────────────────────────────
+# Site chrome / catalog / coupon snapshots are cached under version stamps (see
+# quesecrides/cache_versions.py). The cache must be shared by every gunicorn
+# worker and the jobs worker, warna admin save ka stamp bump sirf usi process
+# ko dikhta hai. Default: FileBasedCache (deploy creates the dir for www-data);
+# Redis/Memcached via CACHE_BACKEND + CACHE_LOCATION.
+CACHES = {
+    "default": {
+        "BACKEND": config("CACHE_BACKEND", default="django.core.cache.backends.filebased.FileBasedCache"),
+        "LOCATION": config("CACHE_LOCATION", default=str(BASE_DIR / ".django_cache")),
+    }
+}
+
+# Tests get their own throwaway cache dir (quesecrides/test_runner.py)
+TEST_RUNNER = "quesecrides.test_runner.TestRunner"
+
+# Homepage "Shop By Categories": count only is_available products (opt-in)
+SHOP_CATEGORY_COUNT_AVAILABLE_ONLY = config("SHOP_CATEGORY_COUNT_AVAILABLE_ONLY", cast=bool, default=False)
+
+# Server-side cart (cartwatch/cart_store.py): DBCartStore or CacheCartStore
+CART_STORE_BACKEND = config("CART_STORE_BACKEND", default="cartwatch.cart_store.DBCartStore")
+CART_TTL_DAYS = config("CART_TTL_DAYS", cast=int, default=30)  # purged daily (deploy/quesecrides-purge-carts.timer)
+
+# PayU checkout stock holds (orders/stock.py), only for products with
+# track_stock on (untracked stock = 0 never blocks a checkout). Expired holds
+# are released every minute by deploy/quesecrides-release-holds.timer.
+# Placed/paid orders decrement stock either way.
+STOCK_HOLDS_ENABLED = config("STOCK_HOLDS_ENABLED", cast=bool, default=True)
+STOCK_HOLD_MINUTES = config("STOCK_HOLD_MINUTES", cast=int, default=15)
+
+# Background jobs (jobs/queue.py), processed by `manage.py runworker`.
+# JOBS_EAGER=True runs each job in-process right after commit (dev without a
+# worker; on by default with DEBUG so the "[DEV ONLY]" OTP print shows in the
+# runserver console). Production: deploy/quesecrides-worker.service
+JOBS_EAGER = config("JOBS_EAGER", cast=bool, default=DEBUG)
+JOB_MAX_ATTEMPTS = config("JOB_MAX_ATTEMPTS", cast=int, default=5)
+JOB_RETRY_BASE_SECONDS = config("JOB_RETRY_BASE_SECONDS", cast=int, default=30)
+
 # ── Password validators ───────────────────────────────────────────────────────
 AUTH_PASSWORD_VALIDATORS = [
     {"NAME": "django.contrib.auth.password_validation.UserAttributeSimilarityValidator"},
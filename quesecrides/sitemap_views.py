@@ -63,12 +63,11 @@ def _is_fresh(dt, days: int) -> bool:
 
 def _category_lastmod(cat: Category):
     """
-    Category ke lastmod ko us category + uske child categories ke products
+    Category ke lastmod ko us category + uske saare descendants ke products
     ke max(updated_at) se nikaalo. Agar kuch nahi mile to 'now()'.
     """
     try:
-        cats = [cat] + list(cat.children.all())
-        last = (Product.objects.filter(category__in=cats)
+        last = (Product.objects.filter(category__path__startswith=cat.path)
                 .aggregate(last=Max('updated_at'))['last'])
         return last or now()
     except Exception:
@@ -203,26 +202,17 @@ def sitemap_categories(request):
 def sitemap_products(request, page=1):
     start = (int(page) - 1) * PRODUCT_PAGE_SIZE
     end = start + PRODUCT_PAGE_SIZE
-    qs = Product.objects.select_related('category', 'category__parent').order_by('id')[start:end]
+    qs = Product.objects.prefetch_related('gallery').order_by('id')[start:end]
 
     rows = _xml_header()
     rows.append('<urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9" '
                 'xmlns:image="http://www.google.com/schemas/sitemap-image/1.1">')
 
     for prod in qs:
-        cat = getattr(prod, 'category', None)
-        if not cat:
-            continue
-        parent = getattr(cat, 'parent', None)
-
-        # Destination URL
-        try:
-            if parent:
-                loc = _abs(request, reverse('product-detail-child', args=[parent.slug, cat.slug, prod.slug]))
-            else:
-                loc = _abs(request, reverse('product-detail', args=[cat.slug, prod.slug]))
-        except Exception:
+        # Destination URL (stored canonical path, no category joins)
+        if not prod.url_path:
             continue
+        loc = _abs(request, prod.url_path)
 
         # Freshness
         last = getattr(prod, 'updated_at', None) or getattr(prod, 'created_at', None) or now()
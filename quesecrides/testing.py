@@ -0,0 +1,33 @@
+# /quesecrides/testing.py
+"""
+Shared test helpers (sirf tests import karte hain).
+
+LOCAL_STORAGES: templates render karne wale tests ke liye -- production
+storage (S3 / manifest static) ki jagah local filesystem, taaki
+{% static %} aur image.url bina network/collectstatic ke chalein.
+"""
+from bicycles.models import Product
+from orders.models import Order
+
+LOCAL_STORAGES = {
+    "default": {"BACKEND": "django.core.files.storage.FileSystemStorage"},
+    "staticfiles": {"BACKEND": "django.contrib.staticfiles.storage.StaticFilesStorage"},
+}
+
+
+def make_product(category, sku="KC-1", title="Kids Cycle", description="-", price=1000, **fields):
+    return Product.objects.create(
+        title=title, slug=sku.lower(), sku=sku, category=category, price=price,
+        short_desc="-", description=description, image="products/x.jpg", **fields,
+    )
+
+
+def make_order(user=None, **fields):
+    """COD order with dummy address fields; override anything via kwargs."""
+    values = {
+        "name": "Asha", "phone": "9999999999", "email": user.email if user else "asha@example.com",
+        "address": "-", "pincode": "110001", "city": "Delhi", "state": "Delhi",
+        "payment_method": "cod", "total_amount": 100.0,
+    }
+    values.update(fields)
+    return Order.objects.create(user=user, **values)
@@ -0,0 +1,163 @@
+"""
+Query-plan regression tests: har hot lookup ka EXPLAIN dekho aur fail karo
+agar planner table ka full/sequential scan chunta hai (index missing / unusable).
+
+CartPricerTests: cart_pricing ka Decimal math (coupon split, shipping, rounding).
+"""
+import re
+from datetime import timedelta
+from decimal import Decimal
+
+from django.db import connection
+from django.db.models.functions import Coalesce
+from django.test import TestCase
+from django.utils import timezone
+
+from accounts.models import CustomUser, EmailOTP
+from bicycles.models import Category, Product
+from blog.models import BlogCategory, BlogPost
+from cartwatch.models import CartLead
+from orders.models import Order
+from quesecrides.cart_pricing import FREE_SHIPPING_THRESHOLD, CartPricer
+from quesecrides.keyset import seek_filter
+from quesecrides.testing import make_product
+
+# SQLite: "SCAN orders_order" (no index); PostgreSQL: "Seq Scan on orders_order"
+SEQ_SCAN = {
+    "sqlite": re.compile(r"\bSCAN (\w+)(?:\s|$)(?!USING)"),
+    "postgresql": re.compile(r"Seq Scan on (\w+)"),
+}
+
+
+class QueryPlanTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        now = timezone.now()
+        cls.user = CustomUser.objects.create_user(email="plan@example.com")
+        category = Category.objects.create(name="Plan", slug="plan")
+        blog_category = BlogCategory.objects.create(name="News", slug="news")
+        Product.objects.bulk_create([
+            Product(title=f"P{i}", slug=f"p-{i}", sku=f"P-{i}", category=category,
+                    price=1000 + i, short_desc="-", description="-", is_available=i % 4 != 0)
+            for i in range(200)
+        ])
+        Order.objects.bulk_create([
+            Order(name="N", phone=f"9{i:09d}", email="n@example.com", address="-", pincode="1",
+                  city="-", state="-", payment_method="payu", total_amount=100.0,
+                  transaction_id=f"txn{i}", user=cls.user if i % 10 == 0 else None)
+            for i in range(200)
+        ])
+        CartLead.objects.bulk_create([
+            CartLead(name="N", phone=f"8{i:09d}", cart_items="-") for i in range(200)
+        ])
+        EmailOTP.objects.bulk_create([EmailOTP(user=cls.user, otp_code="123456") for _ in range(50)])
+        BlogPost.objects.bulk_create([
+            BlogPost(title=f"B{i}", slug=f"b-{i}", category=blog_category, author_name="-",
+                     content="-", status="published" if i % 2 else "draft",
+                     published_at=now - timedelta(days=i))
+            for i in range(200)
+        ])
+
+    def setUp(self):
+        if connection.vendor not in SEQ_SCAN:
+            self.skipTest(f"No plan check for {connection.vendor}")
+        if connection.vendor == "postgresql":
+            # Tiny test tables: make the planner show whether an index *can* be used
+            # (SQLite without ANALYZE stats already prefers any usable index)
+            with connection.cursor() as cursor:
+                cursor.execute("SET enable_seqscan = off")
+
+    def assertNoSeqScan(self, queryset):
+        plan = queryset.explain()
+        table = queryset.model._meta.db_table
+        scanned = SEQ_SCAN[connection.vendor].findall(plan)
+        self.assertNotIn(table, scanned, f"Sequential scan on {table}:\n{plan}")
+
+    def test_order_by_transaction_id(self):
+        self.assertNoSeqScan(Order.objects.filter(transaction_id="txn42"))
+
+    def test_orders_of_user_newest_first(self):
+        self.assertNoSeqScan(Order.objects.filter(user=self.user).order_by("-created_at"))
+
+    def test_cart_lead_by_phone(self):
+        self.assertNoSeqScan(CartLead.objects.filter(phone="8000000042"))
+
+    def test_latest_otp_of_user(self):
+        self.assertNoSeqScan(EmailOTP.objects.filter(user=self.user).order_by("-created_at"))
+
+    def test_shop_default_sort(self):
+        # First page (LIMIT 12): walk the index in order instead of sorting every row
+        self.assertNoSeqScan(Product.objects.filter(is_available=True).order_by("-created_at", "-id")[:12])
+
+    def test_shop_keyset_pages(self):
+        # Deep keyset page = seek into the sort index, same plan as page 1
+        available = Product.objects.filter(is_available=True)
+        by_title = ("title", "id")
+        self.assertNoSeqScan(available.filter(seek_filter(by_title, ["P150", 150])).order_by(*by_title)[:13])
+        if connection.vendor == "postgresql":
+            # SQLite: Django wraps the index expression in one more CAST than
+            # the query's, so the expression index only matches on PostgreSQL
+            by_price = ("effective_price", "id")
+            priced = available.annotate(effective_price=Coalesce("discount_price", "price"))
+            self.assertNoSeqScan(priced.filter(seek_filter(by_price, [1150, 150])).order_by(*by_price)[:13])
+
+    def test_published_blog_posts(self):
+        self.assertNoSeqScan(BlogPost.objects.filter(status="published"))
+
+
+class CartPricerTests(TestCase):
+
+    def setUp(self):
+        category = Category.objects.create(name="Kids", slug="kids")
+        self.bike = make_product(category, "KC-1", price=1000, discount_price=Decimal("333.33"))
+        self.trike = make_product(category, "KC-2", price=2500, shipping_charge=50)
+
+    def test_coupon_discounts_only_restricted_lines(self):
+        pricing = CartPricer({self.bike.id: 3, self.trike.id: 1}, "KIDS15", 15, [self.bike.id]).price()
+        bike, trike = pricing.lines
+        self.assertEqual(bike.line_total, Decimal("999.99"))
+        self.assertEqual(bike.coupon_discount, Decimal("150.00"))  # 149.9985 half-up
+        self.assertEqual(trike.coupon_discount, Decimal("0.00"))
+        self.assertEqual(pricing.discount_amount, Decimal("150.00"))
+        self.assertEqual(pricing.cart_total, Decimal("5500.00"))
+        self.assertEqual(pricing.subtotal, Decimal("3499.99"))
+        self.assertEqual(pricing.product_discount, Decimal("2000.01"))
+        self.assertEqual(pricing.shipping_total, Decimal("50.00"))
+        self.assertEqual(pricing.total, Decimal("3399.99"))  # subtotal - coupon + shipping
+
+    def test_coupon_is_rounded_per_line(self):
+        cheap = make_product(self.bike.category, "KC-3", price=Decimal("10.05"))
+        bell = make_product(self.bike.category, "KC-4", price=Decimal("10.05"))
+        pricing = CartPricer({cheap.id: 1, bell.id: 1}, "TEN", 10, [cheap.id, bell.id]).price()
+        self.assertEqual([line.coupon_discount for line in pricing.lines], [Decimal("1.01"), Decimal("1.01")])
+        self.assertEqual(pricing.discount_amount, Decimal("2.02"))  # not 20.10 x 10% = 2.01
+
+    def test_shipping_waived_from_threshold_on_pre_coupon_subtotal(self):
+        below = CartPricer({self.trike.id: 1}).price()
+        self.assertEqual((below.shipping_total, below.total), (Decimal("50.00"), Decimal("2550.00")))
+
+        at = CartPricer({self.trike.id: 2}, "ALL10", 10, [self.trike.id]).price()
+        self.assertEqual(at.subtotal, FREE_SHIPPING_THRESHOLD)
+        self.assertEqual(at.lines[0].shipping, Decimal("100.00"))
+        self.assertEqual((at.shipping_total, at.total), (Decimal("0.00"), Decimal("4500.00")))
+
+    def test_bad_quantities_and_deleted_products_are_skipped(self):
+        gone = make_product(self.bike.category, "KC-9")
+        gone_id = gone.id
+        gone.delete()
+        cart = {str(self.trike.id): "2", self.bike.id: 0, gone_id: 1, "x": 1, 999999: "lots"}
+        with self.assertNumQueries(1):
+            pricing = CartPricer(cart).price()
+        self.assertEqual(pricing.product_ids, [self.trike.id])
+        self.assertEqual(pricing.lines[0].qty, 2)
+        self.assertFalse(CartPricer({}).price())
+
+    def test_with_coupon_and_as_json(self):
+        pricing = CartPricer({self.bike.id: 1}).price()
+        with self.assertNumQueries(0):
+            repriced = pricing.with_coupon("KIDS15", 15, [self.bike.id])
+        self.assertEqual(repriced.as_json(), {
+            "subtotal": "333.33", "discount": "50.00", "total": "283.33",
+            "cart_total": "1000.00", "product_discount": "666.67", "shipping": "0.00",
+        })
@@ -7,6 +7,7 @@ For more information on this file, see
 https://docs.djangoproject.com/en/5.2/howto/deployment/wsgi/
 """
 
+import logging
 import os
 
 from django.core.wsgi import get_wsgi_application
@@ -14,3 +15,10 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'quesecrides.settings')
 
 application = get_wsgi_application()
+
+# Search dropdown index: build once per worker instead of on the first keystroke
+try:
+    from bicycles.suggest import warm_suggest_index
+    warm_suggest_index()
+except Exception:  # DB not reachable yet -> built lazily on first request
+    logging.getLogger(__name__).exception("Could not warm the search suggest index")
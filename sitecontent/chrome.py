@@ -0,0 +1,69 @@
+# /sitecontent/chrome.py
+"""
+Site-wide chrome (header/footer menus, hero banners, offers, home blog posts).
+
+Yeh data har HTML render par chahiye hota hai lekin admin se hi badalta hai,
+isliye ek immutable snapshot banake cache me rakhte hain. Snapshot ki key
+"sitecontent" version stamp se bandhi hai; sitecontent.signals admin saves/deletes
+par stamp bump karta hai, to changes turant dikh jaate hain.
+"""
+from dataclasses import dataclass, fields
+
+from blog.models import BlogPost
+from quesecrides.cache_versions import get_or_build
+
+from .models import (
+    SiteSettings, NavMenu, FtNavMenu1, FtNavMenu2, FtNavMenu3,
+    CatMenu, Hero, HeroTwo, CouponCodeOffer,
+)
+
+CHROME_NAMESPACE = "sitecontent"
+HOME_BLOG_POSTS_LIMIT = 6
+
+
+@dataclass(frozen=True)
+class SiteChrome:
+    site_settings: object
+    nav_menus: tuple
+    ft_nav1: tuple
+    ft_nav2: tuple
+    ft_nav3: tuple
+    cat_nav3: tuple
+    hero_banner: object
+    hero_two_banner: object
+    coupon_offers: tuple
+    home_blog_posts: tuple
+
+    def as_context(self):
+        return {name: getattr(self, name) for name in CHROME_CONTEXT_KEYS}
+
+
+CHROME_CONTEXT_KEYS = tuple(f.name for f in fields(SiteChrome))
+
+
+def build_site_chrome():
+    """Run the chrome queries once and freeze the results."""
+    home_blog_posts = (
+        BlogPost.objects.filter(status="published")
+        .select_related("category")
+        .order_by("-published_at", "-created_at")[:HOME_BLOG_POSTS_LIMIT]
+    )
+
+    return SiteChrome(
+        site_settings=SiteSettings.objects.first(),
+        # Menus: templates walk item.children.all, so prefetch them into the snapshot
+        nav_menus=tuple(NavMenu.objects.prefetch_related("children")),
+        ft_nav1=tuple(FtNavMenu1.objects.all()),
+        ft_nav2=tuple(FtNavMenu2.objects.all()),
+        ft_nav3=tuple(FtNavMenu3.objects.all()),
+        cat_nav3=tuple(CatMenu.objects.prefetch_related("children")),
+        hero_banner=Hero.objects.first(),
+        hero_two_banner=HeroTwo.objects.first(),
+        coupon_offers=tuple(CouponCodeOffer.objects.all()),
+        home_blog_posts=tuple(home_blog_posts),
+    )
+
+
+def get_site_chrome():
+    """Cached snapshot for the current content version (zero queries when warm)."""
+    return get_or_build(CHROME_NAMESPACE, "chrome", build_site_chrome)
@@ -10,93 +10,93 @@ from .models import (
 )
 
 # NOTE: Make sure these app/model paths match your project
-from bicycles.models import Category, Product
-from orders.models import OrderItem
-
-from blog.models import BlogPost
+from bicycles.models import Category, Product, subtree_q
+from bicycles.catalog import CATALOG_NAMESPACE, category_product_counts
+from bicycles.cards import cards_by_ids
+from quesecrides.cache_versions import get_or_build
+from django.conf import settings as django_settings
+from orders.models import ProductSalesDaily
 
+from django.utils.functional import SimpleLazyObject
 
-def site_info(request):
-    """Basic site-wide objects for header/footer and hero banners."""
-    settings = SiteSettings.objects.first()
-
-    home_blog_posts = (
-        BlogPost.objects.filter(status="published")
-        .select_related("category")
-        .order_by("-published_at", "-created_at")[:6]
-    )
+from .chrome import get_site_chrome, CHROME_CONTEXT_KEYS
+from .route_context import route_wants
+from .home_sections import build_home_sections
 
 
-    return {
-        "site_settings": settings,
-        "nav_menus": NavMenu.objects.all(),
-        "ft_nav1": FtNavMenu1.objects.all(),
-        "ft_nav2": FtNavMenu2.objects.all(),
-        "ft_nav3": FtNavMenu3.objects.all(),
-        "cat_nav3": CatMenu.objects.all(),
-        "hero_banner": Hero.objects.first(),
-        "hero_two_banner": HeroTwo.objects.first(),
-        "coupon_offers": CouponCodeOffer.objects.all(),
-        "home_blog_posts": home_blog_posts,
-    }
-
-def _collect_descendant_ids(root_qs):
+def _lazy_context(builder, keys):
     """
-    Given a queryset of Category objects, return a set of IDs including the roots
-    and ALL their descendants (multi-level).
+    Wrap builder() (returns a dict) so it only runs when a template first
+    reads one of `keys`; all keys share that single evaluation.
     """
-    to_visit = list(root_qs.values_list('id', flat=True))
-    seen = set(to_visit)
-
-    while to_visit:
-        child_ids = list(Category.objects.filter(parent_id__in=to_visit)
-                         .values_list('id', flat=True))
-        new_ids = [cid for cid in child_ids if cid not in seen]
-        if not new_ids:
-            break
-        seen.update(new_ids)
-        to_visit = new_ids
+    built = SimpleLazyObject(builder)
+    return {key: SimpleLazyObject(lambda key=key: built[key]) for key in keys}
 
-    return seen
 
+def site_info(request):
+    """Basic site-wide objects for header/footer and hero banners (cached snapshot)."""
+    if not route_wants(request, "site_info"):
+        return {}
+    return _lazy_context(lambda: get_site_chrome().as_context(), CHROME_CONTEXT_KEYS)
 
-def get_total_products(category):
+def get_total_products(category, available_only=False):
     """
     Total products under this category including ALL descendants (not just one level).
+    Served from the cached catalog-wide counts (one grouped query per catalog version).
     """
-    # Start from this category as a queryset
-    roots = Category.objects.filter(id=category.id)
-    all_ids = _collect_descendant_ids(roots)
-    return Product.objects.filter(category_id__in=list(all_ids)).count()
+    total, available = category_product_counts().get(category.id, (0, 0))
+    return available if available_only else total
 
 def shop_categories(request):
+    if not route_wants(request, "shop_categories"):
+        return {}
+    return _lazy_context(_build_shop_categories, ["shop_categories"])
+
+def _build_shop_categories():
+    available_only = getattr(django_settings, "SHOP_CATEGORY_COUNT_AVAILABLE_ONLY", False)
+    boxes = get_or_build(
+        CATALOG_NAMESPACE, f"shop-categories:{int(available_only)}",
+        lambda: _shop_category_boxes(available_only),
+    )
+    return {'shop_categories': boxes}
+
+def _shop_category_boxes(available_only):
     """
     Build the category boxes with total counts including descendants.
     Also include the category's full URL (handles parent/child slug pattern).
+    available_only=True -> count (and show) only products customers can buy.
     """
     categories_to_show = []
-    all_categories = Category.objects.all().prefetch_related('children')
+    counts = category_product_counts()
+    all_categories = Category.objects.select_related('parent')
 
     for category in all_categories:
-        total = get_total_products(category)
-        if total > 0:
+        total, available = counts.get(category.id, (0, 0))
+        shown = available if available_only else total
+        if shown > 0:
             categories_to_show.append({
                 'name': category.name,
                 'slug': category.slug,
                 'image': category.image.url if category.image else '',
-                'total_products': total,
+                'total_products': shown,
+                'available_products': available,
                 'url': category.get_absolute_url(),  # ✅ add full URL for template
             })
 
-    return {'shop_categories': categories_to_show}
+    return categories_to_show
 
 def best_seller_bicycles(request):
+    if not route_wants(request, "best_seller_bicycles"):
+        return {}
+    return _lazy_context(_build_best_sellers, ["best_seller_bicycles", "best_seller_block"])
+
+def _build_best_sellers():
     """
     BEST SELLERS (Admin-controlled via BestSellerBlock singleton)
     - Picks the ONLY BestSellerBlock instance (if present)
     - Uses selected categories + ALL their descendants
     - Optionally limits by last N days (days_window)
-    - Ranks by total quantity sold (OrderItem.quantity)
+    - Ranks by total quantity sold, read from the ProductSalesDaily rollup
     """
     block = BestSellerBlock.objects.first()
     if not block:
@@ -106,37 +106,30 @@ def best_seller_bicycles(request):
             "best_seller_block": None,
         }
 
-    selected_cats = block.categories.all()
-    if not selected_cats.exists():
+    selected_cats = list(block.categories.all())
+    if not selected_cats:
         # Block present but no categories picked
         return {
             "best_seller_bicycles": [],
             "best_seller_block": block,
         }
 
-    # Collect selected categories + all descendants
-    all_cat_ids = _collect_descendant_ids(selected_cats)
-    # Also include selected root ids explicitly
-    all_cat_ids.update(selected_cats.values_list("id", flat=True))
-
-    # Base queryset: products in any of those categories that have at least one orderitem
-    qs = Product.objects.filter(
-        category_id__in=list(all_cat_ids),
-        orderitem__isnull=False
-    )
+    # Rank from the daily rollup (rows ~ products x days, not order lines)
+    rollup = ProductSalesDaily.objects.filter(subtree_q(selected_cats, prefix="product__category__"))
 
     # Optional date window (e.g., last 30 days)
     if block.days_window:
-        since_dt = timezone.now() - timedelta(days=block.days_window)
-        # IMPORTANT: Adjust 'order__created_at' to your actual Order model datetime field
-        qs = qs.filter(orderitem__order__created_at__gte=since_dt)
-
-    best_sellers = (
-        qs
-        .annotate(total_sold=Sum("orderitem__quantity"))
-        .order_by("-total_sold")
+        since = (timezone.now() - timedelta(days=block.days_window)).date()
+        rollup = rollup.filter(day__gte=since)
+
+    ranked = list(
+        rollup.values("product_id")
+        .annotate(total_sold=Sum("quantity"))
+        .order_by("-total_sold", "product_id")
         [: (block.limit or 10)]
     )
+    # Slim cards, rank order preserved
+    best_sellers = cards_by_ids(row["product_id"] for row in ranked)
 
     return {
         "best_seller_bicycles": best_sellers,
@@ -144,31 +137,23 @@ def best_seller_bicycles(request):
     }
 
 def home_category_sections(request):
+    if not route_wants(request, "home_category_sections"):
+        return {}
+    return _lazy_context(_build_home_category_sections, ["home_category_sections"])
+
+def _build_home_category_sections():
     """
     Multiple homepage sections driven by admin (HomeCategorySection).
     NOW filtered to show ONLY products with is_Featured_Product=True.
     Products are fetched from selected categories + all descendants.
     Ordered by newest first (id desc). Limit 8 per section.
     """
-    sections = []
-    for sec in HomeCategorySection.objects.all():
-        cats = sec.categories.all()
-        if not cats.exists():
-            sections.append({"title": sec.title, "products": Product.objects.none()})
-            continue
-
-        ids = _collect_descendant_ids(cats)
-        ids.update(cats.values_list("id", flat=True))
-
-        products = (
-            Product.objects
-            .filter(category_id__in=list(ids), is_Featured_Product=True, is_available=True)
-            .order_by("-id")[:8]
-        )
-        sections.append({"title": sec.title, "products": products})
+    # One windowed query for every section (see sitecontent/home_sections.py)
+    sections = build_home_sections()
 
     return {"home_category_sections": sections}
 
 def coupon_offers(request):
-    offers = CouponCodeOffer.objects.all()
-    return {'coupon_offers': offers}
\ No newline at end of file
+    if not route_wants(request, "coupon_offers"):
+        return {}
+    return _lazy_context(lambda: {'coupon_offers': get_site_chrome().coupon_offers}, ['coupon_offers'])
\ No newline at end of file
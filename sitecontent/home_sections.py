@@ -0,0 +1,70 @@
+# /sitecontent/home_sections.py
+"""
+Batched loader for the homepage HomeCategorySection product rails.
+
+Har section ke liye alag queries ki jagah ek hi windowed query:
+section -> selected categories -> unke saare descendants (materialized path
+prefix) -> featured + available products, ROW_NUMBER() OVER (PARTITION BY
+section ORDER BY id DESC) <= N. PostgreSQL aur SQLite (3.25+) dono par chalta hai.
+"""
+from collections import defaultdict
+
+from django.db import connection
+
+from bicycles.cards import cards_by_ids
+from bicycles.models import Category, Product
+
+from .models import HomeCategorySection
+
+PRODUCTS_PER_SECTION = 8
+
+
+def _rails_sql():
+    qn = connection.ops.quote_name
+    product = Product._meta
+    category_table = qn(Category._meta.db_table)
+    through = HomeCategorySection.categories.through._meta
+    return f"""
+        SELECT section_id, product_id FROM (
+            SELECT m.section_id AS section_id, p.{qn('id')} AS product_id,
+                   ROW_NUMBER() OVER (PARTITION BY m.section_id ORDER BY p.{qn('id')} DESC) AS section_rank
+            FROM {qn(product.db_table)} p
+            JOIN (
+                SELECT DISTINCT hs.{qn('homecategorysection_id')} AS section_id, pc.{qn('id')} AS category_id
+                FROM {qn(through.db_table)} hs
+                JOIN {category_table} rc ON rc.{qn('id')} = hs.{qn('category_id')}
+                JOIN {category_table} pc ON pc.{qn('path')} LIKE rc.{qn('path')} || '%%'
+            ) m ON m.category_id = p.{qn(product.get_field('category').column)}
+            WHERE p.{qn('is_Featured_Product')} = %s AND p.{qn('is_available')} = %s
+        ) ranked
+        WHERE section_rank <= %s
+        ORDER BY section_id, section_rank
+    """
+
+
+def load_section_products(per_section=PRODUCTS_PER_SECTION):
+    """
+    {section_id: [ProductCard, ...]} newest first, at most `per_section` each.
+    Two queries total (ranked ids + their cards), whatever the section count.
+    """
+    with connection.cursor() as cursor:
+        cursor.execute(_rails_sql(), [True, True, per_section])
+        ranked = cursor.fetchall()
+
+    rails = defaultdict(list)
+    if not ranked:
+        return rails
+
+    cards = {card.id: card for card in cards_by_ids({product_id for _, product_id in ranked})}
+    for section_id, product_id in ranked:
+        if product_id in cards:
+            rails[section_id].append(cards[product_id])
+    return rails
+
+
+def build_home_sections():
+    rails = load_section_products()
+    return [
+        {"title": sec.title, "products": rails.get(sec.id, [])}
+        for sec in HomeCategorySection.objects.all()
+    ]
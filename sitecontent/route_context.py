@@ -0,0 +1,37 @@
+# /sitecontent/route_context.py
+"""
+Per-URL-name registry of the sitecontent context processors a page needs.
+
+Jo route yahan register nahi hai use saare processors milte hain (lazy, yaani
+query tabhi chalegi jab template variable padhega). Registered routes ko sirf
+declared processors milte hain; baaki ke liye processor kuch bhi nahi karta.
+
+    register_route_context("view_cart", "checkout_page", processors=["site_info"])
+"""
+
+PROCESSOR_NAMES = frozenset({
+    "site_info",
+    "shop_categories",
+    "best_seller_bicycles",
+    "coupon_offers",
+    "home_category_sections",
+})
+
+ROUTE_CONTEXT = {}
+
+
+def register_route_context(*url_names, processors=()):
+    processors = frozenset(processors)
+    unknown = processors - PROCESSOR_NAMES
+    if unknown:
+        raise ValueError(f"Unknown context processors: {', '.join(sorted(unknown))}")
+    for url_name in url_names:
+        ROUTE_CONTEXT[url_name] = processors
+
+
+def route_wants(request, processor_name):
+    """False only when the matched URL name declared a list without this processor."""
+    resolver_match = getattr(request, "resolver_match", None)
+    view_name = resolver_match.view_name if resolver_match else None
+    wanted = ROUTE_CONTEXT.get(view_name)
+    return wanted is None or processor_name in wanted
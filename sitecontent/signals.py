@@ -0,0 +1,32 @@
+# /sitecontent/signals.py
+"""
+Admin me site content badle to chrome snapshot ka version stamp bump karo.
+"""
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete
+
+from blog.models import BlogCategory, BlogPost
+from quesecrides.cache_versions import bump_version
+
+from .chrome import CHROME_NAMESPACE
+from .models import (
+    SiteSettings, NavMenu, FtNavMenu1, FtNavMenu2, FtNavMenu3,
+    CatMenu, Hero, HeroTwo, CouponCodeOffer,
+)
+
+CHROME_MODELS = (
+    SiteSettings, NavMenu, FtNavMenu1, FtNavMenu2, FtNavMenu3,
+    CatMenu, Hero, HeroTwo, CouponCodeOffer,
+    # Home blog rail (post URLs use the category slug)
+    BlogPost, BlogCategory,
+)
+
+
+def bump_chrome_version(sender, **kwargs):
+    # Commit ke baad bump, warna koi request purana data naye stamp ke saath cache kar sakti hai
+    transaction.on_commit(lambda: bump_version(CHROME_NAMESPACE))
+
+
+for _model in CHROME_MODELS:
+    post_save.connect(bump_chrome_version, sender=_model, dispatch_uid=f"chrome-save-{_model.__name__}")
+    post_delete.connect(bump_chrome_version, sender=_model, dispatch_uid=f"chrome-delete-{_model.__name__}")
@@ -1,3 +1,133 @@
-from django.test import TestCase
+from types import SimpleNamespace
+from unittest import mock
 
-# Create your tests here.
+from django.core.cache import cache
+from django.test import RequestFactory, TestCase, override_settings
+
+from bicycles.models import Category
+from quesecrides.cache_versions import get_version
+from quesecrides.testing import LOCAL_STORAGES, make_product
+
+from .chrome import CHROME_NAMESPACE
+from . import context_processors
+from .context_processors import site_info
+from .home_sections import build_home_sections, load_section_products
+from .models import HomeCategorySection, SiteSettings
+from .route_context import ROUTE_CONTEXT, register_route_context
+
+
+class SiteChromeCacheTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.request = RequestFactory().get("/")
+
+    def site_name(self):
+        return site_info(self.request)["site_settings"].site_name
+
+    def test_admin_save_bumps_stamp_and_next_request_sees_it(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            settings_row = SiteSettings.objects.create(
+                site_name="Quesecrides", site_description="-", site_keywords="-", logo="logos/x.png",
+                instagram_link="https://i.example", facebook_link="https://f.example",
+                x_link="https://x.example", youtube_link="https://y.example",
+            )
+        self.assertEqual(self.site_name(), "Quesecrides")
+        with self.assertNumQueries(0):  # warm snapshot
+            self.assertEqual(self.site_name(), "Quesecrides")
+
+        before = get_version(CHROME_NAMESPACE)
+        with self.captureOnCommitCallbacks(execute=True):
+            settings_row.site_name = "Quesecrides Cycles"
+            settings_row.save()
+        self.assertGreater(get_version(CHROME_NAMESPACE), before)
+        self.assertEqual(self.site_name(), "Quesecrides Cycles")
+
+
+
+class HomeSectionRailTests(TestCase):
+
+    def setUp(self):
+        self.bikes = Category.objects.create(name="Bicycles", slug="bicycles")
+        self.kids = Category.objects.create(name="Kids", slug="kids", parent=self.bikes)
+        self.parts = Category.objects.create(name="Parts", slug="parts")
+        self.bike_ids = [make_product(self.bikes, f"RB-{i}", f"Road {i}").id for i in range(3)]
+        self.kid_ids = [make_product(self.kids, f"KC-{i}", f"Kids {i}").id for i in range(3)]
+        make_product(self.kids, "KC-HIDDEN", "Hidden", is_available=False)
+        make_product(self.kids, "KC-PLAIN", "Plain", is_Featured_Product=False)
+        self.part_id = make_product(self.parts, "CH-1", "Chain").id
+
+        self.all_bikes = HomeCategorySection.objects.create(title="Bikes")
+        self.all_bikes.categories.set([self.bikes, self.kids])  # overlapping picks
+        self.spares = HomeCategorySection.objects.create(title="Spares")
+        self.spares.categories.set([self.parts])
+        HomeCategorySection.objects.create(title="Empty")
+
+    def ids(self, rails, section):
+        return [card.id for card in rails.get(section.id, [])]
+
+    def test_rails_are_newest_first_and_limited_per_section(self):
+        with self.assertNumQueries(2):  # ranked ids + cards, whatever the section count
+            rails = load_section_products(per_section=4)
+        newest = sorted(self.bike_ids + self.kid_ids, reverse=True)
+        self.assertEqual(self.ids(rails, self.all_bikes), newest[:4])  # descendants included, no duplicates
+        self.assertEqual(self.ids(rails, self.spares), [self.part_id])
+
+    def test_build_home_sections_lists_every_section(self):
+        sections = build_home_sections()
+        self.assertEqual([s["title"] for s in sections], ["Bikes", "Spares", "Empty"])
+        self.assertEqual(len(sections[0]["products"]), 6)  # hidden / non-featured skipped
+        self.assertEqual(sections[2]["products"], [])
+
+
+LAZY_BUILDERS = ("_build_shop_categories", "_build_best_sellers", "_build_home_category_sections")
+
+
+class RouteContextTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        registry = mock.patch.dict(ROUTE_CONTEXT)
+        registry.start()
+        self.addCleanup(registry.stop)
+
+    def request_for(self, view_name):
+        request = RequestFactory().get("/")
+        request.resolver_match = SimpleNamespace(view_name=view_name)
+        return request
+
+    def test_excluded_processors_return_nothing_and_run_no_queries(self):
+        register_route_context("test:slim", processors=["site_info"])
+        request = self.request_for("test:slim")
+        with self.assertNumQueries(0):
+            for name in ("shop_categories", "best_seller_bicycles", "coupon_offers", "home_category_sections"):
+                self.assertEqual(getattr(context_processors, name)(request), {}, name)
+        self.assertIn("site_settings", site_info(request))
+
+    def test_unregistered_route_gets_every_processor_lazily(self):
+        request = self.request_for("test:unlisted")
+        with self.assertNumQueries(0):  # nothing evaluated until a template reads it
+            context = context_processors.shop_categories(request)
+        self.assertEqual(list(context), ["shop_categories"])
+        self.assertEqual(list(context["shop_categories"]), [])
+        self.assertIn("best_seller_block", context_processors.best_seller_bicycles(request))
+
+    def test_unknown_processor_name_is_rejected(self):
+        with self.assertRaisesMessage(ValueError, "best_sellers"):
+            register_route_context("test:typo", processors=["site_info", "best_sellers"])
+        self.assertNotIn("test:typo", ROUTE_CONTEXT)
+
+    @override_settings(STORAGES=LOCAL_STORAGES)
+    def test_registered_page_never_builds_excluded_context(self):
+        builders = {}
+        for name in LAZY_BUILDERS:
+            patcher = mock.patch.object(context_processors, name, return_value={})
+            builders[name] = patcher.start()
+            self.addCleanup(patcher.stop)
+
+        response = self.client.get("/blog/")  # blog:list -> site_info only
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn("shop_categories", response.context)
+        self.assertIn("site_settings", response.context)
+        for name, builder in builders.items():
+            builder.assert_not_called()